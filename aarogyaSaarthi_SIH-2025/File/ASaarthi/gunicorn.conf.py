@@ -0,0 +1,17 @@
+# Gunicorn settings: gunicorn -c ASaarthi/gunicorn.conf.py ASaarthi.wsgi
+# (run from the project directory).
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# Load the app (and run core/warmup.py) once in the master before forking,
+# so workers start with views, NumPy and the caches already in memory
+preload_app = True
+
+# Threads let concurrent sensor posts share one group commit
+# (core/admission.py) instead of each worker writing alone
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
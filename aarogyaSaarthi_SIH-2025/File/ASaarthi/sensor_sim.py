@@ -1,24 +1,27 @@
 # sensor_sim.py
 # Simulates water sensor readings and posts them to the Django API.
+#
+#   python sensor_sim.py                          # JSON over HTTP, one reading every 3 s
+#   python sensor_sim.py --mode tcp --sensor-key KEY --count 10000 --interval 0 --batch 100
+#                                                 # signed binary frames to `manage.py ingest_listener`
 
+import argparse
+import json
+import os
 import random
+import socket
+import sys
 import time
+from pathlib import Path
+
 import requests
 
-URL = "http://127.0.0.1:8000/api/water/post/"
+# Share the geography list with the Django app instead of duplicating it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.constants import STATE_DISTRICTS  # noqa: E402
 
-# ----------------------------
-# STATES & DISTRICTS
-# ----------------------------
-STATE_DISTRICTS = {
-    "Assam": ["Kamrup", "Dibrugarh", "Jorhat", "Tinsukia", "Barpeta"],
-    "Arunachal Pradesh": ["Itanagar", "Tawang", "Pasighat", "Ziro", "Roing"],
-    "Manipur": ["Imphal West", "Imphal East", "Thoubal", "Bishnupur"],
-    "Meghalaya": ["Shillong", "Tura", "Jowai", "Nongpoh"],
-    "Mizoram": ["Aizawl", "Lunglei", "Champhai", "Kolasib"],
-    "Nagaland": ["Kohima", "Dimapur", "Mokokchung", "Tuensang"],
-    "Tripura": ["Agartala", "Udaipur", "Dharmanagar", "Kailashahar"],
-}
+URL = "http://127.0.0.1:8000/api/water/post/"
+STATE_FILE = Path(__file__).resolve().with_name(".sensor_sim_state.json")
 
 # ----------------------------
 # GENERATE VILLAGES & BASELINE DATA
@@ -70,9 +73,10 @@ def inject_warning_or_unsafe(village_values):
 
 
 # ----------------------------
-# MAIN LOOP: SIMULATE & SEND DATA
+# READING GENERATION
 # ----------------------------
-while True:
+def next_reading():
+    """Pick a village, drift its values and return (village, values)."""
     v = random.choice(villages)
     b = baseline[v["name"]]
 
@@ -83,23 +87,180 @@ while True:
 
     # Inject occasional warning/unsafe values
     inject_warning_or_unsafe(b)
+    return v, b
 
-    # Prepare payload
-    data = {
-        "village": v["name"],
-        "state": v["state"],
-        "ph": b["ph"],
-        "turbidity": b["turbidity"],
-        "tds": b["tds"],
-        "lat": v["lat"],
-        "lng": v["lng"],
-    }
 
-    # Send POST request
+# ----------------------------
+# SEQUENCE NUMBERS
+# ----------------------------
+class SeqCounter:
+    """
+    Per-sensor sequence numbers that carry on across runs: the last one
+    used is kept in a JSON state file. A sensor with no saved state starts
+    from the current epoch second, above anything an earlier lost run is
+    likely to have sent, so a restart is never taken for a replay.
+    """
+
+    def __init__(self, path, sensor):
+        self.path, self.sensor = Path(path), sensor
+        self.value = self._load().get(sensor) or int(time.time())
+
+    def _load(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def next(self):
+        self.value += 1
+        return self.value
+
+    def save(self):
+        state = self._load()
+        state[self.sensor] = self.value
+        self.path.write_text(json.dumps(state))
+
+
+# ----------------------------
+# TRANSPORTS
+# ----------------------------
+MAX_ATTEMPTS = 8
+
+
+def retry_after(response, default):
+    """Seconds to wait from a Retry-After header (seconds form), else `default`."""
     try:
-        r = requests.post(URL, json=data, timeout=5)
-        print("Sent:", data, "->", r.status_code, r.text)
-    except Exception as e:
-        print("Error sending data:", e)
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return default
+
+
+def run_json(args):
+    """Original path: one JSON POST per reading."""
+    headers = {"X-Sensor-Key": args.sensor_key} if args.sensor_key else {}
+    seq = SeqCounter(args.state_file, args.sensor_key or "anonymous")
+    sent = 0
+    while not args.count or sent < args.count:
+        v, b = next_reading()
+
+        # Prepare payload
+        data = {
+            "village": v["name"],
+            "state": v["state"],
+            "ph": b["ph"],
+            "turbidity": b["turbidity"],
+            "tds": b["tds"],
+            "lat": v["lat"],
+            "lng": v["lng"],
+            "seq": seq.next(),
+        }
+        seq.save()
+
+        # Send POST request; a retry reuses the same seq, so the server
+        # stores the reading at most once. 429 means the server is shedding
+        # load and 503 that the write did not commit: wait as long as its
+        # Retry-After asks before trying again.
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                r = requests.post(args.url, json=data, headers=headers, timeout=5)
+            except Exception as e:
+                print("Error sending data:", e)
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if args.verbose:
+                print("Sent:", data, "->", r.status_code, r.text)
+            if r.status_code == 429 or r.status_code >= 500:
+                time.sleep(retry_after(r, default=min(2 ** attempt, 30)))
+                continue
+            break
+
+        sent += 1
+        time.sleep(args.interval)
+    return sent
+
+
+def run_binary(args):
+    """Compact path: frames of `--batch` fixed-size records over TCP or UDP."""
+    # Binary records carry registry village ids, so resolve names via Django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ASaarthi.settings")
+    import django
+    django.setup()
+    from core.ingest import encode_frame, HEADER
+    from core.registry import resolve_village
+    from core.sensors import sensor_by_key
+
+    # Frames are signed with the sensor's key, so binary mode needs one
+    sensor = sensor_by_key(args.sensor_key)
+    if sensor is None:
+        sys.exit("--sensor-key must be the API key of a registered sensor in tcp/udp mode")
+
+    for v in villages:
+        v["id"] = resolve_village(v["name"], state=v["state"], lat=v["lat"], lng=v["lng"])
+
+    def connect():
+        sock_type = socket.SOCK_STREAM if args.mode == "tcp" else socket.SOCK_DGRAM
+        sock = socket.socket(socket.AF_INET, sock_type)
+        sock.connect((args.host, args.port))
+        return sock
+
+    sock = connect()
+
+    seq = SeqCounter(args.state_file, args.sensor_key)
+    sent = 0
+    while not args.count or sent < args.count:
+        n = min(args.batch, args.count - sent) if args.count else args.batch
+        records = []
+        for _ in range(n):
+            v, b = next_reading()
+            records.append((seq.next(), time.time(), v["id"],
+                            b["ph"], b["turbidity"], b["tds"], v["lat"], v["lng"]))
+        frame = encode_frame(records, sensor.pk, sensor.api_key)
+        seq.save()
+        if args.mode == "udp":
+            sock.sendall(frame)
+        # Over TCP the listener acknowledges a frame once it is committed and
+        # closes the connection if the write failed: reconnect and resend
+        for attempt in range(MAX_ATTEMPTS if args.mode == "tcp" else 0):
+            try:
+                sock = sock or connect()
+                sock.sendall(frame)
+                ack = sock.recv(HEADER.size)
+            except OSError as e:
+                print("Error sending frame:", e)
+                ack = b""
+            if len(ack) == HEADER.size:
+                if args.verbose:
+                    print(f"Sent {n} readings -> accepted {HEADER.unpack(ack)[2]}")
+                break
+            if sock:
+                sock.close()
+                sock = None
+            time.sleep(min(2 ** attempt, 30))
+        sent += n
+        time.sleep(args.interval)
+    if sock:
+        sock.close()
+    return sent
+
+
+# ----------------------------
+# MAIN: SIMULATE & SEND DATA
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate water quality sensors.")
+    parser.add_argument("--mode", choices=["json", "tcp", "udp"], default="json")
+    parser.add_argument("--url", default=URL, help="JSON endpoint (json mode).")
+    parser.add_argument("--host", default="127.0.0.1", help="ingest_listener host (tcp/udp mode).")
+    parser.add_argument("--port", type=int, default=9500, help="ingest_listener port (tcp/udp mode).")
+    parser.add_argument("--count", type=int, default=0, help="Readings to send; 0 runs forever.")
+    parser.add_argument("--interval", type=float, default=3, help="Seconds to sleep between sends.")
+    parser.add_argument("--batch", type=int, default=1, help="Readings per binary frame.")
+    parser.add_argument("--sensor-key", help="Registered sensor API key (optional in json mode, required in tcp/udp mode).")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Where the last seq per sensor is kept.")
+    parser.add_argument("--quiet", dest="verbose", action="store_false")
+    args = parser.parse_args()
 
-    time.sleep(3)
+    started = time.perf_counter()
+    sent = run_json(args) if args.mode == "json" else run_binary(args)
+    elapsed = time.perf_counter() - started
+    print(f"{args.mode}: sent {sent} readings in {elapsed:.2f}s ({sent / elapsed:.0f}/s)")
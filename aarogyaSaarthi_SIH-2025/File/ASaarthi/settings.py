@@ -51,6 +51,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_routers.ReadReplicaMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'ASaarthi.urls'
@@ -74,6 +76,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ASaarthi.wsgi.application'
 
+# Preload views, templates and in-memory caches when the WSGI app is loaded
+# (core/warmup.py). Pair with `gunicorn --preload` so workers share them.
+WARM_UP_ON_START = os.environ.get('ASAARTHI_WARM_UP', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -85,6 +91,46 @@ DATABASES = {
     }
 }
 
+# Optional read replica for dashboards, summaries and list APIs
+# (see core/db_routers.py). For local testing point ASAARTHI_REPLICA_DB at a
+# second SQLite file and keep it updated with `manage.py sync_replica`.
+if os.environ.get('ASAARTHI_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ASAARTHI_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# Reads fall back to the primary when the replica is further behind than
+# this many seconds; lag is re-measured at most every check interval.
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 2
+
+
+# Cache (dashboard fragments, plus the version tokens that tell each process
+# its ring buffers or place index are stale). Must be shared by every
+# gunicorn worker and ingest_listener, so it defaults to a file cache;
+# set ASAARTHI_REDIS_URL (e.g. redis://127.0.0.1:6379/1) to use Redis.
+
+if os.environ.get('ASAARTHI_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['ASAARTHI_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('ASAARTHI_CACHE_DIR', BASE_DIR / 'cache'),
+            # One version key per village; culling would only force reloads
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,6 +168,40 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Collected static files get content-hashed names plus .gz/.br variants
+# (see `manage.py build_static`)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Uploaded files (symptom report photos)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Sensor ingest admission (core/admission.py): readings are group-committed
+# every INGEST_BATCH_SIZE rows or INGEST_FLUSH_MS, and posts get 429 once
+# INGEST_QUEUE_SIZE readings are waiting; each sender may post
+# INGEST_SENDER_RATE readings/s with bursts of INGEST_SENDER_BURST. A post
+# waits up to INGEST_COMMIT_WAIT seconds for its commit, then answers 503.
+INGEST_QUEUE_SIZE = 5000
+INGEST_BATCH_SIZE = 200
+INGEST_FLUSH_MS = 50
+INGEST_SENDER_RATE = 5
+INGEST_SENDER_BURST = 20
+INGEST_COMMIT_WAIT = 5
+
+# Profiling (core/profiling.py): staff can add ?_profile=1 to any request.
+# Set ASAARTHI_SAMPLE_PROFILE to a sampling interval in milliseconds to have
+# every worker write collapsed stacks to PROFILE_DIR.
+PROFILE_DIR = BASE_DIR / 'profiles'
+SAMPLING_PROFILER_INTERVAL = int(os.environ.get('ASAARTHI_SAMPLE_PROFILE', '0')) or None
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
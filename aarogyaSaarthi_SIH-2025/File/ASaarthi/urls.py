@@ -15,10 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+
+from core.staticfiles import serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
-]
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# runserver serves static files itself in DEBUG; otherwise serve the
+# collected, precompressed files with long-lived cache headers
+if not settings.DEBUG:
+    urlpatterns.insert(0, re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.*)$', serve_static))
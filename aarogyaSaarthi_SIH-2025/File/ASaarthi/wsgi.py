@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ASaarthi.settings')
 
 application = get_wsgi_application()
+
+# Preload views, registry and caches before the server forks workers
+from core.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -1,8 +1,308 @@
-# Register your models here.
+# core/admin.py
+# Admin for the large tables (readings, reports, alerts).
+#
+# Changelists avoid the queries that grow with the table: counts stop at
+# COUNT_LIMIT rows (past that an estimate is shown), the full-table count is
+# off, sorting is limited to the indexed date column and list filters only
+# use indexed columns with choices that need no DISTINCT scan. Besides the
+# usual page links, an "Older" link pages by keyset (date, id) so deep pages
+# cost the same as the first. The date hierarchy probes each candidate
+# year/month/day with an indexed EXISTS instead of a DISTINCT over every
+# row. Bulk actions run as one UPDATE.
 
-from django.contrib import admin
-from .models import WaterQuality, SymptomReport, Alert
+from datetime import timedelta
 
-admin.site.register(WaterQuality)
-admin.site.register(SymptomReport)
-admin.site.register(Alert)
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.options import IncorrectLookupParameters, ShowFacets
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min, Q, QuerySet
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import analytics
+from .constants import STATE_DISTRICTS
+from .fragments import invalidate_fragments
+from .models import WaterQuality, SymptomReport, Alert, Sensor, ReportRollup
+
+COUNT_LIMIT = 10000
+AFTER_VAR = "after"
+
+
+# ----------------------------
+# APPROXIMATE COUNTS
+# ----------------------------
+def estimate_rows(queryset):
+    """Cheap row estimate for a whole table: planner stats or the highest id."""
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return int(row[0])
+    return queryset.model._default_manager.using(queryset.db).order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Counts exactly up to COUNT_LIMIT rows. Beyond that an unfiltered list
+    reports the table estimate and a filtered one reports COUNT_LIMIT
+    (`approximate` is then True); later rows are reached with keyset paging.
+    """
+
+    approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        capped = queryset.order_by().values("pk")[:COUNT_LIMIT + 1].count()
+        if capped <= COUNT_LIMIT:
+            return capped
+        self.approximate = True
+        if not queryset.query.where:
+            return max(estimate_rows(queryset), COUNT_LIMIT)
+        return COUNT_LIMIT
+
+
+# ----------------------------
+# DATE HIERARCHY
+# ----------------------------
+def _truncate(moment, kind):
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind in ("year", "month"):
+        moment = moment.replace(day=1)
+    if kind == "year":
+        moment = moment.replace(month=1)
+    return moment
+
+
+def _next_bucket(moment, kind):
+    if kind == "year":
+        return moment.replace(year=moment.year + 1)
+    if kind == "month":
+        return moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+    return moment + timedelta(days=1)
+
+
+class DateBucketQuerySet(QuerySet):
+    """
+    QuerySet whose `datetimes()` takes one MIN/MAX plus an EXISTS per
+    candidate bucket (all index seeks) rather than a DISTINCT scan.
+    """
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None):
+        if kind not in ("year", "month", "day"):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        unordered = self.order_by()
+        bounds = unordered.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] is None:
+            return []
+        first, last = bounds["first"], bounds["last"]
+        if timezone.is_aware(first):
+            first, last = timezone.localtime(first, tzinfo), timezone.localtime(last, tzinfo)
+        buckets = []
+        start = _truncate(first, kind)
+        while start <= last:
+            end = _next_bucket(start, kind)
+            if unordered.filter(**{f"{field_name}__gte": start, f"{field_name}__lt": end}).exists():
+                buckets.append(start)
+            start = end
+        return buckets if order == "ASC" else buckets[::-1]
+
+
+# ----------------------------
+# KEYSET PAGING
+# ----------------------------
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that also pages by keyset: `?after=<id>` shows the rows that
+    come after that row in the default (-date, -id) ordering. Only used when
+    the list is not re-sorted by the user.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        return lookup_params
+
+    @property
+    def keyset_field(self):
+        return self.model_admin.date_hierarchy if ORDER_VAR not in self.params else None
+
+    @cached_property
+    def keyset_after(self):
+        after = self.params.get(AFTER_VAR)
+        return after if after and self.keyset_field else None
+
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        if self.keyset_after is None:
+            return qs
+        field = self.keyset_field
+        try:
+            moment = self.root_queryset.filter(pk=self.keyset_after).values_list(field, flat=True).get()
+        except (self.model.DoesNotExist, ValueError):
+            raise IncorrectLookupParameters(f"Unknown {AFTER_VAR} row")
+        return qs.filter(Q(**{f"{field}__lt": moment}) | Q(**{field: moment, "pk__lt": self.keyset_after}))
+
+    def get_results(self, request):
+        if self.keyset_after is not None:
+            self.page_num = 1
+        super().get_results(request)
+        self.result_list = list(self.result_list)
+        self.next_page_url = None
+        if self.keyset_field and self.multi_page and len(self.result_list) == self.list_per_page:
+            self.next_page_url = self.get_query_string({AFTER_VAR: self.result_list[-1].pk}, [PAGE_VAR])
+        self.first_page_url = self.get_query_string(remove=[AFTER_VAR, PAGE_VAR]) if self.keyset_after else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base for changelists over tables too big to count or sort freely."""
+
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    show_facets = ShowFacets.NEVER
+    list_per_page = 100
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return DateBucketQuerySet(self.model, query=qs.query, using=qs._db, hints=qs._hints)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+# ----------------------------
+# LIST FILTERS
+# ----------------------------
+class StateFilter(admin.SimpleListFilter):
+    title = "state"
+    parameter_name = "state"
+
+    def lookups(self, request, model_admin):
+        return [(state, state) for state in sorted(STATE_DISTRICTS)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(state=self.value())
+
+
+class DiseaseFilter(admin.SimpleListFilter):
+    """Choices come from the report rollups, not a DISTINCT over every report."""
+
+    title = "disease"
+    parameter_name = "disease"
+
+    def lookups(self, request, model_admin):
+        diseases = (
+            ReportRollup.objects.filter(level="state", dimension="disease").exclude(value="")
+            .values_list("value", flat=True).distinct().order_by("value")
+        )
+        return [(disease, disease) for disease in diseases]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(disease=self.value())
+
+
+class AlertStatusFilter(admin.SimpleListFilter):
+    title = "status"
+    parameter_name = "status"
+
+    def lookups(self, request, model_admin):
+        return [("unresolved", "Unresolved"), ("resolved", "Resolved")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+
+
+class SourceFilter(admin.SimpleListFilter):
+    title = "source"
+    parameter_name = "source"
+
+    def lookups(self, request, model_admin):
+        return [("sensor", "Sensor"), ("manual", "Manual entry")]
+
+    def queryset(self, request, queryset):
+        if self.value() in ("sensor", "manual"):
+            return queryset.filter(sensor__isnull=self.value() == "manual")
+
+
+# ----------------------------
+# MODEL ADMINS
+# ----------------------------
+@admin.register(WaterQuality)
+class WaterQualityAdmin(LargeTableAdmin):
+    list_display = ("village", "ph", "turbidity", "tds", "sensor", "timestamp")
+    list_select_related = ("sensor__village",)
+    list_filter = (SourceFilter,)
+    date_hierarchy = "timestamp"
+    ordering = ("-timestamp", "-pk")
+    sortable_by = ("timestamp",)
+    raw_id_fields = ("sensor",)
+    readonly_fields = ("village_ref",)
+
+
+class ReclassifyForm(forms.Form):
+    disease = forms.CharField(max_length=100, required=False, help_text="Leave blank to clear the disease.")
+
+
+@admin.register(SymptomReport)
+class SymptomReportAdmin(LargeTableAdmin):
+    list_display = ("village", "district", "state", "disease", "gender", "age", "water_source", "reported_at")
+    list_filter = (StateFilter, DiseaseFilter, "gender")
+    # Prefix matches only; "=" for exact idempotency keys
+    search_fields = ("^village", "^district", "^name", "=client_key")
+    date_hierarchy = "reported_at"
+    ordering = ("-reported_at", "-pk")
+    sortable_by = ("reported_at",)
+    readonly_fields = ("village_ref", "reported_at")
+    actions = ("reclassify",)
+
+    @admin.action(description="Re-classify selected reports", permissions=["change"])
+    def reclassify(self, request, queryset):
+        form = ReclassifyForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            changed = analytics.reclassify(queryset, form.cleaned_data["disease"].strip() or None)
+            invalidate_fragments(SymptomReport)
+            self.message_user(request, f"Re-classified {changed} reports.", messages.SUCCESS)
+            return None
+        return TemplateResponse(request, "admin/core/symptomreport/reclassify.html", {
+            **self.admin_site.each_context(request),
+            "title": "Re-classify reports",
+            "opts": self.model._meta,
+            "form": form,
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across") == "1",
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        })
+
+
+@admin.register(Alert)
+class AlertAdmin(LargeTableAdmin):
+    list_display = ("village", "alert_type", "status", "message", "triggered_at")
+    list_filter = (AlertStatusFilter, "alert_type")
+    date_hierarchy = "triggered_at"
+    ordering = ("-triggered_at", "-pk")
+    sortable_by = ("triggered_at",)
+    readonly_fields = ("village_ref",)
+    actions = ("resolve",)
+
+    @admin.action(description="Mark selected alerts resolved", permissions=["change"])
+    def resolve(self, request, queryset):
+        resolved = queryset.order_by().exclude(status="resolved").update(status="resolved")
+        self.message_user(request, f"Resolved {resolved} alerts.", messages.SUCCESS)
+
+
+@admin.register(Sensor)
+class SensorAdmin(admin.ModelAdmin):
+    list_display = ("name", "village", "last_seen", "created_at")
+    list_select_related = ("village",)
+    raw_id_fields = ("village",)
+    readonly_fields = ("last_seq", "last_seen", "readings")
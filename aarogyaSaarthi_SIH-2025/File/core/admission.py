@@ -0,0 +1,266 @@
+# core/admission.py
+# Admission control for the JSON water API.
+#
+# Validated readings go into a bounded in-process queue drained by one
+# writer thread, which commits them in groups: a flush happens once
+# INGEST_BATCH_SIZE readings are waiting or INGEST_FLUSH_MS after the first
+# one arrived. Each request waits up to INGEST_COMMIT_WAIT seconds for its
+# group to commit, so a 200 still means "stored", but concurrent posts share
+# one INSERT instead of contending for SQLite's write lock. A batch that
+# fails or does not commit in time is answered 503 with Retry-After; the
+# sender retries with the same seq, which (sensor, seq) uniqueness stores at
+# most once. Load is shed on queue depth: when the queue is full, and when
+# one sender exceeds its token bucket, the API answers 429 with Retry-After
+# instead of piling up work.
+#
+# Queues, buckets and metrics are per worker process.
+
+import atexit
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+
+from .ingest import write_readings
+
+logger = logging.getLogger(__name__)
+
+
+class Rejected(Exception):
+    """Reading not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+# ----------------------------
+# RATE LIMITS
+# ----------------------------
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take one token; returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SenderLimits:
+    """One token bucket per sender (sensor id, or client address)."""
+
+    # Buckets idle this long are full again and can be forgotten
+    IDLE_SECONDS = 600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._swept_at = time.monotonic()
+
+    def check(self, sender):
+        """Raise Rejected if `sender` is over its rate."""
+        rate, burst = settings.INGEST_SENDER_RATE, settings.INGEST_SENDER_BURST
+        if not rate:
+            return
+        with self._lock:
+            bucket = self._buckets.get(sender)
+            if bucket is None:
+                bucket = self._buckets[sender] = TokenBucket(rate, burst)
+            wait = bucket.take()
+            self._sweep()
+        if wait:
+            raise Rejected("Rate limit exceeded for this sender", wait)
+
+    def _sweep(self):
+        # Called with self._lock held
+        now = time.monotonic()
+        if now - self._swept_at < self.IDLE_SECONDS:
+            return
+        self._buckets = {k: b for k, b in self._buckets.items() if now - b.updated < self.IDLE_SECONDS}
+        self._swept_at = now
+
+
+# ----------------------------
+# GROUP COMMIT WRITER
+# ----------------------------
+class _Ticket:
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+
+class GroupCommitWriter:
+    """Bounded queue of readings plus the thread that writes them in groups."""
+
+    # Attempts per batch before its waiters are told it failed
+    WRITE_ATTEMPTS = 2
+
+    def __init__(self):
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._busy = False
+        self._latencies = deque(maxlen=512)  # seconds per flush
+        self.batches = 0
+        self.written = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.rejected_full = 0
+        self.rejected_rate = 0
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork: threads do not survive it
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+                threading.Thread(target=self._run, name="ingest-writer", daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, reading):
+        """
+        Queue a validated reading and return a ticket to wait on.
+        Raises Rejected when the queue is full.
+        """
+        self._ensure_started()
+        ticket = _Ticket()
+        try:
+            self._queue.put_nowait((reading, ticket))
+        except queue.Full:
+            self.rejected_full += 1
+            raise Rejected("Ingest queue is full", self.drain_estimate())
+        return ticket
+
+    def wait(self, ticket, timeout):
+        """True once the reading is committed, False on timeout; raises the write error if it failed."""
+        if not ticket.event.wait(timeout):
+            return False
+        if ticket.error is not None:
+            raise ticket.error
+        return True
+
+    def drain_estimate(self):
+        """Seconds the current backlog should take to write, at least 1."""
+        latencies = list(self._latencies)
+        if not latencies:
+            return 1
+        per_batch = sum(latencies) / len(latencies)
+        batches = self.depth() / max(settings.INGEST_BATCH_SIZE, 1)
+        return max(1, math.ceil(batches * per_batch))
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _collect(self):
+        """Block for the first reading, then gather until the batch is full or the window closes."""
+        batch = [self._queue.get()]
+        self._busy = True
+        deadline = time.monotonic() + settings.INGEST_FLUSH_MS / 1000
+        while len(batch) < settings.INGEST_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        error = None
+        for attempt in range(1, self.WRITE_ATTEMPTS + 1):
+            try:
+                stored = write_readings([reading for reading, _ in batch])
+                self.written += len(stored)
+                self.duplicates += len(batch) - len(stored)
+                error = None
+                break
+            except Exception as e:
+                connection.close()  # retry (and carry on) on a fresh connection
+                error = e
+                if attempt == self.WRITE_ATTEMPTS:
+                    logger.exception("Group commit of %d readings failed", len(batch))
+                    self.failed += len(batch)
+        for _, ticket in batch:
+            ticket.error = error
+            ticket.event.set()
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._write(batch)
+            self._latencies.append(time.perf_counter() - started)
+            self.batches += 1
+            self._busy = False
+
+    def drain(self, timeout=5):
+        """Wait up to `timeout` seconds for queued readings to be written (at exit)."""
+        deadline = time.monotonic() + timeout
+        while (self.depth() or self._busy) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "pid": os.getpid(),
+            "queue_depth": self.depth(),
+            "queue_size": settings.INGEST_QUEUE_SIZE,
+            "batches": self.batches,
+            "written": self.written,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_rate_limited": self.rejected_rate,
+            "flush_ms": {
+                "last": round(self._latencies[-1] * 1000, 2) if self._latencies else None,
+                "p50": pct(0.50),
+                "p99": pct(0.99),
+                "max": round(latencies[-1] * 1000, 2) if latencies else None,
+            },
+        }
+
+
+sender_limits = SenderLimits()
+writer = GroupCommitWriter()
+atexit.register(writer.drain)
+
+
+def admit(reading, sender):
+    """
+    Rate-limit and queue a reading for the next group commit; returns the
+    ticket to wait on. Raises Rejected when the sender is over its rate or
+    the queue is full.
+    """
+    try:
+        sender_limits.check(sender)
+    except Rejected:
+        writer.rejected_rate += 1
+        raise
+    return writer.submit(reading)
@@ -0,0 +1,272 @@
+# core/analytics.py
+# Symptom report counts pre-aggregated into ReportCube cells
+# (village x week x disease x water source x gender x age band).
+#
+# Cells are adjusted incrementally as reports are added, edited or deleted,
+# so any slice -- rolled up to state or district, or drilled down to a
+# village and week -- is a GROUP BY over cells rather than over reports.
+#
+# Cells are nearly as many as reports, so the common slices (state or
+# district x week x at most one dimension) are also kept in ReportRollup
+# rows, updated in the same transaction as the cells; `query()` reads
+# those whenever the slice allows. `manage.py rebuild_report_cube`
+# recomputes cells and rollups from scratch.
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ReportCube, ReportRollup, SymptomReport, Village
+
+AGE_BANDS = (
+    (0, 4, "0-4"),
+    (5, 14, "5-14"),
+    (15, 24, "15-24"),
+    (25, 44, "25-44"),
+    (45, 64, "45-64"),
+    (65, None, "65+"),
+)
+
+# Report fields a cell is keyed on (besides village and week)
+REPORT_FIELDS = ("village_ref_id", "reported_at", "disease", "water_source", "gender", "age")
+
+# Dimensions the API can group or filter by
+DIMENSIONS = ("disease", "water_source", "gender", "age_band", "week")
+GEO_LEVELS = {
+    "state": "village__district__state__name",
+    "district": "village__district__name",
+    "village": "village__name",
+}
+
+# Dimensions a rollup row can carry, in cell key order
+ROLLUP_DIMENSIONS = ("disease", "water_source", "gender", "age_band")
+ROLLUP_GEO = {"state": "state__name", "district": "district__name"}
+
+
+# ----------------------------
+# CELL KEYS
+# ----------------------------
+def age_band(age):
+    if age is None or age < 0:
+        return ""
+    for _, high, label in AGE_BANDS:
+        if high is None or age <= high:
+            return label
+    return ""
+
+
+def week_start(moment):
+    """Monday of the (local) week containing a datetime or date."""
+    day = timezone.localdate(moment) if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+
+def cell_key(values):
+    """
+    Cell key for one report, given its REPORT_FIELDS as a dict. Returns
+    None for reports not linked to a registry village.
+    """
+    if not values.get("village_ref_id") or values.get("reported_at") is None:
+        return None
+    return (
+        values["village_ref_id"],
+        week_start(values["reported_at"]),
+        (values.get("disease") or "").strip(),
+        (values.get("water_source") or "").strip(),
+        values.get("gender") or "",
+        age_band(values.get("age")),
+    )
+
+
+def report_key(report):
+    return cell_key({field: getattr(report, field) for field in REPORT_FIELDS})
+
+
+def _lookup(key):
+    village_id, week, disease, water_source, gender, band = key
+    return {
+        "village_id": village_id, "week": week, "disease": disease,
+        "water_source": water_source, "gender": gender, "age_band": band,
+    }
+
+
+def _rollup_lookup(key):
+    level, state_id, district_id, week, dimension, value = key
+    return {
+        "level": level, "state_id": state_id, "district_id": district_id,
+        "week": week, "dimension": dimension, "value": value,
+    }
+
+
+def _village_geo(village_ids=None):
+    """{village id: (district id, state id)}, for the given villages or all."""
+    villages = Village.objects.all() if village_ids is None else Village.objects.filter(id__in=village_ids)
+    return {
+        village_id: (district_id, state_id)
+        for village_id, district_id, state_id in villages.values_list("id", "district_id", "district__state_id")
+    }
+
+
+def rollup_counts(counts, geo):
+    """Roll a Counter of cell keys up to ReportRollup keys."""
+    rollups = Counter()
+    for key, n in counts.items():
+        village_id, week, *values = key
+        district_id, state_id = geo.get(village_id, (None, None))
+        for level, district in (("state", None), ("district", district_id)):
+            rollups[(level, state_id, district, week, "", "")] += n
+            for dimension, value in zip(ROLLUP_DIMENSIONS, values):
+                rollups[(level, state_id, district, week, dimension, value)] += n
+    return rollups
+
+
+# ----------------------------
+# INCREMENTAL UPDATES
+# ----------------------------
+def _add(model, lookup, n):
+    """One UPDATE for an existing row, an INSERT for a new one; emptied rows are removed."""
+    if model.objects.filter(**lookup).update(count=F("count") + n):
+        if n < 0:
+            model.objects.filter(count__lte=0, **lookup).delete()
+        return
+    if n < 0:
+        return  # nothing to take away from
+    try:
+        with transaction.atomic():
+            model.objects.create(count=n, **lookup)
+    except IntegrityError:
+        # Created concurrently by another request
+        model.objects.filter(**lookup).update(count=F("count") + n)
+
+
+def apply_delta(delta):
+    """
+    Add a Counter of {cell key: change} to the cube and its rollups: one
+    UPDATE per touched row, an INSERT for rows seen for the first time.
+    """
+    delta = Counter({key: n for key, n in delta.items() if key is not None and n})
+    if not delta:
+        return
+    rollups = rollup_counts(delta, _village_geo({key[0] for key in delta}))
+    with transaction.atomic():
+        for key, n in delta.items():
+            _add(ReportCube, _lookup(key), n)
+        for key, n in rollups.items():
+            if n:
+                _add(ReportRollup, _rollup_lookup(key), n)
+
+
+def add_reports(reports):
+    """Count newly stored reports (for bulk inserts, which skip signals)."""
+    apply_delta(Counter(report_key(r) for r in reports))
+
+
+def reclassify(reports, disease, chunk_size=10000):
+    """
+    Set the disease of every report in the `reports` queryset with a single
+    UPDATE (which skips signals) and move their counts to the matching
+    cells. Returns the number of reports changed.
+    """
+    reports = reports.exclude(disease=disease) if disease is not None else reports.exclude(disease__isnull=True)
+    with transaction.atomic():
+        delta = Counter()
+        for row in reports.order_by().values(*REPORT_FIELDS).iterator(chunk_size=chunk_size):
+            delta[cell_key(row)] -= 1
+            row["disease"] = disease
+            delta[cell_key(row)] += 1
+        changed = reports.update(disease=disease)
+        apply_delta(delta)
+    return changed
+
+
+def rebuild(chunk_size=10000):
+    """Recompute every cell and rollup from SymptomReport. Returns the number of cells."""
+    counts = Counter(
+        cell_key(row)
+        for row in SymptomReport.objects.values(*REPORT_FIELDS).iterator(chunk_size=chunk_size)
+    )
+    counts.pop(None, None)
+    rollups = rollup_counts(counts, _village_geo())
+    with transaction.atomic():
+        ReportCube.objects.all().delete()
+        ReportRollup.objects.all().delete()
+        ReportCube.objects.bulk_create(
+            (ReportCube(count=n, **_lookup(key)) for key, n in counts.items()),
+            batch_size=1000,
+        )
+        ReportRollup.objects.bulk_create(
+            (ReportRollup(count=n, **_rollup_lookup(key)) for key, n in rollups.items()),
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+# ----------------------------
+# QUERIES
+# ----------------------------
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def _rollup_slice(level, by, filters):
+    """
+    The (rollup level, dimension) that can answer a query, or None when it
+    needs village cells: a village level or filter, or more than one
+    non-week dimension between `by` and `filters`.
+    """
+    if level == "village" or "village" in filters:
+        return None
+    dimensions = {name for name in (*by, *filters) if name in ROLLUP_DIMENSIONS}
+    if len(dimensions) > 1:
+        return None
+    rollup_level = "district" if level == "district" or "district" in filters else "state"
+    return rollup_level, dimensions.pop() if dimensions else ""
+
+
+def query(level="state", by=(), filters=None, since=None, until=None):
+    """
+    Counts grouped by a geography level ("state", "district", "village" or
+    None for a grand total; lower levels also carry their parents) plus any
+    of DIMENSIONS, restricted by
+    `filters` ({"state": ..., "district": ..., "village": ..., "disease": ...}
+    -- names match case-insensitively) and an optional week range.
+    Returns a list of dicts with a "count" key, largest first.
+    """
+    filters = filters or {}
+    if level and level not in GEO_LEVELS:
+        raise ValueError(f"level must be one of {', '.join(GEO_LEVELS)}")
+    unknown = set(by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+    for name in filters:
+        if name not in GEO_LEVELS and (name not in DIMENSIONS or name == "week"):
+            raise ValueError(f"Cannot filter by {name}")
+
+    rollup = _rollup_slice(level, by, filters)
+    if rollup:
+        cells = ReportRollup.objects.filter(level=rollup[0], dimension=rollup[1])
+        geo, column = ROLLUP_GEO, {rollup[1]: "value"}
+    else:
+        cells, geo, column = ReportCube.objects.all(), GEO_LEVELS, {}
+    for name, value in filters.items():
+        cells = cells.filter(**{f"{geo.get(name) or column.get(name, name)}__iexact": value})
+    since, until = _parse_date(since), _parse_date(until)
+    if since:
+        cells = cells.filter(week__gte=week_start(since))
+    if until:
+        cells = cells.filter(week__lte=until)
+
+    # A district is grouped with its state, a village with both
+    levels = list(GEO_LEVELS)[:list(GEO_LEVELS).index(level) + 1] if level else []
+    names = levels + list(by)
+    group = [geo[name] if name in geo else column.get(name, name) for name in names]
+    if not group:
+        return [{"count": cells.aggregate(count=Sum("count"))["count"] or 0}]
+    rows = cells.values(*group).annotate(count=Sum("count")).order_by("-count", *group)
+    return [
+        {**{name: row[field] for name, field in zip(names, group)}, "count": row["count"]}
+        for row in rows
+    ]
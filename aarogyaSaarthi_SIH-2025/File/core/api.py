@@ -0,0 +1,93 @@
+# core/api.py
+# Read-only list APIs (Django REST framework) with cursor pagination.
+
+from rest_framework import generics
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+
+from .registry import village_ids
+from .serializers import WaterQualitySerializer, SymptomReportSerializer, AlertSerializer
+
+# Query parameters resolved to village ids through the registry
+GEO_FILTERS = ("state", "district", "village")
+
+
+# ----------------------------
+# PAGINATION
+# ----------------------------
+class TimestampCursorPagination(CursorPagination):
+    """
+    Keyset pagination on an indexed timestamp: every page is a range scan
+    from the cursor position, so deep pages cost the same as the first.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+def cursor_pagination(field):
+    """Cursor pagination class ordered newest-first on `field`."""
+    return type(
+        f"{field.title().replace('_', '')}CursorPagination",
+        (TimestampCursorPagination,),
+        {"ordering": (f"-{field}", "-id")},
+    )
+
+
+# ----------------------------
+# BASE LIST VIEW
+# ----------------------------
+class GeoFilteredListView(generics.ListAPIView):
+    """
+    List view filtered by ?state=, ?district=, ?village= through the
+    geography registry, loading only the columns that ?fields= asks for.
+    Names are resolved to village ids first, so the filter is an IN on the
+    indexed village_ref_id and the cursor seek never joins the registry.
+    """
+    ordering_field = None
+
+    def get_queryset(self):
+        model = self.serializer_class.Meta.model
+        model_fields = {f.name for f in model._meta.concrete_fields}
+        qs = model.objects.all()
+
+        geo = {name: self.request.query_params.get(name) for name in GEO_FILTERS}
+        if any(geo.values()):
+            qs = qs.filter(village_ref_id__in=village_ids(**geo))
+
+        requested = self.request.query_params.get("fields")
+        if requested:
+            columns = {f.strip() for f in requested.split(",")} & model_fields
+            # The cursor needs the ordering columns on every row
+            qs = qs.only(*(columns | {"id", self.ordering_field}))
+        return qs
+
+
+# ----------------------------
+# ENDPOINTS
+# ----------------------------
+class WaterQualityList(GeoFilteredListView):
+    serializer_class = WaterQualitySerializer
+    ordering_field = "timestamp"
+    pagination_class = cursor_pagination("timestamp")
+
+
+class SymptomReportList(GeoFilteredListView):
+    # Reports carry patients' names and ages
+    permission_classes = [IsAuthenticated]
+    serializer_class = SymptomReportSerializer
+    ordering_field = "reported_at"
+    pagination_class = cursor_pagination("reported_at")
+
+
+class AlertList(GeoFilteredListView):
+    serializer_class = AlertSerializer
+    ordering_field = "triggered_at"
+    pagination_class = cursor_pagination("triggered_at")
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        status = self.request.query_params.get("status")
+        if status:
+            qs = qs.filter(status=status)
+        return qs
@@ -0,0 +1,367 @@
+# core/backtest.py
+# Replays historical readings and symptom reports through alert rules and
+# scores them against outbreaks found in the report history, without
+# creating Alert rows.
+#
+# History is loaded once into NumPy arrays, split into village partitions
+# and scored in a process pool. Rules see one village at a time and return
+# a boolean per "event" (every reading or report arrival, in time order);
+# an alert fires when the condition holds and the village's previous alert
+# from that rule is older than the cooldown, mirroring how an unresolved
+# alert suppresses duplicates in production.
+#
+# An outbreak starts when a village reaches `outbreak_reports` reports
+# within `outbreak_window` after at least one quiet window. An outbreak is
+# caught if an alert fires between `lead_window` before its start and
+# `grace` after it; lead time is start minus the first such alert.
+
+import importlib
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+# ----------------------------
+# HISTORY
+# ----------------------------
+@dataclass
+class VillageHistory:
+    """One village's readings and reports as time-sorted arrays (epoch seconds)."""
+    village_id: int
+    read_t: np.ndarray
+    ph: np.ndarray
+    turbidity: np.ndarray
+    tds: np.ndarray
+    report_t: np.ndarray
+    diarrhea: np.ndarray   # bool per report: symptoms mention diarrhea
+    fever: np.ndarray      # bool per report: symptoms mention fever
+    events: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.events = np.union1d(self.read_t, self.report_t)
+
+    def latest_reading(self):
+        """Index of the latest reading at or before each event, -1 if none."""
+        return np.searchsorted(self.read_t, self.events, side="right") - 1
+
+    def reports_within(self, window, mask=None):
+        """Reports in (t - window, t] at each event, optionally only where `mask`."""
+        t = self.report_t if mask is None else self.report_t[mask]
+        return np.searchsorted(t, self.events, side="right") - np.searchsorted(t, self.events - window, side="right")
+
+    def reading_values(self):
+        """(ph, turbidity, tds) of the latest reading at each event; NaN before the first."""
+        idx = self.latest_reading()
+        has = idx >= 0
+        out = []
+        for values in (self.ph, self.turbidity, self.tds):
+            v = np.full(len(self.events), np.nan)
+            v[has] = values[idx[has]]
+            out.append(v)
+        return out
+
+
+def split_villages(village_col, columns):
+    """
+    Split columns sorted by (village, time) into per-village slices.
+    Returns {village_id: [column slices]}.
+    """
+    if len(village_col) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, village_col[1:] != village_col[:-1]])
+    ends = np.r_[starts[1:], len(village_col)]
+    return {int(village_col[s]): [c[s:e] for c in columns] for s, e in zip(starts, ends)}
+
+
+def build_histories(readings, reports):
+    """
+    `readings`: dict of arrays village/t/ph/turbidity/tds; `reports`: dict
+    of arrays village/t/diarrhea/fever. Returns a list of VillageHistory.
+    """
+    def order(cols):
+        idx = np.lexsort((cols["t"], cols["village"]))
+        return {k: v[idx] for k, v in cols.items()}
+
+    readings, reports = order(readings), order(reports)
+    by_reading = split_villages(readings["village"], [readings[k] for k in ("t", "ph", "turbidity", "tds")])
+    by_report = split_villages(reports["village"], [reports[k] for k in ("t", "diarrhea", "fever")])
+    empty_r = [np.empty(0)] * 4
+    empty_s = [np.empty(0), np.empty(0, dtype=bool), np.empty(0, dtype=bool)]
+    return [
+        VillageHistory(vid, *by_reading.get(vid, empty_r), *by_report.get(vid, empty_s))
+        for vid in sorted(set(by_reading) | set(by_report))
+    ]
+
+
+# ----------------------------
+# RULES
+# ----------------------------
+class Rule:
+    """
+    Base class for backtest rules. Subclasses set `name` and `defaults`
+    (tunable parameters) and implement `condition(village)`.
+    """
+    name = None
+    defaults = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown parameter(s) {', '.join(sorted(unknown))}")
+        self.params = {**self.defaults, **params}
+
+    @property
+    def label(self):
+        changed = {k: v for k, v in self.params.items() if self.defaults.get(k) != v}
+        return self.name + ("(" + ", ".join(f"{k}={v}" for k, v in changed.items()) + ")" if changed else "")
+
+    def condition(self, village):
+        raise NotImplementedError
+
+    def alerts(self, village, cooldown):
+        """Alert times: condition true and no alert from this rule within `cooldown`."""
+        times = village.events[self.condition(village)]
+        fired, last = [], -math.inf
+        for t in times:
+            if t - last >= cooldown:
+                fired.append(t)
+                last = t
+        return np.array(fired)
+
+
+def _water_out_of_range(village, p):
+    ph, turbidity, tds = village.reading_values()
+    with np.errstate(invalid="ignore"):  # NaN before the first reading compares False
+        return (ph < p["ph_low"]) | (ph > p["ph_high"]) | (turbidity > p["turbidity"]) | (tds > p["tds"])
+
+
+class WaterStatusRule(Rule):
+    """api_summary's water alert: latest reading at "warning" level or worse."""
+    name = "water_status"
+    defaults = {"ph_low": 6.5, "ph_high": 8.5, "turbidity": 5.0, "tds": 500.0}
+
+    def condition(self, village):
+        return _water_out_of_range(village, self.params)
+
+
+class OutbreakRule(Rule):
+    """check_and_trigger_alert: unsafe latest reading plus N reports in the last days."""
+    name = "outbreak"
+    defaults = {"ph_low": 6.5, "ph_high": 8.5, "turbidity": 5.0, "tds": 500.0,
+                "min_reports": 3, "window_days": 2}
+
+    def condition(self, village):
+        p = self.params
+        unsafe = _water_out_of_range(village, p)
+        return unsafe & (village.reports_within(p["window_days"] * DAY) >= p["min_reports"])
+
+
+class DiseaseRule(Rule):
+    """
+    api_summary's disease alert (predict_disease): water outside limits, or
+    more than N diarrhea/fever reports. Production counts reports over all
+    time; here they are counted over a rolling window.
+    """
+    name = "disease"
+    defaults = {"ph_low": 6.5, "ph_high": 8.5, "turbidity": 5.0, "tds": 500.0,
+                "symptom_reports": 5, "window_days": 7}
+
+    def condition(self, village):
+        p = self.params
+        window = p["window_days"] * DAY
+        water = _water_out_of_range(village, p)
+        diarrhea = village.reports_within(window, village.diarrhea) > p["symptom_reports"]
+        fever = village.reports_within(window, village.fever) > p["symptom_reports"]
+        return water | diarrhea | fever
+
+
+RULES = {rule.name: rule for rule in (WaterStatusRule, OutbreakRule, DiseaseRule)}
+
+
+def parse_rule(spec):
+    """
+    Build a rule from "name" or "name:param=value,...", where name is a
+    built-in rule or the dotted path of a Rule subclass
+    ("myapp.rules.MyRule:threshold=3").
+    """
+    name, _, args = spec.partition(":")
+    if name in RULES:
+        rule_class = RULES[name]
+    elif "." in name:
+        module, _, cls = name.rpartition(".")
+        rule_class = getattr(importlib.import_module(module), cls)
+    else:
+        raise ValueError(f"Unknown rule {name!r}; built-in rules: {', '.join(RULES)}")
+    params = {}
+    for item in filter(None, args.split(",")):
+        key, _, value = item.partition("=")
+        default = rule_class.defaults.get(key)
+        params[key] = type(default)(value) if default is not None else float(value)
+    return rule_class(**params)
+
+
+# ----------------------------
+# SCORING
+# ----------------------------
+@dataclass
+class ScoringOptions:
+    cooldown: float = 7 * DAY
+    outbreak_reports: int = 5
+    outbreak_window: float = 7 * DAY
+    lead_window: float = 7 * DAY
+    grace: float = 1 * DAY
+
+
+def outbreak_starts(village, options):
+    """Start times of outbreaks in one village's report history."""
+    t = village.report_t
+    if len(t) < options.outbreak_reports:
+        return np.empty(0)
+    counts = np.arange(1, len(t) + 1) - np.searchsorted(t, t - options.outbreak_window, side="right")
+    hot = t[counts >= options.outbreak_reports]
+    if len(hot) == 0:
+        return hot
+    return hot[np.r_[True, np.diff(hot) > options.outbreak_window]]
+
+
+def score_partition(villages, rules, options):
+    """Per-rule tallies for a list of villages (runs in a worker process)."""
+    tallies = {rule.label: {"alerts": 0, "true_alerts": 0, "outbreaks": 0, "caught": 0, "lead_hours": []}
+               for rule in rules}
+    for village in villages:
+        starts = outbreak_starts(village, options)
+        for rule in rules:
+            tally = tallies[rule.label]
+            alerts = rule.alerts(village, options.cooldown)
+            tally["alerts"] += len(alerts)
+            tally["outbreaks"] += len(starts)
+            if not len(alerts) or not len(starts):
+                continue
+            # An alert is true if some outbreak starts within [alert - grace, alert + lead_window]
+            lo = np.searchsorted(starts, alerts - options.grace, side="left")
+            hi = np.searchsorted(starts, alerts + options.lead_window, side="right")
+            tally["true_alerts"] += int((hi > lo).sum())
+            # First alert inside each outbreak's window
+            first = np.searchsorted(alerts, starts - options.lead_window, side="left")
+            ok = first < len(alerts)
+            first_alert = np.where(ok, alerts[np.minimum(first, len(alerts) - 1)], np.inf)
+            caught = ok & (first_alert <= starts + options.grace)
+            tally["caught"] += int(caught.sum())
+            tally["lead_hours"].extend(((starts - first_alert)[caught] / HOUR).tolist())
+    return tallies
+
+
+def _score_chunk(args):
+    return score_partition(*args)
+
+
+def run(histories, rules, options, workers=None):
+    """Score every rule over all villages, partitioned across a process pool."""
+    workers = workers or multiprocessing.cpu_count()
+    partitions = [histories[i::workers * 4] for i in range(workers * 4)]
+    partitions = [p for p in partitions if p]
+    if workers == 1 or len(partitions) <= 1:
+        results = [score_partition(p, rules, options) for p in partitions]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(_score_chunk, [(p, rules, options) for p in partitions]))
+
+    summary = {}
+    for rule in rules:
+        total = {"alerts": 0, "true_alerts": 0, "outbreaks": 0, "caught": 0, "lead_hours": []}
+        for result in results:
+            for key, value in result[rule.label].items():
+                total[key] += value
+        lead = np.array(total.pop("lead_hours"))
+        total["precision"] = total["true_alerts"] / total["alerts"] if total["alerts"] else None
+        total["recall"] = total["caught"] / total["outbreaks"] if total["outbreaks"] else None
+        total["lead_hours_median"] = float(np.median(lead)) if len(lead) else None
+        total["lead_hours_mean"] = float(lead.mean()) if len(lead) else None
+        summary[rule.label] = total
+    return summary
+
+
+# ----------------------------
+# LOADING
+# ----------------------------
+def _epoch(values):
+    return np.fromiter((v.timestamp() for v in values), dtype=np.float64, count=len(values))
+
+
+def load_history(since=None, until=None):
+    """Read WaterQuality and SymptomReport history into column arrays."""
+    from .models import SymptomReport, WaterQuality
+
+    readings = WaterQuality.objects.filter(village_ref__isnull=False)
+    reports = SymptomReport.objects.filter(village_ref__isnull=False)
+    if since:
+        readings, reports = readings.filter(timestamp__gte=since), reports.filter(reported_at__gte=since)
+    if until:
+        readings, reports = readings.filter(timestamp__lt=until), reports.filter(reported_at__lt=until)
+
+    rows = list(readings.values_list("village_ref_id", "timestamp", "ph", "turbidity", "tds").iterator(chunk_size=20000))
+    village, ts, ph, turbidity, tds = zip(*rows) if rows else ((),) * 5
+    reading_cols = {
+        "village": np.array(village, dtype=np.int64), "t": _epoch(ts),
+        "ph": np.array(ph, dtype=np.float64), "turbidity": np.array(turbidity, dtype=np.float64),
+        "tds": np.array(tds, dtype=np.float64),
+    }
+
+    rows = list(reports.values_list("village_ref_id", "reported_at", "symptoms").iterator(chunk_size=20000))
+    village, ts, symptoms = zip(*rows) if rows else ((),) * 3
+    symptoms = [s.lower() for s in symptoms]
+    report_cols = {
+        "village": np.array(village, dtype=np.int64), "t": _epoch(ts),
+        "diarrhea": np.array(["diarrhea" in s for s in symptoms], dtype=bool),
+        "fever": np.array(["fever" in s for s in symptoms], dtype=bool),
+    }
+    return reading_cols, report_cols
+
+
+def synthetic_history(rows, villages=None, days=180, seed=0):
+    """
+    Random history with about `rows` readings plus reports. Some villages
+    get contamination episodes: water goes bad a few days before a burst
+    of reports, so good rules can catch them early.
+    """
+    rng = np.random.default_rng(seed)
+    villages = villages or max(rows // 500, 1)
+    span = days * DAY
+    village = rng.integers(1, villages + 1, rows)
+    t = rng.uniform(0, span, rows)
+    ph = rng.normal(7.3, 0.35, rows)
+    turbidity = np.abs(rng.normal(2.5, 1.2, rows))
+    tds = np.abs(rng.normal(280, 80, rows))
+
+    # Background reports: ~0.5 per village-week
+    n_bg = int(villages * days / 14)
+    rep_village = [rng.integers(1, villages + 1, n_bg)]
+    rep_t = [rng.uniform(0, span, n_bg)]
+
+    # Episodes in 20% of villages
+    episodes = rng.choice(np.arange(1, villages + 1), size=max(villages // 5, 1), replace=False)
+    onset = rng.uniform(14 * DAY, span - 14 * DAY, len(episodes))
+    lookup = np.zeros(villages + 1)
+    lookup[episodes] = onset
+    bad = (lookup[village] > 0) & (t > lookup[village]) & (t < lookup[village] + 5 * DAY)
+    turbidity[bad] += rng.uniform(3, 9, bad.sum())
+    tds[bad] += rng.uniform(150, 500, bad.sum())
+    for v, start in zip(episodes, onset):
+        n = rng.integers(4, 12)
+        rep_village.append(np.full(n, v))
+        rep_t.append(start + rng.uniform(1 * DAY, 6 * DAY, n))
+
+    rep_village, rep_t = np.concatenate(rep_village), np.concatenate(rep_t)
+    symptom = rng.random(len(rep_t))
+    readings = {"village": village, "t": t, "ph": ph, "turbidity": turbidity, "tds": tds}
+    reports = {"village": rep_village.astype(np.int64), "t": rep_t,
+               "diarrhea": symptom < 0.5, "fever": symptom >= 0.4}
+    return readings, reports
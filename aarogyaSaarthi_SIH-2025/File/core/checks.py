@@ -0,0 +1,27 @@
+# core/checks.py
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Ring buffers, the place index and dashboard fragments learn of writes
+    made by other processes through version tokens in the default cache, so
+    outside DEBUG that cache must be shared between processes.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"The default cache ({backend}) is local to each process.",
+        hint="Use Redis (ASAARTHI_REDIS_URL) or a file/database cache so every "
+             "worker sees the version tokens bumped by the others.",
+        id="core.E001",
+    )]
@@ -0,0 +1,187 @@
+# core/db_routers.py
+# Read/write splitting between the primary database and an optional read
+# replica (the "replica" alias in settings.DATABASES).
+#
+# Writes always go to the primary. Reads go to the replica only while a
+# request for one of the read-heavy views below is being handled (or inside
+# `reading_from_replica()`), and only while the replica is no further behind
+# than settings.REPLICA_MAX_LAG seconds; otherwise they stay on the primary.
+# A client that just wrote (any non-GET request) is pinned to the primary for
+# REPLICA_MAX_LAG seconds by a cookie, so it reads its own writes.
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+PRIMARY_DB = DEFAULT_DB_ALIAS
+REPLICA_DB = "replica"
+
+# URL names whose GET requests may read from the replica
+REPLICA_VIEWS = {
+    "dashboard",
+    "dashboard_fragment",
+    "api_summary",
+    "alerts_api",
+    "forecast_api",
+    "report_cube_api",
+    "water_list_api",
+    "report_list_api",
+    "alert_list_api",
+}
+
+# Cookie holding the epoch time until which a client reads from the primary
+PIN_COOKIE = "read_primary_until"
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+# ----------------------------
+# REPLICATION LAG
+# ----------------------------
+class ReplicaLagMonitor:
+    """
+    Estimates replica lag from a heartbeat row: each check reads the row
+    from both databases, then rewrites it on the primary with the current
+    time. The difference between the two copies is how far the replica is
+    behind, to within one check interval. Checks run at most once per
+    settings.REPLICA_LAG_CHECK_INTERVAL seconds per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lag = None
+        self._checked_at = None
+
+    def _measure(self):
+        from .models import ReplicaHeartbeat
+
+        try:
+            primary = ReplicaHeartbeat.objects.using(PRIMARY_DB).filter(pk=1).values_list("beat_at", flat=True).first()
+            replica = ReplicaHeartbeat.objects.using(REPLICA_DB).filter(pk=1).values_list("beat_at", flat=True).first()
+            ReplicaHeartbeat.objects.using(PRIMARY_DB).update_or_create(pk=1, defaults={"beat_at": timezone.now()})
+        except DatabaseError:
+            return None  # replica unreachable or not migrated yet
+        if primary is None or replica is None:
+            return None  # first beat has not replicated yet
+        return max((primary - replica).total_seconds(), 0.0)
+
+    def lag(self):
+        """Last measured lag in seconds, or None if unknown."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+                    self._lag = self._measure()
+                    self._checked_at = now
+        return self._lag
+
+    def reset(self):
+        with self._lock:
+            self._lag = None
+            self._checked_at = None
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+def replica_configured():
+    return REPLICA_DB in settings.DATABASES
+
+
+def replica_usable():
+    """True if a replica is configured and within the allowed lag."""
+    if not replica_configured():
+        return False
+    lag = lag_monitor.lag()
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG
+
+
+@contextmanager
+def reading_from_replica():
+    """
+    Send reads inside the block to the replica when it is usable, e.g. for
+    exports run from management commands. Writes still go to the primary.
+    """
+    token = _read_alias.set(REPLICA_DB if replica_usable() else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+# ----------------------------
+# ROUTER
+# ----------------------------
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()  # None falls through to the primary
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # both aliases hold the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        return db == PRIMARY_DB
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+def _is_replica_view(request):
+    match = request.resolver_match
+    if match is None:
+        return False
+    if match.namespace == "admin":
+        return (match.url_name or "").endswith("_changelist")
+    return match.url_name in REPLICA_VIEWS
+
+
+def _pinned_to_primary(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadReplicaMiddleware:
+    """
+    Routes reads of GET/HEAD requests to read-heavy views to the replica,
+    except for clients pinned to the primary by a recent write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request.replica_token is not None:
+                _read_alias.reset(request.replica_token)
+        if request.method not in ("GET", "HEAD") and replica_configured():
+            lag = settings.REPLICA_MAX_LAG
+            response.set_cookie(PIN_COOKIE, str(time.time() + lag), max_age=math.ceil(lag),
+                                httponly=True, samesite="Lax")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD") or not _is_replica_view(request):
+            return None
+        if _pinned_to_primary(request) or not replica_usable():
+            return None
+        # Load the session user from the primary: a just-created session
+        # may not have reached the replica yet
+        if hasattr(request, "user"):
+            request.user.is_authenticated  # evaluates the lazy user
+        request.replica_token = _read_alias.set(REPLICA_DB)
+        return None
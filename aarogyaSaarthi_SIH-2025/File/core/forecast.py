@@ -0,0 +1,208 @@
+# core/forecast.py
+# Short-range water quality forecasts for every village at once.
+#
+# Readings are binned into an hourly (series x hours) matrix, one series
+# per village and metric, and a damped-trend Holt-Winters model with a
+# daily season is fitted to all series together: the smoothing recursion
+# loops over hours only, with every series and every candidate parameter
+# set updated in one array operation. Each series keeps the parameters with
+# the lowest one-step-ahead squared error.
+
+import itertools
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import WaterQuality, WaterForecast
+
+METRICS = ("ph", "turbidity", "tds")
+SEASON = 24          # hours
+HISTORY_DAYS = 7
+MIN_HISTORY_DAYS = 2  # one season to initialise from, one to fit on
+HORIZON = 72         # hours
+DAMPING = 0.95       # keeps the trend from running away over three days
+
+ALPHAS = (0.1, 0.3, 0.6)
+BETAS = (0.01, 0.1)
+GAMMAS = (0.05, 0.3)
+
+# Physical bounds the forecasts are clipped to
+BOUNDS = {"ph": (0.0, 14.0), "turbidity": (0.0, None), "tds": (0.0, None)}
+
+
+# ----------------------------
+# DATA
+# ----------------------------
+def fill_gaps(y):
+    """
+    Forward-fill NaNs along the time axis of a (series, hours) matrix,
+    then back-fill leading NaNs with each series' first value.
+    """
+    mask = np.isnan(y)
+    idx = np.where(mask, 0, np.arange(y.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = y[np.arange(y.shape[0])[:, None], idx]
+    first = np.argmax(~mask, axis=1)
+    lead = np.arange(y.shape[1]) < first[:, None]
+    return np.where(lead, y[np.arange(y.shape[0]), first][:, None], out)
+
+
+def hourly_matrix(end, days=HISTORY_DAYS):
+    """
+    Hourly mean readings for the `days` before `end` (an hour boundary).
+    Returns (village_ids, array of shape (villages, len(METRICS), hours))
+    with NaN for hours without readings; villages with no readings in the
+    window are left out.
+    """
+    start = end - timedelta(days=days)
+    hours = days * 24
+    rows = (
+        WaterQuality.objects
+        .filter(timestamp__gte=start, timestamp__lt=end, village_ref__isnull=False)
+        .annotate(hour=TruncHour("timestamp"))
+        .values_list("village_ref_id", "hour")
+        .annotate(*(Avg(m) for m in METRICS))
+    )
+    rows = list(rows)
+    if not rows:
+        return np.array([], dtype=np.int64), np.empty((0, len(METRICS), hours))
+
+    village_col = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    hour_col = np.fromiter(((r[1] - start).total_seconds() // 3600 for r in rows), dtype=np.int64, count=len(rows))
+    values = np.array([r[2:] for r in rows], dtype=np.float64)
+
+    village_ids, row_idx = np.unique(village_col, return_inverse=True)
+    data = np.full((len(village_ids), len(METRICS), hours), np.nan)
+    data[row_idx, :, hour_col] = values
+    return village_ids, data
+
+
+# ----------------------------
+# MODEL
+# ----------------------------
+def holt_winters(y, horizon=HORIZON, season=SEASON):
+    """
+    Fit damped additive Holt-Winters to every row of `y` (series, hours;
+    no NaNs, at least one full season) and return forecasts of shape
+    (series, horizon). Every (alpha, beta, gamma) in the grid is run for
+    every series in the same pass; the best one-step fit per series wins.
+    """
+    n_series, n_hours = y.shape
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+    alpha, beta, gamma = (grid[:, i][None, :] for i in range(3))  # (1, grid)
+    n_grid = len(grid)
+
+    # Initial state from the first season (and the second, for the trend)
+    first = y[:, :season].mean(axis=1)
+    if n_hours >= 2 * season:
+        trend0 = (y[:, season:2 * season].mean(axis=1) - first) / season
+    else:
+        trend0 = np.zeros(n_series)
+    level = np.repeat(first[:, None], n_grid, axis=1)                          # (series, grid)
+    trend = np.repeat(trend0[:, None], n_grid, axis=1)
+    # Season-major so each hour's update touches one contiguous block
+    seasonal = np.repeat((y[:, :season] - first[:, None]).T[:, :, None], n_grid, axis=2)  # (season, series, grid)
+    sse = np.zeros((n_series, n_grid))
+
+    # Error-correction form of the update equations, written in place:
+    #   level  = prediction + alpha * err
+    #   trend  = phi * trend + alpha * beta * err
+    #   season = season + gamma * (1 - alpha) * err
+    alpha_beta = alpha * beta
+    gamma_season = gamma * (1 - alpha)
+    by_hour = np.ascontiguousarray(y.T)
+    err = np.empty_like(level)
+    step = np.empty_like(level)
+    for t in range(season, n_hours):
+        s = seasonal[t % season]
+        trend *= DAMPING
+        level += trend                      # level now holds the level+trend forecast
+        np.subtract(by_hour[t, :, None], level, out=err)
+        err -= s
+        np.multiply(err, err, out=step)
+        sse += step
+        np.multiply(alpha, err, out=step)
+        level += step
+        np.multiply(alpha_beta, err, out=step)
+        trend += step
+        np.multiply(gamma_season, err, out=step)
+        s += step
+
+    best = sse.argmin(axis=1)
+    rows = np.arange(n_series)
+    level, trend, seasonal = level[rows, best], trend[rows, best], seasonal[:, rows, best].T
+
+    steps = np.arange(1, horizon + 1)
+    damped = np.cumsum(DAMPING ** steps)                 # phi + phi^2 + ... + phi^h
+    season_idx = (n_hours - 1 + steps) % season
+    return level[:, None] + damped[None, :] * trend[:, None] + seasonal[:, season_idx]
+
+
+def unsafe_mask(forecast):
+    """
+    Vectorised "unsafe" rule of utils.get_water_status over an array whose
+    last axis is (ph, turbidity, tds).
+    """
+    ph, turbidity, tds = forecast[..., 0], forecast[..., 1], forecast[..., 2]
+    return (ph < 6.5) | (ph > 8.5) | (turbidity > 10) | (tds > 1000)
+
+
+def forecast_villages(data, horizon=HORIZON):
+    """
+    Forecast a (villages, metrics, hours) matrix from `hourly_matrix`.
+    Returns float32 forecasts of shape (villages, horizon, metrics).
+    """
+    n_villages, n_metrics, n_hours = data.shape
+    series = fill_gaps(data.reshape(n_villages * n_metrics, n_hours))
+    forecast = holt_winters(series, horizon).reshape(n_villages, n_metrics, horizon)
+    for i, metric in enumerate(METRICS):
+        low, high = BOUNDS[metric]
+        np.clip(forecast[:, i], low, high, out=forecast[:, i])
+    return forecast.transpose(0, 2, 1).astype(np.float32)
+
+
+# ----------------------------
+# RUN + STORE
+# ----------------------------
+def refresh_forecasts(horizon=HORIZON, days=HISTORY_DAYS, now=None):
+    """
+    Refit every village with readings in the last `days` and replace the
+    stored forecasts. Returns the number of villages forecast.
+    """
+    now = now or timezone.now()
+    end = now.replace(minute=0, second=0, microsecond=0)
+    village_ids, data = hourly_matrix(end, days)
+    forecasts = forecast_villages(data, horizon) if len(village_ids) else np.empty((0, horizon, len(METRICS)))
+    unsafe = unsafe_mask(forecasts)
+    first_unsafe = np.where(unsafe.any(axis=1), unsafe.argmax(axis=1), -1)
+
+    rows = [
+        WaterForecast(
+            village_ref_id=int(vid),
+            issued_at=now,
+            starts_at=end,
+            hours=horizon,
+            values=forecasts[i].tobytes(),
+            unsafe_from=end + timedelta(hours=int(first_unsafe[i])) if first_unsafe[i] >= 0 else None,
+        )
+        for i, vid in enumerate(village_ids)
+    ]
+    with transaction.atomic():
+        WaterForecast.objects.all().delete()
+        WaterForecast.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def forecast_values(forecast, hours=None):
+    """Decode a stored forecast into a list of hourly dicts."""
+    values = np.frombuffer(bytes(forecast.values), dtype=np.float32).reshape(forecast.hours, len(METRICS))
+    if hours is not None:
+        values = values[:hours]
+    return [
+        {"time": forecast.starts_at + timedelta(hours=h), **dict(zip(METRICS, map(float, row)))}
+        for h, row in enumerate(values)
+    ]
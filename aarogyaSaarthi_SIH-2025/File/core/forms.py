@@ -4,6 +4,8 @@ from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import AuthenticationForm
 from .models import SymptomReport
+from .places import get_index as place_index, find_registered
+from .registry import resolve_village
 
 # ----------------------------
 # USER REGISTRATION FORM
@@ -35,7 +37,16 @@ class LoginForm(AuthenticationForm):
 # ----------------------------
 # SYMPTOM REPORT FORM
 # ----------------------------
+def _unknown(label, value, suggestions):
+    message = f"Unknown {label} '{value}'."
+    if suggestions:
+        message += f" Did you mean {', '.join(p.name for p in suggestions)}?"
+    return message
+
+
 class SymptomReportForm(forms.ModelForm):
+    new_village = forms.BooleanField(required=False, label="This village is not on the list yet")
+
     class Meta:
         model = SymptomReport
         fields = [
@@ -44,3 +55,52 @@ class SymptomReportForm(forms.ModelForm):
             "symptoms", "disease", "water_source",
             "image", "remarks"
         ]
+
+    def clean(self):
+        """
+        Check state, district and village against the known places and use
+        their registered spelling. A village not on the list is only taken
+        as new when `new_village` is ticked; similar known villages are
+        suggested in the error.
+        """
+        cleaned = super().clean()
+        state, district, village = (cleaned.get(f) for f in ("state", "district", "village"))
+        if not (state and district and village):
+            return cleaned
+        index = place_index()
+
+        # A miss is checked against the registry: the place may have been
+        # added by another process since this index was built
+        known_state = index.get("state", state, state) or find_registered("state", state)
+        if known_state is None:
+            self.add_error("state", _unknown("state", state, index.similar(state, kind="state", limit=3)))
+            return cleaned
+        cleaned["state"] = state = known_state.name
+
+        known_district = index.get("district", district, state) or find_registered("district", district, state)
+        if known_district is None:
+            suggestions = index.similar(district, kind="district", state=state, limit=3)
+            self.add_error("district", _unknown("district", district, suggestions))
+            return cleaned
+        cleaned["district"] = district = known_district.name
+
+        known_village = (
+            index.get("village", village, state, district)
+            or find_registered("village", village, state, district)
+        )
+        if known_village is not None:
+            cleaned["village"] = known_village.name
+        elif not cleaned.get("new_village"):
+            suggestions = index.similar(village, kind="village", state=state, district=district, limit=3)
+            message = _unknown("village", village, suggestions)
+            self.add_error("village", f"{message} Tick \"{self.fields['new_village'].label}\" to add it.")
+        return cleaned
+
+    def save(self, commit=True):
+        """Link the report to its registry Village before saving."""
+        report = super().save(commit=False)
+        report.village_ref_id = resolve_village(report.village, report.district, report.state)
+        if commit:
+            report.save()
+            self._save_m2m()
+        return report
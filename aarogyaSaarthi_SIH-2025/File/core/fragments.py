@@ -0,0 +1,42 @@
+# core/fragments.py
+# Cache keys for the independently loaded dashboard fragments.
+
+import time
+
+from django.core.cache import cache
+
+from .models import WaterQuality, SymptomReport
+
+# Fragment name -> models whose writes make it stale
+DASHBOARD_FRAGMENTS = {
+    "recent_readings": (WaterQuality,),
+    "recent_reports": (SymptomReport,),
+    "chart": (SymptomReport,),
+    "map": (WaterQuality, SymptomReport),
+}
+
+# Upper bound on staleness for changes that bypass signals (bulk updates,
+# day rollover of the weekly chart)
+FRAGMENT_TTL = 300
+
+
+def _version_key(name):
+    return f"dashboard:fragment:{name}:version"
+
+
+def fragment_cache_key(name):
+    """
+    Cache key of a fragment's current rendering. Each fragment has its own
+    version counter, so invalidating one leaves the others cached.
+    """
+    version = cache.get_or_set(_version_key(name), time.time_ns, None)
+    return f"dashboard:fragment:{name}:{version}"
+
+
+def invalidate_fragments(model):
+    """
+    Bump the version of every fragment built from `model`.
+    """
+    for name, models in DASHBOARD_FRAGMENTS.items():
+        if model in models:
+            cache.set(_version_key(name), time.time_ns(), None)
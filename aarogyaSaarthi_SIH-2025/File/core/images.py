@@ -0,0 +1,123 @@
+# core/images.py
+# Post-upload processing of symptom report photos, run off the request path.
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from .models import SymptomReport
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_SIDE = 1600
+THUMB_MAX_SIDE = 320
+IMAGE_QUALITY = 80
+
+# Small pool: Pillow releases the GIL while decoding/encoding
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-images")
+
+
+# ----------------------------
+# SCHEDULING
+# ----------------------------
+def schedule_report_image(report_id):
+    """
+    Queue a report's photo for processing once the saving transaction commits,
+    so the request returns as soon as the original file is stored.
+    """
+    transaction.on_commit(lambda: _executor.submit(process_report_image, report_id))
+
+
+# ----------------------------
+# ENCODING HELPERS
+# ----------------------------
+def _encode(img, max_side):
+    """
+    Downscale a copy of the image and re-encode it without metadata.
+    Returns (bytes, extension); WebP when Pillow supports it, else JPEG.
+    """
+    from PIL import Image, features
+
+    img = img.copy()
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    out = BytesIO()
+    if features.check("webp"):
+        img.save(out, "WEBP", quality=IMAGE_QUALITY, method=4)
+        return out.getvalue(), "webp"
+    img.save(out, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    return out.getvalue(), "jpg"
+
+
+def _store(storage, name, data):
+    """
+    Save `data` under a content-addressed `name`, reusing the file if it is
+    already there. When a concurrent upload of the same photo saves it
+    first, storage picks a new name for our copy; that copy is deleted and
+    the existing file used instead.
+    """
+    if storage.exists(name):
+        return name
+    saved = storage.save(name, ContentFile(data))
+    if saved != name:
+        storage.delete(saved)
+    return name
+
+
+# ----------------------------
+# PIPELINE
+# ----------------------------
+def process_report_image(report_id):
+    """
+    Downscale, strip EXIF, re-encode and thumbnail a report's photo.
+    Photos whose content hash matches an already processed report reuse
+    that report's files instead of being stored again. Returns False if
+    the photo could not be processed (the reason is logged).
+    """
+    try:
+        report = SymptomReport.objects.filter(pk=report_id).first()
+        if not report or not report.image or report.image_hash:
+            return True
+
+        original_name = report.image.name
+        storage = report.image.storage
+        with storage.open(original_name, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        twin = (SymptomReport.objects.filter(image_hash=digest)
+                .exclude(pk=report_id).exclude(thumbnail="").exclude(thumbnail=None).first())
+        if twin:
+            image_name, thumb_name = twin.image.name, twin.thumbnail.name
+        else:
+            # Pillow is imported on first use to keep it out of worker start-up
+            from PIL import Image, ImageOps
+
+            try:
+                img = Image.open(BytesIO(raw))
+                # Apply the EXIF orientation before the metadata is dropped
+                img = ImageOps.exif_transpose(img).convert("RGB")
+            except Exception as e:
+                logger.warning("Could not decode image for report %s: %s", report_id, e)
+                SymptomReport.objects.filter(pk=report_id).update(image_hash=digest)
+                return False
+            main, ext = _encode(img, IMAGE_MAX_SIDE)
+            thumb, _ = _encode(img, THUMB_MAX_SIDE)
+            image_name = _store(storage, f"reports/{digest[:32]}.{ext}", main)
+            thumb_name = _store(storage, f"reports/thumbs/{digest[:32]}.{ext}", thumb)
+
+        SymptomReport.objects.filter(pk=report_id).update(
+            image=image_name, thumbnail=thumb_name, image_hash=digest
+        )
+        if original_name != image_name:
+            storage.delete(original_name)
+        return True
+    except Exception:
+        logger.exception("Image processing failed for report %s", report_id)
+        return False
+    finally:
+        # Worker threads hold their own DB connections
+        connection.close()
@@ -0,0 +1,247 @@
+# core/ingest.py
+# Shared validation for sensor readings, plus the compact binary wire format
+# used by the `ingest_listener` gateway path.
+
+import hashlib
+import hmac
+import math
+import struct
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import IntegrityError, transaction
+
+from .fragments import invalidate_fragments
+from .models import WaterQuality
+from .registry import resolve_village, village_name
+from .sensors import sensor_by_id, record_readings
+from .timeseries import recent_readings
+
+# ----------------------------
+# VALIDATION
+# ----------------------------
+def _float(data, key, low=None, high=None, required=True):
+    value = data.get(key)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    value = float(value)
+    if not math.isfinite(value):
+        if required:
+            raise ValueError(f"{key} must be a finite number")
+        return None  # NaN marks "not sent" for optional binary fields
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f"{key}={value} out of range")
+    return value
+
+
+def reading_from_payload(data, sensor=None):
+    """
+    Validate one sensor reading and return an unsaved WaterQuality.
+    `data` names the village either by "village" (+ optional "state") or by
+    registry "village_id", falling back to the sensor's village;
+    "timestamp" (epoch seconds) and "seq" are optional.
+    Raises ValueError on bad input.
+    """
+    lat = _float(data, "lat", -90, 90, required=False)
+    lng = _float(data, "lng", -180, 180, required=False)
+
+    if not data.get("village_id") and not data.get("village") and sensor and sensor.village_id:
+        data = dict(data, village_id=sensor.village_id)
+
+    if data.get("village_id"):
+        village_id = int(data["village_id"])
+        village = village_name(village_id)
+        if village is None:
+            raise ValueError(f"Unknown village_id {village_id}")
+    else:
+        village = data.get("village")
+        village_id = resolve_village(village, state=data.get("state"), lat=lat, lng=lng)
+        if village_id is None:
+            raise ValueError("village is required")
+
+    reading = WaterQuality(
+        village=village,
+        village_ref_id=village_id,
+        ph=_float(data, "ph", 0, 14),
+        turbidity=_float(data, "turbidity", 0),
+        tds=_float(data, "tds", 0),
+        lat=lat,
+        lng=lng,
+    )
+    ts = _float(data, "timestamp", 0, required=False)
+    if ts:
+        reading.timestamp = datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+    if sensor is not None:
+        reading.sensor_id = sensor.pk
+        if data.get("seq") is not None:
+            reading.seq = int(data["seq"])
+            if reading.seq < 0:
+                raise ValueError("seq must not be negative")
+    return reading
+
+
+def drop_stored(readings):
+    """
+    Readings whose (sensor, seq) is neither stored yet nor repeated earlier
+    in `readings`, with one indexed query.
+    """
+    keyed = [r for r in readings if r.sensor_id is not None and r.seq is not None]
+    if not keyed:
+        return list(readings)
+    seen = set(
+        WaterQuality.objects.filter(
+            sensor_id__in={r.sensor_id for r in keyed}, seq__in={r.seq for r in keyed},
+        ).values_list("sensor_id", "seq")
+    )
+    fresh = []
+    for r in readings:
+        if r.sensor_id is not None and r.seq is not None:
+            if (r.sensor_id, r.seq) in seen:
+                continue
+            seen.add((r.sensor_id, r.seq))
+        fresh.append(r)
+    return fresh
+
+
+def write_readings(readings):
+    """
+    Insert validated readings in one statement, skipping retries of an
+    already stored (sensor, seq) pair. Returns the readings stored; the
+    rest were duplicates.
+    """
+    fresh = drop_stored(readings)
+    try:
+        with transaction.atomic():
+            WaterQuality.objects.bulk_create(fresh)
+    except IntegrityError:
+        # A concurrent writer stored some of the same pairs in between
+        fresh = drop_stored(fresh)
+        WaterQuality.objects.bulk_create(fresh, ignore_conflicts=True)
+    if not fresh:
+        return fresh
+    # bulk_create skips post_save signals
+    invalidate_fragments(WaterQuality)
+    record_readings(fresh)
+    recent_readings.append(fresh)
+    return fresh
+
+
+def is_stored(sensor, seq):
+    """True when `sensor` already has a reading with sequence number `seq`."""
+    return seq is not None and WaterQuality.objects.filter(sensor=sensor, seq=seq).exists()
+
+
+# ----------------------------
+# BINARY WIRE FORMAT
+# ----------------------------
+# Frame = header + `count` fixed-size little-endian records + tag. The tag
+# is an HMAC-SHA256 of header and records keyed on the sending sensor's API
+# key, so only registered sensors can send and every record must carry the
+# header's sensor id; a replayed frame only repeats stored (sensor, seq)
+# pairs. Over UDP each datagram is one frame; over TCP frames are sent back
+# to back and each is acknowledged, once committed, with a header whose
+# count is the number of records stored (neither rejected nor already
+# stored).
+MAGIC = b"AS"
+VERSION = 2
+HEADER = struct.Struct("<2sBHI")  # magic, version, record count, sensor id
+TAG_SIZE = hashlib.sha256().digest_size
+
+RECORD = np.dtype([
+    ("sensor_id", "<u4"),
+    ("seq", "<u4"),
+    ("timestamp", "<f8"),   # epoch seconds
+    ("village_id", "<u4"),  # registry Village id
+    ("ph", "<f4"),
+    ("turbidity", "<f4"),
+    ("tds", "<f4"),
+    ("lat", "<f4"),         # NaN when unknown
+    ("lng", "<f4"),
+])
+RECORD_STRUCT = struct.Struct("<IIdIfffff")
+assert RECORD_STRUCT.size == RECORD.itemsize
+
+MAX_RECORDS_PER_FRAME = 1024
+
+
+def parse_header(buf):
+    """
+    Return (record count, sensor id) of a frame header, validating magic
+    and version.
+    """
+    if len(buf) < HEADER.size:
+        raise ValueError("Truncated frame")
+    magic, version, count, sensor_id = HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Bad frame header")
+    if count > MAX_RECORDS_PER_FRAME:
+        raise ValueError(f"Frame holds {count} records, limit is {MAX_RECORDS_PER_FRAME}")
+    return count, sensor_id
+
+
+def sign(api_key, data):
+    return hmac.new(api_key.encode(), data, hashlib.sha256).digest()
+
+
+def decode_records(buf, count, offset=0):
+    """
+    View `count` records of `buf` starting at `offset` as a structured
+    array. No bytes are copied: the array is backed by `buf`.
+    """
+    if len(buf) - offset < count * RECORD.itemsize:
+        raise ValueError("Truncated frame")
+    return np.frombuffer(memoryview(buf), dtype=RECORD, count=count, offset=offset)
+
+
+def split_frame(buf):
+    """Split a complete frame (one datagram) into header, records and tag."""
+    count, _ = parse_header(buf)
+    end = HEADER.size + count * RECORD.itemsize
+    if len(buf) != end + TAG_SIZE:
+        raise ValueError("Frame length does not match its header")
+    view = memoryview(buf)
+    return view[:HEADER.size], view[HEADER.size:end], view[end:]
+
+
+def open_frame(header, body, tag):
+    """
+    Authenticate a frame and decode its records. Returns (sensor,
+    records); raises ValueError for an unknown sensor or a bad tag.
+    """
+    count, sensor_id = parse_header(header)
+    sensor = sensor_by_id(sensor_id) if sensor_id else None
+    if sensor is None or not hmac.compare_digest(bytes(tag), sign(sensor.api_key, bytes(header) + bytes(body))):
+        raise ValueError("Frame is not signed by a registered sensor")
+    return sensor, decode_records(body, count)
+
+
+def encode_frame(records, sensor_id, api_key):
+    """
+    Build a frame signed with `api_key` from (seq, timestamp, village_id,
+    ph, turbidity, tds, lat, lng) tuples sent by sensor `sensor_id`.
+    """
+    parts = [HEADER.pack(MAGIC, VERSION, len(records), sensor_id)]
+    parts.extend(RECORD_STRUCT.pack(sensor_id, *r) for r in records)
+    data = b"".join(parts)
+    return data + sign(api_key, data)
+
+
+def readings_from_records(records, sensor):
+    """
+    Validate decoded records from an authenticated `sensor` through
+    `reading_from_payload`, the same path as the JSON API. Records naming
+    another sensor are rejected. Returns (readings, number rejected).
+    """
+    readings, rejected = [], 0
+    for row in records.tolist():
+        data = dict(zip(RECORD.names, row))
+        if data["sensor_id"] != sensor.pk:
+            rejected += 1
+            continue
+        try:
+            readings.append(reading_from_payload(data, sensor))
+        except (TypeError, ValueError):
+            rejected += 1
+    return readings, rejected
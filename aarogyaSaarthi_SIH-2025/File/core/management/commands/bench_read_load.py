@@ -0,0 +1,106 @@
+# core/management/commands/bench_read_load.py
+
+import multiprocessing
+import time
+
+import django
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from core.admission import writer as ingest_writer
+from core.db_routers import replica_configured, replica_usable
+from core.models import Sensor, WaterQuality
+
+READ_URLS = ["/api/summary/", "/api/alerts/", "/api/v1/water/", "/api/v1/reports/"]
+
+
+def _reader(stop_at, username):
+    """Request the read-heavy endpoints in a loop until `stop_at`."""
+    client = Client(HTTP_HOST="localhost")
+    client.force_login(User.objects.get(username=username))  # the reports API needs a login
+    done = 0
+    while time.time() < stop_at:
+        client.get(READ_URLS[done % len(READ_URLS)])
+        done += 1
+    return done
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure sensor ingest latency (POST /api/water/post/, end to end until its commit "
+        "is acknowledged) while a growing "
+        "number of reader processes load the dashboard APIs. Run it with and "
+        "without ASAARTHI_REPLICA_DB (plus `sync_replica --interval 1`) to see "
+        "whether reads are isolated from writes. Writes benchmark rows, which "
+        "are removed afterwards; use a copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", default="0,1,2,4,8",
+                            help="Comma-separated reader process counts to step through.")
+        parser.add_argument("--duration", type=float, default=5, help="Seconds per step.")
+        parser.add_argument("--village", default="Bench Village")
+
+    @override_settings(INGEST_SENDER_RATE=0)  # one sensor posts flat out
+    def handle(self, *args, **options):
+        levels = [int(n) for n in options["readers"].split(",")]
+        sensor = Sensor.objects.create(name="read-load benchmark")
+        user = User.objects.create_user(f"bench-read-load-{sensor.pk}")
+        client = Client(HTTP_HOST="localhost")
+        seq = 0
+
+        # Warm up the router's lag check and the registry caches
+        replica = replica_configured() and replica_usable()
+        self.stdout.write(f"Replica: {'in use' if replica else 'not in use'}")
+        self.stdout.write(f"{'readers':>7} {'writes':>7} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            for readers in levels:
+                connections.close_all()
+                stop_at = time.time() + options["duration"]
+                with ctx.Pool(readers, initializer=django.setup) if readers else _NoPool() as pool:
+                    pending = [pool.apply_async(_reader, (stop_at, user.username)) for _ in range(readers)]
+                    latencies = []
+                    while time.time() < stop_at:
+                        seq += 1
+                        started = time.perf_counter()
+                        response = client.post(
+                            "/api/water/post/",
+                            {"village": options["village"], "seq": seq, "ph": 7.1, "turbidity": 2.0, "tds": 180},
+                            content_type="application/json",
+                            HTTP_X_SENSOR_KEY=sensor.api_key,
+                        )
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            self.stderr.write(f"Write failed: {response.status_code} {response.content[:200]!r}")
+                    reads = sum(p.get() for p in pending)
+                ms = np.array(latencies) * 1000
+                self.stdout.write(
+                    f"{readers:>7} {len(ms):>7} {reads / options['duration']:>8.0f} "
+                    f"{np.percentile(ms, 50):>8.1f} {np.percentile(ms, 99):>8.1f}"
+                )
+            metrics = ingest_writer.metrics()
+            self.stdout.write(
+                f"Ingest writer counters (per worker: this process pid {metrics['pid']} only): "
+                f"batches={metrics['batches']} written={metrics['written']} failed={metrics['failed']} "
+                f"rejected={metrics['rejected_queue_full'] + metrics['rejected_rate_limited']}"
+            )
+        finally:
+            ingest_writer.drain(timeout=60)  # timed-out rows must land before they are cleaned up
+            WaterQuality.objects.filter(sensor=sensor).delete()
+            sensor.delete()
+            user.delete()
+
+
+class _NoPool:
+    """Stand-in for a pool with no workers."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -0,0 +1,62 @@
+# core/management/commands/forecast_water.py
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forecast import HISTORY_DAYS, HORIZON, METRICS, MIN_HISTORY_DAYS, forecast_villages, refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the per-village water quality forecasts and store the next "
+        "--horizon hours. Run it from cron, or keep it running with --interval. "
+        "--benchmark N times a refit of N synthetic villages instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horizon", type=int, default=HORIZON, help="Hours to forecast (24-72 recommended).")
+        parser.add_argument("--days", type=int, default=HISTORY_DAYS, help="Days of history to fit on.")
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Repeat every N seconds (default: run once and exit).")
+        parser.add_argument("--benchmark", type=int, metavar="VILLAGES",
+                            help="Time a refit of this many synthetic villages; nothing is stored.")
+
+    def handle(self, *args, **options):
+        if options["days"] < MIN_HISTORY_DAYS:
+            raise CommandError(f"--days must be at least {MIN_HISTORY_DAYS}")
+        if options["horizon"] < 1:
+            raise CommandError("--horizon must be at least 1")
+        if options["benchmark"]:
+            return self.benchmark(options["benchmark"], options["horizon"], options["days"])
+
+        try:
+            while True:
+                started = time.monotonic()
+                count = refresh_forecasts(options["horizon"], options["days"])
+                self.stdout.write(f"Forecast {count} villages in {time.monotonic() - started:.2f}s")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+    def benchmark(self, villages, horizon, days):
+        rng = np.random.default_rng(0)
+        hours = days * 24
+        t = np.arange(hours)
+        daily = np.sin(2 * np.pi * t / 24)
+        base = np.array([7.2, 3.0, 250.0])[None, :, None]
+        swing = np.array([0.3, 1.0, 40.0])[None, :, None]
+        data = base + swing * daily + rng.normal(0, 0.1, (villages, len(METRICS), hours)) * swing
+        # Sensors drop out: about 10% of hours have no readings
+        data[rng.random(data.shape) < 0.1] = np.nan
+
+        started = time.perf_counter()
+        forecast = forecast_villages(data, horizon)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Refit {villages} villages x {len(METRICS)} metrics on {hours}h of history, "
+            f"{horizon}h ahead: {elapsed:.2f}s ({forecast.nbytes / villages:.0f} bytes stored per village)"
+        )
@@ -0,0 +1,210 @@
+# core/management/commands/ingest_listener.py
+
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.ingest import (
+    HEADER, MAGIC, VERSION, RECORD, TAG_SIZE,
+    parse_header, split_frame, open_frame, readings_from_records, write_readings,
+)
+
+logger = logging.getLogger(__name__)
+
+# Attempts per batch before its senders are told it failed
+WRITE_ATTEMPTS = 2
+
+
+def validate_frame(header, body, tag):
+    sensor, records = open_frame(header, body, tag)
+    return readings_from_records(records, sensor)
+
+
+def write_with_retry(batch):
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            return write_readings(batch)
+        except Exception:
+            connection.close()  # retry on a fresh connection
+            if attempt == WRITE_ATTEMPTS:
+                raise
+
+
+class BatchWriter:
+    """
+    Collects validated readings from all connections and writes them with
+    one bulk insert per `batch_size` rows or per `flush_ms`, whichever
+    comes first. Each caller of `add` waits until its readings are
+    committed (or the batch has failed).
+    """
+
+    def __init__(self, batch_size, flush_ms, stdout):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.stdout = stdout
+        self.pending = []
+        self.waiters = []  # (future, readings) resolved when `pending` is written
+        self.written = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failed = 0
+        self._lock = asyncio.Lock()
+
+    async def add(self, header, body, tag):
+        """
+        Authenticate a frame, validate its records, queue them and wait for
+        the flush that writes them. Returns how many were stored (not
+        rejected or already stored); raises ValueError for a frame that is
+        not properly signed and other errors if the write failed.
+        """
+        try:
+            readings, rejected = await sync_to_async(validate_frame)(header, body, tag)
+        except ValueError:
+            self.rejected += 1
+            raise
+        self.rejected += rejected
+        if not readings:
+            return 0
+        done = asyncio.get_running_loop().create_future()
+        self.pending.extend(readings)
+        self.waiters.append((done, readings))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+        return await done
+
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending = self.pending, []
+            waiters, self.waiters = self.waiters, []
+            if not batch:
+                return
+            try:
+                stored = await sync_to_async(write_with_retry)(batch)
+            except Exception as e:
+                logger.exception("Writing %d readings failed; not acknowledging them", len(batch))
+                self.failed += len(batch)
+                for done, _ in waiters:
+                    done.set_exception(e)
+                return
+            self.written += len(stored)
+            self.duplicates += len(batch) - len(stored)
+            stored = set(map(id, stored))
+            for done, readings in waiters:
+                done.set_result(sum(id(r) in stored for r in readings))
+
+    async def run_timer(self):
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - last_report >= 10:
+                self.stdout.write(f"written={self.written} duplicates={self.duplicates} rejected={self.rejected} failed={self.failed}")
+                last_report = time.monotonic()
+
+
+class UDPProtocol(asyncio.DatagramProtocol):
+    """
+    One frame per datagram; malformed or unsigned datagrams are dropped. UDP has no
+    acknowledgement, so frames that fail to be written are only logged.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.tasks = set()  # strong references until each add() finishes
+
+    def datagram_received(self, data, addr):
+        try:
+            frame = split_frame(data)
+        except ValueError:
+            self.writer.rejected += 1
+            return
+        task = asyncio.ensure_future(self.writer.add(*frame))
+        self.tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("UDP frame not written: %s", task.exception())
+
+
+class Command(BaseCommand):
+    help = (
+        "Listen for binary sensor frames (see core/ingest.py) over TCP or UDP "
+        "and batch-write them through the same validation as the JSON water API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1",
+                            help="Address to bind; use 0.0.0.0 to accept frames from other hosts.")
+        parser.add_argument("--port", type=int, default=9500)
+        parser.add_argument("--protocol", choices=["tcp", "udp"], default="tcp")
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per bulk insert.")
+        parser.add_argument("--flush-ms", type=int, default=200, help="Max delay before queued rows are written.")
+
+    def handle(self, *args, **options):
+        writer = BatchWriter(options["batch_size"], options["flush_ms"], self.stdout)
+        try:
+            asyncio.run(self.serve(writer, options))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write(
+                f"Stopped: written={writer.written} duplicates={writer.duplicates} "
+                f"rejected={writer.rejected} failed={writer.failed}"
+            )
+
+    async def serve(self, writer, options):
+        host, port = options["host"], options["port"]
+        timer = asyncio.create_task(writer.run_timer())
+        try:
+            if options["protocol"] == "udp":
+                loop = asyncio.get_running_loop()
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: UDPProtocol(writer), local_addr=(host, port)
+                )
+                self.stdout.write(f"Listening for UDP frames on {host}:{port}")
+                try:
+                    await asyncio.Event().wait()
+                finally:
+                    transport.close()
+            else:
+                server = await asyncio.start_server(
+                    lambda r, w: self.handle_tcp(writer, r, w), host, port
+                )
+                self.stdout.write(f"Listening for TCP frames on {host}:{port}")
+                async with server:
+                    await server.serve_forever()
+        finally:
+            timer.cancel()
+            await writer.flush()
+
+    async def handle_tcp(self, writer, reader, stream):
+        """
+        Read frames until the gateway disconnects, acknowledging each one
+        once its readings are committed. If the write fails the connection
+        is closed without an acknowledgement, so the gateway resends.
+        """
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                count, sensor_id = parse_header(header)
+                body = await reader.readexactly(count * RECORD.itemsize)
+                tag = await reader.readexactly(TAG_SIZE)
+                stored = await writer.add(header, body, tag)
+                stream.write(HEADER.pack(MAGIC, VERSION, stored, sensor_id))
+                await stream.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            # Framing is lost after a bad header, and a sender that fails
+            # authentication gets no further hearing; drop the connection
+            self.stderr.write(f"Closing connection: {e}")
+        except Exception as e:
+            self.stderr.write(f"Closing connection without acknowledging: {e}")
+        finally:
+            stream.close()
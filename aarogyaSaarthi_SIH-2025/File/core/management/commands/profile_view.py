@@ -0,0 +1,111 @@
+# core/management/commands/profile_view.py
+
+import cProfile
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from core.analytics import add_reports
+from core.constants import STATE_DISTRICTS
+from core.models import SymptomReport, WaterQuality
+from core.profiling import format_stats
+from core.registry import resolve_village
+
+SYMPTOMS = ("fever", "diarrhea", "vomiting", "headache", "rash")
+DISEASES = ("", "Cholera", "Typhoid", "Diarrhea", "Hepatitis A")
+WATER_SOURCES = ("Well", "River", "Tap", "Pond", "Other")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile one view under cProfile against a seeded dataset. The seed "
+        "data and anything the view writes are rolled back afterwards. "
+        "VIEW is a URL name (e.g. api_summary) or a path (e.g. /api/water/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("view")
+        parser.add_argument("--villages", type=int, default=50, help="Villages to seed (0 to use existing data only).")
+        parser.add_argument("--readings", type=int, default=200, help="Readings per seeded village.")
+        parser.add_argument("--reports", type=int, default=50, help="Symptom reports per seeded village.")
+        parser.add_argument("--repeat", type=int, default=1, help="Requests to profile (after one warm-up request).")
+        parser.add_argument("--sort", default="cumulative", help="pstats sort key.")
+        parser.add_argument("--limit", type=int, default=40, help="Rows of stats to print.")
+        parser.add_argument("--output", help="Also save raw stats (.prof) to this file.")
+
+    def handle(self, *args, **options):
+        path = options["view"]
+        if not path.startswith("/"):
+            try:
+                path = reverse(path)
+            except NoReverseMatch:
+                raise CommandError(f"No URL named {path!r} (URLs with arguments need a path).")
+
+        try:
+            with transaction.atomic():
+                if options["villages"]:
+                    self.seed(options["villages"], options["readings"], options["reports"])
+                self.profile(path, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, villages, readings, reports):
+        started = time.monotonic()
+        rng = random.Random(0)
+        now = timezone.now()
+        states = list(STATE_DISTRICTS.items())
+        water, symptom_reports = [], []
+        for i in range(villages):
+            state, districts = states[i % len(states)]
+            district = districts[i % len(districts)]
+            name = f"Profile Village {i}"
+            village_id = resolve_village(name, district, state)
+            for j in range(readings):
+                water.append(WaterQuality(
+                    village=name, village_ref_id=village_id,
+                    ph=rng.gauss(7.2, 0.6), turbidity=abs(rng.gauss(3, 2.5)), tds=abs(rng.gauss(300, 150)),
+                    timestamp=now - timedelta(minutes=10 * j),
+                ))
+            for j in range(reports):
+                symptom_reports.append(SymptomReport(
+                    name=f"Patient {j}", age=rng.randint(1, 90), gender=rng.choice(("Male", "Female", "Other")),
+                    village=name, state=state, district=district, village_ref_id=village_id,
+                    symptoms=", ".join(rng.sample(SYMPTOMS, 2)), disease=rng.choice(DISEASES),
+                    water_source=rng.choice(WATER_SOURCES),
+                ))
+        WaterQuality.objects.bulk_create(water, batch_size=1000)
+        SymptomReport.objects.bulk_create(symptom_reports, batch_size=1000)
+        add_reports(SymptomReport.objects.filter(village__startswith="Profile Village "))
+        self.stdout.write(
+            f"Seeded {villages} villages, {len(water)} readings, {len(symptom_reports)} reports "
+            f"in {time.monotonic() - started:.1f}s (rolled back afterwards)"
+        )
+
+    def profile(self, path, options):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(User.objects.get_or_create(username="profile-view", defaults={"is_staff": True})[0])
+        client.get(path)  # warm-up: imports, template compilation, caches
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        for _ in range(options["repeat"]):
+            response = profiler.runcall(client.get, path)
+        elapsed = (time.perf_counter() - started) / options["repeat"]
+
+        self.stdout.write(f"GET {path} -> {response.status_code}, {elapsed * 1000:.1f} ms per request\n")
+        self.stdout.write(format_stats(profiler, options["sort"], options["limit"]))
+        if options["output"]:
+            profiler.dump_stats(options["output"])
+            self.stdout.write(f"Saved stats to {options['output']}")
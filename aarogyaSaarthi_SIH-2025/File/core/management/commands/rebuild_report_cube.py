@@ -0,0 +1,20 @@
+# core/management/commands/rebuild_report_cube.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the symptom report cube and its rollups (core/analytics.py) from every "
+        "SymptomReport. Only needed after reports were changed with raw "
+        "queryset updates or SQL, which bypass the incremental counts."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cells = rebuild()
+        self.stdout.write(f"Rebuilt {cells} cells in {time.monotonic() - started:.2f}s")
@@ -0,0 +1,35 @@
+# core/management/commands/reprocess_report_images.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.images import process_report_image
+from core.models import SymptomReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Process symptom report photos whose background job never ran, e.g. "
+        "because the worker restarted before its pool reached them: reports "
+        "with an image but no thumbnail or content hash. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=0, help="Process at most this many reports.")
+
+    def handle(self, *args, **options):
+        pending = (
+            SymptomReport.objects.exclude(Q(image="") | Q(image=None))
+            .filter(Q(thumbnail="") | Q(thumbnail=None), Q(image_hash="") | Q(image_hash=None))
+            .order_by("pk").values_list("pk", flat=True)
+        )
+        if options["limit"]:
+            pending = pending[:options["limit"]]
+        done = failed = 0
+        for report_id in list(pending):
+            if process_report_image(report_id):
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Report {report_id}: photo could not be processed (see log)")
+        self.stdout.write(f"Processed {done} photos, {failed} failed")
@@ -0,0 +1,102 @@
+# core/management/commands/startup_profile.py
+
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter started with -X importtime: loads the WSGI app
+# the way a server worker does, then times the first and later requests.
+CHILD = r"""
+import json, statistics, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+t2 = time.perf_counter()
+from django.test import Client
+client = Client(HTTP_HOST="localhost")
+requests = {}
+for path in sys.argv[3:]:
+    times = []
+    for _ in range(int(sys.argv[2])):
+        started = time.perf_counter()
+        status = client.get(path).status_code
+        times.append(time.perf_counter() - started)
+    requests[path] = {"status": status, "first": times[0],
+                      "steady": statistics.median(times[1:]) if len(times) > 1 else None}
+print(json.dumps({"setup": t1 - t0, "wsgi": t2 - t1, "requests": requests}))
+"""
+
+
+def parse_importtime(stderr):
+    """Yield (module, self_us, cumulative_us, depth) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = int(head.split(":")[1])
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield name.strip(), self_us, int(cumulative_us), depth
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile worker start-up: import time per package (python -X importtime), "
+        "time to load the WSGI app (including core/warmup.py) and first vs. "
+        "steady-state request latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", default=["/", "/api/summary/", "/api/water/"],
+                            help="Paths to request after start-up.")
+        parser.add_argument("--top", type=int, default=15, help="Rows in each import table.")
+        parser.add_argument("--repeat", type=int, default=20, help="Requests per path.")
+        parser.add_argument("--no-warm-up", action="store_true", help="Start without core/warmup.py.")
+
+    def handle(self, *args, **options):
+        wsgi_module = settings.WSGI_APPLICATION.rsplit(".", 1)[0]
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(p for p in sys.path if p),
+            ASAARTHI_WARM_UP="0" if options["no_warm_up"] else "1",
+        )
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, wsgi_module,
+             str(max(options["repeat"], 1)), *options["paths"]],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr[-2000:])
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        imports = list(parse_importtime(proc.stderr))
+
+        top = options["top"]
+        self.stdout.write(self.style.MIGRATE_HEADING("Slowest imports (cumulative, top-level)"))
+        for name, _, cumulative, _ in sorted((i for i in imports if i[3] == 0), key=lambda i: -i[2])[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in imports:
+            by_package[name.split(".")[0]] += self_us
+        self.stdout.write(self.style.MIGRATE_HEADING("Import time by package (self)"))
+        for package, self_us in sorted(by_package.items(), key=lambda i: -i[1])[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package}")
+        total = sum(i[1] for i in imports)
+        self.stdout.write(f"  {total / 1000:8.1f} ms  total ({len(imports)} modules)")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Start-up"))
+        self.stdout.write(f"  {result['setup'] * 1000:8.1f} ms  django.setup()")
+        warm = "without" if options["no_warm_up"] else "with"
+        self.stdout.write(f"  {result['wsgi'] * 1000:8.1f} ms  import {wsgi_module} ({warm} warm-up)")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Requests (first / steady-state median)"))
+        for path, r in result["requests"].items():
+            steady = f"{r['steady'] * 1000:8.1f}" if r["steady"] is not None else "       -"
+            self.stdout.write(f"  {r['first'] * 1000:8.1f} / {steady} ms  {path} [{r['status']}]")
@@ -0,0 +1,51 @@
+# core/management/commands/sync_replica.py
+
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_routers import PRIMARY_DB, REPLICA_DB
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the replica file, once or every "
+        "--interval seconds. Stands in for real replication when testing the "
+        "read replica locally; the interval acts as the replication lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Repeat every N seconds (default: copy once and exit).")
+
+    def handle(self, *args, **options):
+        if REPLICA_DB not in settings.DATABASES:
+            raise CommandError("No replica configured: set ASAARTHI_REPLICA_DB.")
+        primary, replica = settings.DATABASES[PRIMARY_DB], settings.DATABASES[REPLICA_DB]
+        for db in (primary, replica):
+            if db["ENGINE"] != "django.db.backends.sqlite3":
+                raise CommandError("sync_replica only copies SQLite databases.")
+
+        try:
+            while True:
+                started = time.monotonic()
+                self.copy(str(primary["NAME"]), str(replica["NAME"]))
+                self.stdout.write(f"Replica updated in {(time.monotonic() - started) * 1000:.0f} ms")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+    def copy(self, source, target):
+        # The online backup API gives a consistent snapshot even while the
+        # primary is being written to
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
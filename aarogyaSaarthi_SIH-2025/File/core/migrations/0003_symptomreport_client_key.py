@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_remove_alert_resolved_alert_alert_type_alert_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='symptomreport',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
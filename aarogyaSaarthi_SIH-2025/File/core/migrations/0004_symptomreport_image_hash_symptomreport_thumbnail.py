@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_symptomreport_client_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='symptomreport',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='symptomreport',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='reports/thumbs/'),
+        ),
+    ]
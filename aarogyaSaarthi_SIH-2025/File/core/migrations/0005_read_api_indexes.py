@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_symptomreport_image_hash_symptomreport_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='triggered_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='symptomreport',
+            name='reported_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='waterquality',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['village', 'triggered_at'], name='core_alert_village_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomreport',
+            index=models.Index(fields=['village', 'reported_at'], name='core_report_village_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterquality',
+            index=models.Index(fields=['village', 'timestamp'], name='core_water_village_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_read_api_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='State',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Village',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('lat', models.FloatField(blank=True, null=True)),
+                ('lng', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='alert',
+            name='core_alert_village_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='symptomreport',
+            name='core_report_village_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='waterquality',
+            name='core_water_village_ts_idx',
+        ),
+        migrations.AddField(
+            model_name='district',
+            name='state',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='districts', to='core.state'),
+        ),
+        migrations.AddField(
+            model_name='village',
+            name='district',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='villages', to='core.district'),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='village_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='core.village'),
+        ),
+        migrations.AddField(
+            model_name='symptomreport',
+            name='village_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='core.village'),
+        ),
+        migrations.AddField(
+            model_name='waterquality',
+            name='village_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='core.village'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['village_ref', 'triggered_at'], name='core_alert_vref_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomreport',
+            index=models.Index(fields=['village_ref', 'reported_at'], name='core_report_vref_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterquality',
+            index=models.Index(fields=['village_ref', 'timestamp'], name='core_water_vref_ts_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='district',
+            constraint=models.UniqueConstraint(fields=('state', 'name'), name='core_district_unique_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='village',
+            constraint=models.UniqueConstraint(fields=('district', 'name'), name='core_village_unique_name'),
+        ),
+    ]
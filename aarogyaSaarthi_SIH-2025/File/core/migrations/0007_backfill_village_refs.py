@@ -0,0 +1,95 @@
+# Backfills the geography registry from existing rows and links every
+# WaterQuality, SymptomReport and Alert row to its Village.
+
+from django.db import migrations
+
+# Frozen copy of core.constants.STATE_DISTRICTS as of this migration
+STATE_DISTRICTS = {
+    "Assam": ["Kamrup", "Dibrugarh", "Jorhat", "Tinsukia", "Barpeta"],
+    "Arunachal Pradesh": ["Itanagar", "Tawang", "Pasighat", "Ziro", "Roing"],
+    "Manipur": ["Imphal West", "Imphal East", "Thoubal", "Bishnupur"],
+    "Meghalaya": ["Shillong", "Tura", "Jowai", "Nongpoh"],
+    "Mizoram": ["Aizawl", "Lunglei", "Champhai", "Kolasib"],
+    "Nagaland": ["Kohima", "Dimapur", "Mokokchung", "Tuensang"],
+    "Tripura": ["Agartala", "Udaipur", "Dharmanagar", "Kailashahar"],
+}
+
+
+def _clean(name):
+    return " ".join((name or "").split())
+
+
+def backfill_village_refs(apps, schema_editor):
+    State = apps.get_model("core", "State")
+    District = apps.get_model("core", "District")
+    Village = apps.get_model("core", "Village")
+    WaterQuality = apps.get_model("core", "WaterQuality")
+    SymptomReport = apps.get_model("core", "SymptomReport")
+    Alert = apps.get_model("core", "Alert")
+
+    states, districts, villages = {}, {}, {}
+
+    def get_state(name):
+        key = name.casefold()
+        if key not in states:
+            states[key] = (State.objects.filter(name__iexact=name).first()
+                           or State.objects.create(name=name))
+        return states[key]
+
+    def get_district(state, name):
+        key = (state.casefold(), name.casefold())
+        if key not in districts:
+            s = get_state(state)
+            districts[key] = (District.objects.filter(state=s, name__iexact=name).first()
+                              or District.objects.create(state=s, name=name))
+        return districts[key]
+
+    def get_village(name, district="", state=""):
+        name, district, state = _clean(name), _clean(district), _clean(state)
+        if not name:
+            return None
+        key = (name.casefold(), district.casefold(), state.casefold())
+        if key not in villages:
+            if district and state:
+                d = get_district(state, district)
+                v = (Village.objects.filter(district=d, name__iexact=name).first()
+                     or Village.objects.create(district=d, name=name))
+            else:
+                candidates = Village.objects.filter(name__iexact=name).order_by("id")
+                v = ((state and candidates.filter(district__state__name__iexact=state).first())
+                     or candidates.first()
+                     or Village.objects.create(name=name))
+            villages[key] = v
+        return villages[key]
+
+    for state, district_names in STATE_DISTRICTS.items():
+        for district in district_names:
+            get_district(state, district)
+
+    # Symptom reports carry the full geography, so resolve them first
+    for village, state, district in SymptomReport.objects.values_list("village", "state", "district").distinct():
+        v = get_village(village, district, state)
+        SymptomReport.objects.filter(village=village, state=state, district=district).update(village_ref=v)
+
+    for model in (WaterQuality, Alert):
+        for village in model.objects.values_list("village", flat=True).distinct():
+            model.objects.filter(village=village).update(village_ref=get_village(village))
+
+    # Village coordinates from the latest reading that has them
+    for v in Village.objects.filter(lat__isnull=True):
+        latest = (WaterQuality.objects.filter(village_ref=v, lat__isnull=False, lng__isnull=False)
+                  .order_by("-timestamp").first())
+        if latest:
+            v.lat, v.lng = latest.lat, latest.lng
+            v.save(update_fields=["lat", "lng"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_geography_registry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_village_refs, migrations.RunPython.noop),
+    ]
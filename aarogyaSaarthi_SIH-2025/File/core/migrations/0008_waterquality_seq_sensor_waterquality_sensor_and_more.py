@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:43
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_backfill_village_refs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waterquality',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Sensor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('api_key', models.CharField(default=core.models.generate_api_key, max_length=64, unique=True)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('village', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='core.village')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='waterquality',
+            name='sensor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='core.sensor'),
+        ),
+        migrations.AddConstraint(
+            model_name='waterquality',
+            constraint=models.UniqueConstraint(fields=('sensor', 'seq'), name='core_water_unique_sensor_seq'),
+        ),
+    ]
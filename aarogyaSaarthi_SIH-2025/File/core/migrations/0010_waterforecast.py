@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_replicaheartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issued_at', models.DateTimeField()),
+                ('starts_at', models.DateTimeField()),
+                ('hours', models.PositiveSmallIntegerField()),
+                ('values', models.BinaryField()),
+                ('unsafe_from', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('village_ref', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='core.village')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_waterforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('disease', models.CharField(blank=True, max_length=100)),
+                ('water_source', models.CharField(blank=True, max_length=50)),
+                ('gender', models.CharField(blank=True, max_length=10)),
+                ('age_band', models.CharField(blank=True, max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('village', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cells', to='core.village')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week'], name='core_reportcube_week_idx')],
+                'constraints': [models.UniqueConstraint(fields=('village', 'week', 'disease', 'water_source', 'gender', 'age_band'), name='core_reportcube_unique_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Fills ReportCube from the symptom reports stored before the cube existed.
+# The cell key is a frozen copy of core/analytics.py as of this migration,
+# so later changes there cannot change what it does.
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+REPORT_FIELDS = ("village_ref_id", "reported_at", "disease", "water_source", "gender", "age")
+AGE_BANDS = (
+    (0, 4, "0-4"),
+    (5, 14, "5-14"),
+    (15, 24, "15-24"),
+    (25, 44, "25-44"),
+    (45, 64, "45-64"),
+    (65, None, "65+"),
+)
+
+
+def age_band(age):
+    if age is None or age < 0:
+        return ""
+    for _, high, label in AGE_BANDS:
+        if high is None or age <= high:
+            return label
+    return ""
+
+
+def week_start(moment):
+    day = timezone.localdate(moment) if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+
+def cell_key(values):
+    if not values.get("village_ref_id") or values.get("reported_at") is None:
+        return None
+    return (
+        values["village_ref_id"],
+        week_start(values["reported_at"]),
+        (values.get("disease") or "").strip(),
+        (values.get("water_source") or "").strip(),
+        values.get("gender") or "",
+        age_band(values.get("age")),
+    )
+
+
+def populate_report_cube(apps, schema_editor):
+    SymptomReport = apps.get_model("core", "SymptomReport")
+    ReportCube = apps.get_model("core", "ReportCube")
+
+    counts = Counter(cell_key(row) for row in SymptomReport.objects.values(*REPORT_FIELDS).iterator())
+    counts.pop(None, None)
+    ReportCube.objects.bulk_create(
+        [
+            ReportCube(
+                village_id=village_id, week=week, disease=disease,
+                water_source=water_source, gender=gender, age_band=band, count=n,
+            )
+            for (village_id, week, disease, water_source, gender, band), n in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def clear_report_cube(apps, schema_editor):
+    apps.get_model("core", "ReportCube").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_reportcube'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_report_cube, clear_report_cube),
+    ]
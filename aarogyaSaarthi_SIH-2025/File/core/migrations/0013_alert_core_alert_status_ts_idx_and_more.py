@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_populate_report_cube'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['status', 'triggered_at'], name='core_alert_status_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['alert_type', 'triggered_at'], name='core_alert_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomreport',
+            index=models.Index(fields=['state', 'reported_at'], name='core_report_state_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomreport',
+            index=models.Index(fields=['disease', 'reported_at'], name='core_report_disease_ts_idx'),
+        ),
+    ]
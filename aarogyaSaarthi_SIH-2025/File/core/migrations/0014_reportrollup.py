@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_alert_core_alert_status_ts_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('state', 'State'), ('district', 'District')], max_length=10)),
+                ('week', models.DateField()),
+                ('dimension', models.CharField(blank=True, max_length=20)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.district')),
+                ('state', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.state')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', 'dimension', 'week'], name='core_reportrollup_slice_idx')],
+                'constraints': [models.UniqueConstraint(fields=('level', 'state', 'district', 'week', 'dimension', 'value'), name='core_reportrollup_unique_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Fills ReportRollup from the existing ReportCube cells. The roll-up is
+# spelled out here rather than imported so later changes to
+# core/analytics.py cannot change what this migration does.
+
+from collections import Counter
+
+from django.db import migrations
+
+DIMENSIONS = ("disease", "water_source", "gender", "age_band")
+
+
+def populate_report_rollup(apps, schema_editor):
+    ReportCube = apps.get_model("core", "ReportCube")
+    ReportRollup = apps.get_model("core", "ReportRollup")
+
+    counts = Counter()
+    cells = ReportCube.objects.values_list(
+        "village__district_id", "village__district__state_id", "week", *DIMENSIONS, "count",
+    )
+    for district_id, state_id, week, *values, n in cells.iterator():
+        for level, district in (("state", None), ("district", district_id)):
+            counts[(level, state_id, district, week, "", "")] += n
+            for dimension, value in zip(DIMENSIONS, values):
+                counts[(level, state_id, district, week, dimension, value)] += n
+    ReportRollup.objects.bulk_create(
+        [
+            ReportRollup(
+                level=level, state_id=state_id, district_id=district_id,
+                week=week, dimension=dimension, value=value, count=n,
+            )
+            for (level, state_id, district_id, week, dimension, value), n in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def clear_report_rollup(apps, schema_editor):
+    apps.get_model("core", "ReportRollup").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_reportrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_report_rollup, clear_report_rollup),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_populate_report_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensor',
+            name='readings',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
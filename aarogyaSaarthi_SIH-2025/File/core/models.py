@@ -1,25 +1,120 @@
 # core/models.py
 
+import secrets
+
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+# ----------------------------
+# GEOGRAPHY REGISTRY
+# ----------------------------
+class State(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class District(models.Model):
+    state = models.ForeignKey(State, on_delete=models.CASCADE, related_name="districts")
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["state", "name"], name="core_district_unique_name"),
+        ]
+
+    def __str__(self):
+        return f"{self.name}, {self.state}"
+
+
+class Village(models.Model):
+    # District is unknown for villages first seen from sensors
+    district = models.ForeignKey(District, on_delete=models.CASCADE, related_name="villages", null=True, blank=True)
+    name = models.CharField(max_length=100)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["district", "name"], name="core_village_unique_name"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+# ----------------------------
+# SENSOR MODEL
+# ----------------------------
+def generate_api_key():
+    return secrets.token_hex(20)
+
+
+class Sensor(models.Model):
+    name = models.CharField(max_length=100)
+    village = models.ForeignKey(Village, on_delete=models.PROTECT, null=True, blank=True)
+    api_key = models.CharField(max_length=64, unique=True, default=generate_api_key)
+    # Health, updated with every written batch of readings (core/sensors.py)
+    last_seq = models.BigIntegerField(default=0)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    readings = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.village})"
+
+
 # ----------------------------
 # WATER QUALITY MODEL
 # ----------------------------
 class WaterQuality(models.Model):
     village = models.CharField(max_length=100)
+    village_ref = models.ForeignKey(Village, on_delete=models.PROTECT, null=True, blank=True, editable=False)
+    # Sender identity; retries of the same (sensor, seq) are ignored on insert
+    sensor = models.ForeignKey(Sensor, on_delete=models.PROTECT, null=True, blank=True)
+    seq = models.BigIntegerField(null=True, blank=True)
     ph = models.FloatField()
     turbidity = models.FloatField()
     tds = models.FloatField()
     lat = models.FloatField(null=True, blank=True)
     lng = models.FloatField(null=True, blank=True)
-    timestamp = models.DateTimeField(default=timezone.now)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["village_ref", "timestamp"], name="core_water_vref_ts_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["sensor", "seq"], name="core_water_unique_sensor_seq"),
+        ]
 
     def __str__(self):
         return f"{self.village} - {self.timestamp}"
 
 
+# ----------------------------
+# WATER QUALITY FORECAST
+# ----------------------------
+class WaterForecast(models.Model):
+    """
+    Hourly forecast for one village, replaced on every run of
+    `manage.py forecast_water` (see core/forecast.py).
+    """
+    village_ref = models.OneToOneField(Village, on_delete=models.CASCADE, related_name="forecast")
+    issued_at = models.DateTimeField()
+    starts_at = models.DateTimeField()  # hour of the first forecast value
+    hours = models.PositiveSmallIntegerField()
+    # float32 array of shape (hours, 3): ph, turbidity, tds
+    values = models.BinaryField()
+    # First forecast hour classed unsafe by get_water_status, if any
+    unsafe_from = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.village_ref} forecast from {self.starts_at}"
+
+
 # ----------------------------
 # SYMPTOM REPORT MODEL
 # ----------------------------
@@ -35,19 +130,100 @@ class SymptomReport(models.Model):
     village = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
     district = models.CharField(max_length=100)
+    village_ref = models.ForeignKey(Village, on_delete=models.PROTECT, null=True, blank=True, editable=False)
 
     symptoms = models.TextField()
     disease = models.CharField(max_length=100, blank=True, null=True)
     water_source = models.CharField(max_length=50, default="Other")
     image = models.ImageField(upload_to="reports/", blank=True, null=True)
+    thumbnail = models.ImageField(upload_to="reports/thumbs/", blank=True, null=True, editable=False)
+    image_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
     remarks = models.TextField(blank=True, null=True)
 
-    reported_at = models.DateTimeField(auto_now_add=True)
+    # Client-generated idempotency key for reports synced from offline devices
+    client_key = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)
+
+    reported_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["village_ref", "reported_at"], name="core_report_vref_ts_idx"),
+            # Admin list filters
+            models.Index(fields=["state", "reported_at"], name="core_report_state_ts_idx"),
+            models.Index(fields=["disease", "reported_at"], name="core_report_disease_ts_idx"),
+        ]
 
     def __str__(self):
         return f"{self.village} - {self.symptoms[:20]}"
 
 
+# ----------------------------
+# SYMPTOM REPORT CUBE
+# ----------------------------
+class ReportCube(models.Model):
+    """
+    Pre-aggregated symptom report counts, one row per village, week and
+    combination of report attributes. Kept up to date on every report
+    insert/update/delete (see core/analytics.py); states and districts
+    roll up through the village registry.
+    """
+    village = models.ForeignKey(Village, on_delete=models.CASCADE, related_name="report_cells")
+    week = models.DateField()  # Monday of the report's week
+    disease = models.CharField(max_length=100, blank=True)
+    water_source = models.CharField(max_length=50, blank=True)
+    gender = models.CharField(max_length=10, blank=True)
+    age_band = models.CharField(max_length=10, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["village", "week", "disease", "water_source", "gender", "age_band"],
+                name="core_reportcube_unique_cell",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["week"], name="core_reportcube_week_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.village} {self.week}: {self.count}"
+
+
+class ReportRollup(models.Model):
+    """
+    ReportCube cells rolled up to a state or district, a week and at most
+    one report dimension (dimension "" counts every report). Maintained
+    with the cells, so the usual dashboard slices read a few rows per
+    state or district instead of every village cell.
+    """
+    LEVEL_CHOICES = [("state", "State"), ("district", "District")]
+
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    # Null for villages outside the registry's districts; district is
+    # always null on state rows
+    state = models.ForeignKey(State, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    district = models.ForeignKey(District, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    week = models.DateField()
+    dimension = models.CharField(max_length=20, blank=True)
+    value = models.CharField(max_length=100, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["level", "state", "district", "week", "dimension", "value"],
+                name="core_reportrollup_unique_cell",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["level", "dimension", "week"], name="core_reportrollup_slice_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.state_id}/{self.district_id} {self.week} {self.dimension}={self.value}: {self.count}"
+
+
 # ----------------------------
 # ALERT MODEL
 # ----------------------------
@@ -58,15 +234,35 @@ class Alert(models.Model):
     )
 
     village = models.CharField(max_length=100)
+    village_ref = models.ForeignKey(Village, on_delete=models.PROTECT, null=True, blank=True, editable=False)
     alert_type = models.CharField(max_length=20, choices=ALERT_TYPES, default="water")
     message = models.TextField()
     status = models.CharField(max_length=20, default="unresolved")  # unresolved / resolved
-    triggered_at = models.DateTimeField(default=timezone.now)
+    triggered_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["village_ref", "triggered_at"], name="core_alert_vref_ts_idx"),
+            # Admin list filters
+            models.Index(fields=["status", "triggered_at"], name="core_alert_status_ts_idx"),
+            models.Index(fields=["alert_type", "triggered_at"], name="core_alert_type_ts_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.alert_type}] {self.village} - {self.status}"
 
 
+# ----------------------------
+# REPLICATION HEARTBEAT
+# ----------------------------
+class ReplicaHeartbeat(models.Model):
+    """
+    Single row written on the primary and read back from the replica to
+    measure replication lag (see core/db_routers.py).
+    """
+    beat_at = models.DateTimeField()
+
+
 # ----------------------------
 # USER PROFILE MODEL (Optional)
 # ----------------------------
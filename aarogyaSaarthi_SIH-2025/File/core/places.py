@@ -0,0 +1,213 @@
+# core/places.py
+# In-memory prefix index over every known state, district and village name,
+# for autocomplete and for validating the place fields of symptom reports.
+#
+# Names come from the registry tables plus STATE_DISTRICTS. Each name is
+# indexed under its casefolded form and under each later word ("Imphal
+# West" is found by "imp" and by "we"), in sorted lists searched with
+# bisect. Registry writes bump a version in the shared cache (see
+# settings.CACHES); each process rebuilds its index the next time it sees a
+# new version. A place can still be added by another process between that
+# check and a lookup, so validation confirms a miss against the registry
+# tables (`find_registered`) before rejecting a name.
+
+import difflib
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .constants import STATE_DISTRICTS
+from .models import State, District, Village
+from .registry import clean_name
+
+KINDS = ("state", "district", "village")
+MAX_RESULTS = 50
+MAX_SCAN = 2000  # index entries looked at per completion
+FUZZY_CUTOFF = 0.75
+FUZZY_CANDIDATES = 2000  # names compared per table by the fuzzy fallback
+
+VERSION_KEY = "places:index:version"
+
+Place = namedtuple("Place", "kind name state district")
+
+
+def fold(name):
+    return clean_name(name).casefold()
+
+
+def bump_version():
+    """Mark every process's index stale (called on registry writes)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+class _Table:
+    """Folded whole names and later words of some places, each sorted for bisect."""
+
+    __slots__ = ("names", "name_ids", "words", "word_ids")
+
+    def __init__(self, entries):
+        names = sorted(entries)
+        words = sorted(
+            (" ".join(parts[w:]), i)
+            for name, i in entries
+            for parts in [name.split(" ")]
+            for w in range(1, len(parts))
+        )
+        self.names, self.name_ids = [k for k, _ in names], [i for _, i in names]
+        self.words, self.word_ids = [k for k, _ in words], [i for _, i in words]
+
+
+class PlaceIndex:
+    """
+    One snapshot of the known places. Names are kept in a table per kind,
+    plus one per state (districts) and per district (villages), so scoped
+    lookups search only the places in scope.
+    """
+
+    def __init__(self, places):
+        self.places = sorted(places, key=lambda p: (KINDS.index(p.kind), fold(p.name), p.state, p.district or ""))
+        self.folded = [(fold(p.name), fold(p.state), fold(p.district or "")) for p in self.places]
+        scopes = {}
+        # (kind, folded state, folded district) -> {folded name: place}
+        self.by_scope = {}
+        for i, (place, (name, state, district)) in enumerate(zip(self.places, self.folded)):
+            scopes.setdefault((place.kind,), []).append((name, i))
+            if place.kind == "district":
+                scopes.setdefault(("district", state), []).append((name, i))
+            elif place.kind == "village":
+                scopes.setdefault(("village", state, district), []).append((name, i))
+            self.by_scope.setdefault((place.kind, state, district), {}).setdefault(name, place)
+        self.tables = {scope: _Table(entries) for scope, entries in scopes.items()}
+
+    def _tables(self, kind, state, district):
+        """Tables to search, and whether state/district still need checking per place."""
+        if kind == "village" and state and district:
+            return [self.tables.get(("village", state, district))], False
+        if kind == "district" and state:
+            return [self.tables.get(("district", state))], False
+        return [self.tables.get((k,)) for k in ([kind] if kind else KINDS)], bool(state or district)
+
+    def _in_scope(self, i, state, district):
+        _, place_state, place_district = self.folded[i]
+        return (not state or place_state == state) and (not district or place_district == district)
+
+    def complete(self, prefix, kind=None, state=None, district=None, limit=10):
+        """Places with a word starting with `prefix`, whole-name matches first."""
+        prefix, state, district = fold(prefix), fold(state), fold(district)
+        if not prefix:
+            return []
+        tables, check = self._tables(kind, state, district)
+        seen, found = set(), []
+        for field in ("names", "words"):
+            for table in filter(None, tables):
+                keys, ids = getattr(table, field), getattr(table, field[:-1] + "_ids")
+                start = bisect_left(keys, prefix)
+                # Bounded scan so one-letter prefixes stay cheap on large registries
+                for pos in range(start, min(len(keys), start + MAX_SCAN)):
+                    if not keys[pos].startswith(prefix):
+                        break
+                    i = ids[pos]
+                    if i in seen or (check and not self._in_scope(i, state, district)):
+                        continue
+                    seen.add(i)
+                    found.append(self.places[i])
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def similar(self, name, kind=None, state=None, district=None, limit=10):
+        """
+        Fuzzy fallback: places whose name is close to `name` (difflib ratio).
+        In tables over FUZZY_CANDIDATES names only those sharing the first
+        letter(s) of `name` are compared.
+        """
+        name, state, district = fold(name), fold(state), fold(district)
+        tables, check = self._tables(kind, state, district)
+        candidates = {}
+        for table in filter(None, tables):
+            keys, lo, hi = table.names, 0, len(table.names)
+            for depth in range(1, len(name) + 1):
+                if hi - lo <= FUZZY_CANDIDATES:
+                    break
+                lo, hi = bisect_left(keys, name[:depth]), bisect_left(keys, name[:depth] + "\uffff")
+            for pos in range(lo, hi):
+                i = table.name_ids[pos]
+                if not check or self._in_scope(i, state, district):
+                    candidates.setdefault(keys[pos], []).append(self.places[i])
+        close = difflib.get_close_matches(name, candidates, n=limit, cutoff=FUZZY_CUTOFF)
+        return [place for match in close for place in candidates[match]][:limit]
+
+    def get(self, kind, name, state="", district=""):
+        """The known place spelled `name` (any case/spacing) in that scope, or None."""
+        return self.by_scope.get((kind, fold(state), fold(district)), {}).get(fold(name))
+
+
+def load_places():
+    places = []
+    for state, districts in STATE_DISTRICTS.items():
+        places.append(Place("state", state, state, None))
+        places.extend(Place("district", district, state, None) for district in districts)
+    places.extend(Place("state", name, name, None) for name in State.objects.values_list("name", flat=True))
+    places.extend(
+        Place("district", name, state, None)
+        for name, state in District.objects.values_list("name", "state__name")
+    )
+    # Villages first seen from sensors have no district and cannot be scoped
+    places.extend(
+        Place("village", name, state, district)
+        for name, district, state in Village.objects.filter(district__isnull=False).values_list(
+            "name", "district__name", "district__state__name"
+        )
+    )
+    # Keep the constants' spelling when the registry differs only in case
+    canonical = {}
+    for place in places:
+        canonical.setdefault((place.kind, fold(place.name), fold(place.state), fold(place.district or "")), place)
+    return canonical.values()
+
+
+def find_registered(kind, name, state="", district=""):
+    """The registry's spelling of a place the index may not have yet, or None."""
+    name = clean_name(name)
+    if kind == "state":
+        found = State.objects.filter(name__iexact=name).values_list("name", flat=True).first()
+        return Place("state", found, found, None) if found else None
+    if kind == "district":
+        found = (
+            District.objects.filter(name__iexact=name, state__name__iexact=clean_name(state))
+            .values_list("name", "state__name").first()
+        )
+        return Place("district", found[0], found[1], None) if found else None
+    found = (
+        Village.objects.filter(
+            name__iexact=name,
+            district__name__iexact=clean_name(district),
+            district__state__name__iexact=clean_name(state),
+        )
+        .values_list("name", "district__state__name", "district__name").first()
+    )
+    return Place("village", *found) if found else None
+
+
+_index = None
+_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """This process's index, rebuilt if the registry changed since it was built."""
+    global _index, _version
+    version = cache.get_or_set(VERSION_KEY, time.time_ns, None)
+    if _index is None or version != _version:
+        with _lock:
+            if _index is None or version != _version:
+                _index = PlaceIndex(load_places())
+                _version = version
+    return _index
+
+
+def preload():
+    return len(get_index().places)
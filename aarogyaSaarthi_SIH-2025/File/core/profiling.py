@@ -0,0 +1,160 @@
+# core/profiling.py
+# Production profiling hooks.
+#
+# * On demand: a staff user adds `?_profile=1` (or the header
+#   `X-Profile: 1`) to any request and gets the view's cProfile stats back
+#   as text instead of the normal response. `?_profile=store` keeps the
+#   normal response and saves a .prof file under settings.PROFILE_DIR
+#   (named in the X-Profile-File response header) for snakeviz/pstats.
+# * Sampling: with settings.SAMPLING_PROFILER_INTERVAL set (milliseconds),
+#   each worker runs a background thread that samples every thread's stack
+#   and periodically writes the counts to PROFILE_DIR/collapsed-<pid>.txt in
+#   the "collapsed stack" format read by flamegraph.pl and speedscope.
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import HttpResponse
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+STATS_LIMIT = 60  # rows of pstats output in text mode
+
+
+def profile_dir():
+    path = settings.PROFILE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def format_stats(profiler, sort="cumulative", limit=STATS_LIMIT):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# ----------------------------
+# SAMPLING PROFILER
+# ----------------------------
+def _collapse(frame):
+    """'module:function;module:function' from the outermost frame inwards."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all other threads every `interval` seconds and
+    rewrites `path` with the accumulated counts every `flush_every` seconds.
+    Cost is one sys._current_frames() walk per sample, so a 10-50ms interval
+    is cheap enough to leave on in production.
+    """
+
+    def __init__(self, path, interval=0.02, flush_every=10):
+        self.path = path
+        self.interval = interval
+        self.flush_every = flush_every
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own:
+                self.counts[_collapse(frame)] += 1
+
+    def flush(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        flushed_at = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if time.monotonic() - flushed_at >= self.flush_every:
+                self.flush()
+                flushed_at = time.monotonic()
+
+
+_sampler = None
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def ensure_sampler():
+    """
+    Start this process's sampler if sampling is enabled. Called per request
+    because threads do not survive the fork from a preloading master.
+    """
+    global _sampler, _sampler_pid
+    interval = getattr(settings, "SAMPLING_PROFILER_INTERVAL", None)
+    if not interval or _sampler_pid == os.getpid():
+        return
+    with _sampler_lock:
+        if _sampler_pid != os.getpid():
+            path = os.path.join(profile_dir(), f"collapsed-{os.getpid()}.txt")
+            _sampler = SamplingProfiler(path, interval=interval / 1000)
+            _sampler.start()
+            _sampler_pid = os.getpid()
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+class ProfilingMiddleware:
+    """Runs the view under cProfile for staff requests that ask for it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        ensure_sampler()
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+        if not mode or not getattr(request, "user", None) or not request.user.is_staff:
+            return None
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            profiler.runcall(response.render)  # template responses render lazily
+
+        if mode == "store":
+            name = f"{request.resolver_match.url_name or 'view'}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof"
+            profiler.dump_stats(os.path.join(profile_dir(), name))
+            response["X-Profile-File"] = name
+            return response
+        sort = request.GET.get("_sort", "cumulative")
+        try:
+            text = format_stats(profiler, sort)
+        except KeyError:
+            text = format_stats(profiler)
+        return HttpResponse(text, content_type="text/plain; charset=utf-8")
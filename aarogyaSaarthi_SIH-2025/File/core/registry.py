@@ -0,0 +1,148 @@
+# core/registry.py
+# Resolves free-text state/district/village names to Village ids, with an
+# in-process cache so the ingest path does not hit the registry tables.
+
+import threading
+
+from django.db import IntegrityError, transaction
+
+from .models import State, District, Village
+
+_cache = {}
+_names = {}
+_lock = threading.Lock()
+
+
+def clean_name(name):
+    """Collapse stray whitespace: ' Imphal  West ' -> 'Imphal West'."""
+    return " ".join((name or "").split())
+
+
+def clear_cache():
+    """Forget cached ids (called when registry rows are deleted)."""
+    with _lock:
+        _cache.clear()
+        _names.clear()
+
+
+# ----------------------------
+# LOOKUP / CREATE
+# ----------------------------
+def _get_or_create(model, **lookup):
+    """get_or_create matching `name` case-insensitively."""
+    name = lookup.pop("name")
+    obj = model.objects.filter(name__iexact=name, **lookup).first()
+    if obj:
+        return obj
+    try:
+        with transaction.atomic():
+            return model.objects.create(name=name, **lookup)
+    except IntegrityError:
+        # Created concurrently by another request
+        return model.objects.get(name__iexact=name, **lookup)
+
+
+def _lookup_village(village, district, state, lat, lng):
+    if district and state:
+        d = _get_or_create(District, state=_get_or_create(State, name=state), name=district)
+        v = Village.objects.filter(district=d, name__iexact=village).first()
+        if v is None:
+            v = _get_or_create(Village, district=d, name=village)
+    else:
+        # Sensors only send a village name: reuse any village of that name,
+        # preferring one in the given state
+        candidates = Village.objects.filter(name__iexact=village).order_by("id")
+        if state:
+            v = candidates.filter(district__state__name__iexact=state).first() or candidates.first()
+        else:
+            v = candidates.first()
+        if v is None:
+            v = _get_or_create(Village, district=None, name=village)
+
+    if v.lat is None and lat is not None and lng is not None:
+        Village.objects.filter(pk=v.pk).update(lat=lat, lng=lng)
+    return v.pk
+
+
+def resolve_village(village, district=None, state=None, lat=None, lng=None):
+    """
+    Return the Village id for a village name (plus district/state when
+    known), creating registry rows on first sight. Names match
+    case-insensitively after whitespace cleanup. Returns None for a blank name.
+    """
+    village, district, state = clean_name(village), clean_name(district), clean_name(state)
+    if not village:
+        return None
+    key = (village.casefold(), district.casefold(), state.casefold())
+    village_id = _cache.get(key)
+    if village_id is None:
+        village_id = _lookup_village(village, district, state, lat, lng)
+        with _lock:
+            _cache[key] = village_id
+    return village_id
+
+
+def find_village(village, state=None):
+    """
+    Read-only lookup for query strings: the id of a registry village with
+    that name (preferring one in `state`), or None. Never creates rows.
+    """
+    village, state = clean_name(village), clean_name(state)
+    if not village:
+        return None
+    candidates = Village.objects.filter(name__iexact=village).order_by("id")
+    if state:
+        match = candidates.filter(district__state__name__iexact=state).values_list("id", flat=True).first()
+        if match is not None:
+            return match
+    return candidates.values_list("id", flat=True).first()
+
+
+def village_ids(state=None, district=None, village=None):
+    """
+    Ids of registry villages matching every given name (case-insensitively,
+    after whitespace cleanup), so callers can filter on an indexed
+    village_ref_id instead of joining the registry tables.
+    """
+    lookups = {
+        "district__state__name__iexact": clean_name(state),
+        "district__name__iexact": clean_name(district),
+        "name__iexact": clean_name(village),
+    }
+    return list(Village.objects.filter(**{k: v for k, v in lookups.items() if v}).values_list("id", flat=True))
+
+
+def preload():
+    """
+    Fill the lookup caches with every registry village, e.g. before
+    forking workers so each one starts with the cache already populated.
+    """
+    villages = Village.objects.select_related("district__state").only(
+        "name", "district__name", "district__state__name"
+    )
+    keys, names = {}, {}
+    for v in villages.iterator():
+        names[v.pk] = v.name
+        if v.district:
+            key = (v.name.casefold(), v.district.name.casefold(), v.district.state.name.casefold())
+            keys.setdefault(key, v.pk)
+    with _lock:
+        _cache.update(keys)
+        _names.update(names)
+    return len(names)
+
+
+def villages_by_id(village_ids):
+    """Map Village ids to Village objects in one query."""
+    return Village.objects.in_bulk(list(village_ids))
+
+
+def village_name(village_id):
+    """Cached Village name for an id, or None if there is no such village."""
+    name = _names.get(village_id)
+    if name is None:
+        name = Village.objects.filter(pk=village_id).values_list("name", flat=True).first()
+        if name is not None:
+            with _lock:
+                _names[village_id] = name
+    return name
@@ -0,0 +1,138 @@
+# core/sensors.py
+# Sensor lookup caches and per-sensor health (last seq, last seen, readings).
+#
+# Lookups are cached per process. Saving or deleting a Sensor bumps a
+# version token in the shared Django cache, and each process drops its
+# cached sensors on the next lookup once the token changed, so a revoked
+# key stops working in every worker, not just the one that saved it.
+#
+# Health lives on the Sensor rows themselves, updated with one UPDATE per
+# sensor per written batch, so every worker and ingest_listener see the
+# same values. Health queries read Sensor rather than scanning WaterQuality.
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Sensor
+
+# A sensor is "online" if it reported within this many seconds
+ONLINE_WINDOW = 300
+
+VERSION_KEY = "sensors:cache:version"
+
+_lock = threading.Lock()
+_by_key = {}
+_by_id = {}
+_version = None
+
+
+# ----------------------------
+# LOOKUPS
+# ----------------------------
+def _check_version():
+    """Drop this process's cached sensors if any process changed a Sensor since."""
+    global _version
+    version = cache.get_or_set(VERSION_KEY, time.time_ns, None)
+    if version != _version:
+        with _lock:
+            _by_key.clear()
+            _by_id.clear()
+            _version = version
+
+
+def sensor_by_key(api_key):
+    """Cached Sensor for an API key, or None."""
+    _check_version()
+    sensor = _by_key.get(api_key)
+    if sensor is None and api_key:
+        sensor = Sensor.objects.filter(api_key=api_key).first()
+        if sensor is not None:
+            with _lock:
+                _by_key[api_key] = sensor
+                _by_id[sensor.pk] = sensor
+    return sensor
+
+
+def sensor_by_id(sensor_id):
+    """Cached Sensor for a primary key, or None."""
+    _check_version()
+    sensor = _by_id.get(sensor_id)
+    if sensor is None:
+        sensor = Sensor.objects.filter(pk=sensor_id).first()
+        if sensor is not None:
+            with _lock:
+                _by_id[sensor_id] = sensor
+    return sensor
+
+
+def preload():
+    """Cache every registered sensor (see core/warmup.py)."""
+    _check_version()
+    sensors = list(Sensor.objects.all())
+    with _lock:
+        for sensor in sensors:
+            _by_key[sensor.api_key] = sensor
+            _by_id[sensor.pk] = sensor
+    return len(sensors)
+
+
+def clear_cache():
+    """Forget this process's cached sensors."""
+    with _lock:
+        _by_key.clear()
+        _by_id.clear()
+
+
+def bump_version():
+    """Mark every process's cached sensors stale (called when a Sensor is saved or deleted)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+    clear_cache()
+
+
+# ----------------------------
+# HEALTH
+# ----------------------------
+def record_readings(readings):
+    """Fold newly stored readings into their sensors' health columns."""
+    by_sensor = defaultdict(list)
+    for r in readings:
+        if r.sensor_id is not None:
+            by_sensor[r.sensor_id].append(r.seq or 0)
+    now = timezone.now()
+    for sensor_id, seqs in by_sensor.items():
+        # GREATEST keeps concurrent writers from moving the values back
+        Sensor.objects.filter(pk=sensor_id).update(
+            last_seq=Greatest(F("last_seq"), Value(max(seqs))),
+            last_seen=Greatest(Coalesce(F("last_seen"), Value(now)), Value(now)),
+            readings=F("readings") + len(seqs),
+        )
+
+
+def health():
+    """Health rows for every registered sensor."""
+    online_since = timezone.now() - timedelta(seconds=ONLINE_WINDOW)
+    rows = []
+    for pk, last_seq, last_seen, readings in Sensor.objects.order_by("pk").values_list(
+        "pk", "last_seq", "last_seen", "readings"
+    ):
+        if last_seen is None:
+            status = "never"
+        elif last_seen >= online_since:
+            status = "online"
+        else:
+            status = "stale"
+        rows.append({
+            "sensor_id": pk,
+            "last_seq": last_seq,
+            "last_seen": last_seen.isoformat() if last_seen else None,
+            "readings": readings,
+            "status": status,
+        })
+    return rows
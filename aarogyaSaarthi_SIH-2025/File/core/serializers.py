@@ -0,0 +1,50 @@
+# core/serializers.py
+
+from rest_framework import serializers
+
+from .models import WaterQuality, SymptomReport, Alert
+
+
+# ----------------------------
+# SPARSE FIELDSETS
+# ----------------------------
+class SparseFieldsMixin:
+    """
+    Limit output to the fields named in `?fields=a,b,c`. Unknown names are
+    ignored; without the parameter every field is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = request.query_params.get("fields") if request else None
+        if requested:
+            keep = {f.strip() for f in requested.split(",")}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+# ----------------------------
+# MODEL SERIALIZERS
+# ----------------------------
+class WaterQualitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = WaterQuality
+        fields = ["id", "village", "ph", "turbidity", "tds", "lat", "lng", "timestamp"]
+
+
+class SymptomReportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = SymptomReport
+        fields = [
+            "id", "name", "age", "gender",
+            "village", "state", "district",
+            "symptoms", "disease", "water_source",
+            "image", "thumbnail", "remarks", "reported_at",
+        ]
+
+
+class AlertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Alert
+        fields = ["id", "village", "alert_type", "message", "status", "triggered_at"]
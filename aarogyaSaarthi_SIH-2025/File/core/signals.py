@@ -0,0 +1,81 @@
+# core/signals.py
+
+from collections import Counter
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import analytics, places, registry, sensors
+from .fragments import invalidate_fragments
+from .models import WaterQuality, SymptomReport, State, District, Village, Sensor
+
+
+@receiver([post_save, post_delete], sender=WaterQuality)
+@receiver([post_save, post_delete], sender=SymptomReport)
+def invalidate_dashboard_fragments(sender, **kwargs):
+    """Drop cached dashboard fragments that show the changed model."""
+    invalidate_fragments(sender)
+
+
+@receiver(post_save, sender=WaterQuality)
+def add_recent_reading(sender, instance, created, **kwargs):
+    """Readings saved one at a time (admin, shell) also feed the ring buffers."""
+    # Imported here so app loading (migrate, other commands) skips NumPy
+    from .timeseries import recent_readings
+
+    if created:
+        recent_readings.append([instance])
+    else:
+        recent_readings.invalidate(instance.village_ref_id)
+
+
+@receiver(post_delete, sender=WaterQuality)
+def drop_recent_reading(sender, instance, **kwargs):
+    from .timeseries import recent_readings
+
+    recent_readings.invalidate(instance.village_ref_id)
+
+
+@receiver(pre_save, sender=SymptomReport)
+def remember_report_cell(sender, instance, **kwargs):
+    """Note which cube cell an edited report counted in before the edit."""
+    instance._cube_key = None
+    if instance.pk:
+        old = SymptomReport.objects.filter(pk=instance.pk).values(*analytics.REPORT_FIELDS).first()
+        if old:
+            instance._cube_key = analytics.cell_key(old)
+
+
+@receiver(post_save, sender=SymptomReport)
+def count_report(sender, instance, **kwargs):
+    """Move the report's count into its (possibly new) cube cell."""
+    delta = Counter({analytics.report_key(instance): 1})
+    delta[getattr(instance, "_cube_key", None)] -= 1
+    analytics.apply_delta(delta)
+
+
+@receiver(post_delete, sender=SymptomReport)
+def uncount_report(sender, instance, **kwargs):
+    analytics.apply_delta(Counter({analytics.report_key(instance): -1}))
+
+
+@receiver(post_delete, sender=State)
+@receiver(post_delete, sender=District)
+@receiver(post_delete, sender=Village)
+def clear_registry_cache(sender, **kwargs):
+    """Cached name -> id mappings may point at the deleted row."""
+    registry.clear_cache()
+
+
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=Village)
+def refresh_place_index(sender, **kwargs):
+    """Autocomplete indexes rebuild on their next lookup."""
+    places.bump_version()
+
+
+@receiver([post_save, post_delete], sender=Sensor)
+def clear_sensor_cache(sender, **kwargs):
+    """Cached sensors may carry a stale key or village, in any process."""
+    sensors.bump_version()
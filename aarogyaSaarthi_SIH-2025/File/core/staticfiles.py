@@ -0,0 +1,150 @@
+# core/staticfiles.py
+# Vendored front-end libraries, fingerprinted + precompressed static storage,
+# and a static file view that serves the precompressed variants.
+
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+# ----------------------------
+# VENDORED LIBRARIES
+# ----------------------------
+# Local path under static/ -> CDN source. `build_static` downloads these so
+# district servers without internet access can serve them.
+VENDOR_ASSETS = {
+    "vendor/bootstrap/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+    "vendor/bootstrap/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+    "vendor/bootstrap-icons/bootstrap-icons.min.css": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/bootstrap-icons.min.css",
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff2": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/fonts/bootstrap-icons.woff2",
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/fonts/bootstrap-icons.woff",
+    "vendor/leaflet/leaflet.css": "https://unpkg.com/leaflet@1.9.4/dist/leaflet.css",
+    "vendor/leaflet/leaflet.js": "https://unpkg.com/leaflet@1.9.4/dist/leaflet.js",
+    "vendor/leaflet/images/layers.png": "https://unpkg.com/leaflet@1.9.4/dist/images/layers.png",
+    "vendor/leaflet/images/layers-2x.png": "https://unpkg.com/leaflet@1.9.4/dist/images/layers-2x.png",
+    "vendor/leaflet/images/marker-icon.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon.png",
+    "vendor/leaflet/images/marker-icon-2x.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon-2x.png",
+    "vendor/leaflet/images/marker-shadow.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-shadow.png",
+    "vendor/chartjs/chart.umd.min.js": "https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js",
+}
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".map", ".html", ".ico"}
+
+# Hashed names look like "name.0123456789ab.ext"
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+
+
+# ----------------------------
+# STORAGE
+# ----------------------------
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed filenames) that also writes .gz and,
+    when the brotli package is installed, .br variants of text assets.
+    Each load of the manifest also records which vendored libraries it
+    holds and an `asset_version` derived from its hash.
+    """
+
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        self._manifest_mtime = None
+        super().__init__(*args, **kwargs)
+
+    def _read_manifest_mtime(self):
+        try:
+            return os.path.getmtime(self.manifest_storage.path(self.manifest_name))
+        except (OSError, NotImplementedError):
+            return None
+
+    def load_manifest(self):
+        self._manifest_mtime = self._read_manifest_mtime()
+        paths, manifest_hash = super().load_manifest()
+        if paths:
+            self.vendored = {path for path in VENDOR_ASSETS if path in paths}
+        else:
+            # No manifest (development, before collectstatic): look in the source directories
+            from django.contrib.staticfiles import finders
+
+            self.vendored = {path for path in VENDOR_ASSETS if finders.find(path)}
+        bits = "".join("1" if path in self.vendored else "0" for path in VENDOR_ASSETS)
+        self.asset_version = f"{manifest_hash}-{bits}"
+        return paths, manifest_hash
+
+    def reload_if_changed(self):
+        """Reload the manifest if collectstatic rewrote it since it was loaded."""
+        if self._read_manifest_mtime() != self._manifest_mtime:
+            self.hashed_files, self.manifest_hash = self.load_manifest()
+
+    def stored_name(self, name):
+        # Templates link a few resources that are not shipped yet; fall back
+        # to the unhashed URL instead of failing the whole page
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        """Write compressed siblings of a stored file, skipping ones that don't shrink it."""
+        path = self.path(name)
+        with open(path, "rb") as f:
+            data = f.read()
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+
+
+# ----------------------------
+# SERVING
+# ----------------------------
+def serve_static(request, path):
+    """
+    Serve collected static files from STATIC_ROOT, preferring precompressed
+    variants the client accepts. Fingerprinted files are cached for a year.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404("Invalid path")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    accepted = request.headers.get("Accept-Encoding", "")
+    encoding = None
+    for suffix, name in ((".br", "br"), (".gz", "gzip")):
+        if name in accepted and os.path.isfile(full_path + suffix):
+            full_path, encoding = full_path + suffix, name
+            break
+
+    response = FileResponse(open(full_path, "rb"), content_type=content_type, filename=os.path.basename(path))
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    if HASHED_NAME_RE.search(path):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
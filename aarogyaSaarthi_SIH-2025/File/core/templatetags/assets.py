@@ -0,0 +1,31 @@
+# core/templatetags/assets.py
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+from core.staticfiles import VENDOR_ASSETS
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(path):
+    """
+    URL of a vendored library: the local static copy once `build_static`
+    has downloaded and collected it, otherwise the CDN it is vendored from.
+    """
+    if path in staticfiles_storage.vendored:
+        return static(path)
+    return VENDOR_ASSETS[path]
+
+
+@register.simple_tag
+def asset_version():
+    """
+    Key for fragments that embed asset URLs: the storage's manifest hash plus
+    which vendored libraries it holds, re-read whenever `build_static` writes
+    a new manifest, so a cached page never points at stale assets.
+    """
+    staticfiles_storage.reload_if_changed()
+    return staticfiles_storage.asset_version
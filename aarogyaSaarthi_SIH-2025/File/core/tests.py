@@ -1,3 +1,804 @@
-from django.test import TestCase
+# core/tests.py
 
-# Create your tests here.
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from . import analytics, db_routers, forecast, images, profiling, registry, sensors, timeseries, views, warmup
+from .admission import GroupCommitWriter, TokenBucket, _Ticket, writer as ingest_writer
+from .backtest import DAY, RULES, ScoringOptions, build_histories, parse_rule, run as run_backtest
+from .places import Place, PlaceIndex
+from .ingest import (
+    HEADER, MAGIC, VERSION, RECORD_STRUCT,
+    encode_frame, open_frame, readings_from_records, sign, split_frame, write_readings,
+)
+from .management.commands.startup_profile import parse_importtime
+from .forms import SymptomReportForm
+from .models import ReportCube, ReportRollup, Sensor, SymptomReport, WaterQuality
+from .staticfiles import VENDOR_ASSETS, CompressedManifestStaticFilesStorage, serve_static
+from .timeseries import Ring, RecentReadings, recent_readings
+from .views import _store_new_reports
+
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CoreTestCase(TestCase):
+    """Starts each test with empty process caches, which outlive rolled-back rows."""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear_cache()
+        sensors.clear_cache()
+        recent_readings._rings.clear()
+
+    def village(self, name="Boko", district="Kamrup", state="Assam"):
+        return registry.resolve_village(name, district, state)
+
+
+# ----------------------------
+# BINARY INGEST
+# ----------------------------
+class BinaryFrameTests(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sensor = Sensor.objects.create(name="gateway")
+        self.village_id = self.village()
+        self.records = [
+            (seq, 1.7e9 + seq, self.village_id, 7.0, 2.5, 180.0, 26.1, float("nan"))
+            for seq in (1, 2, 3)
+        ]
+
+    def test_round_trip(self):
+        frame = encode_frame(self.records, self.sensor.pk, self.sensor.api_key)
+        sensor, records = open_frame(*split_frame(frame))
+        self.assertEqual(sensor.pk, self.sensor.pk)
+        self.assertEqual(records["sensor_id"].tolist(), [self.sensor.pk] * 3)
+        self.assertEqual(records["seq"].tolist(), [1, 2, 3])
+        self.assertEqual(records["timestamp"].tolist(), [1.7e9 + 1, 1.7e9 + 2, 1.7e9 + 3])
+
+        readings, rejected = readings_from_records(records, sensor)
+        self.assertEqual(rejected, 0)
+        self.assertEqual([r.seq for r in readings], [1, 2, 3])
+        self.assertEqual(readings[0].village_ref_id, self.village_id)
+        self.assertAlmostEqual(readings[0].turbidity, 2.5, places=5)
+        self.assertIsNone(readings[0].lng)  # NaN means "not sent"
+
+    def test_rejects_wrong_key_and_tampering(self):
+        with self.assertRaises(ValueError):
+            open_frame(*split_frame(encode_frame(self.records, self.sensor.pk, "not-the-key")))
+        frame = bytearray(encode_frame(self.records, self.sensor.pk, self.sensor.api_key))
+        frame[HEADER.size + 4] ^= 1  # flip a bit of the first record's seq
+        with self.assertRaises(ValueError):
+            open_frame(*split_frame(bytes(frame)))
+        with self.assertRaises(ValueError):
+            split_frame(bytes(frame[:-1]))
+
+    def test_records_must_name_the_signing_sensor(self):
+        data = HEADER.pack(MAGIC, VERSION, 1, self.sensor.pk) + RECORD_STRUCT.pack(
+            self.sensor.pk + 1, 1, 1.7e9, self.village_id, 7.0, 2.5, 180.0, 26.1, 91.7,
+        )
+        sensor, records = open_frame(*split_frame(data + sign(self.sensor.api_key, data)))
+        self.assertEqual(readings_from_records(records, sensor), ([], 1))
+
+    def test_replayed_readings_are_not_stored_twice(self):
+        frame = encode_frame(self.records, self.sensor.pk, self.sensor.api_key)
+        for expected in (3, 0):
+            readings, _ = readings_from_records(open_frame(*split_frame(frame))[1], self.sensor)
+            self.assertEqual(len(write_readings(readings)), expected)
+        self.assertEqual(WaterQuality.objects.filter(sensor=self.sensor).count(), 3)
+        self.sensor.refresh_from_db()
+        self.assertEqual((self.sensor.last_seq, self.sensor.readings), (3, 3))
+
+    def test_key_change_in_another_process_reaches_cached_lookups(self):
+        self.assertEqual(sensors.sensor_by_key(self.sensor.api_key).pk, self.sensor.pk)
+        old_key = self.sensor.api_key
+        # Another process rotates the key: its signal bumps the shared version only
+        with mock.patch.object(sensors, "clear_cache"):
+            self.sensor.api_key = "rotated"
+            self.sensor.save()
+        self.assertIn(old_key, sensors._by_key)
+        self.assertIsNone(sensors.sensor_by_key(old_key))
+        self.assertEqual(sensors.sensor_by_key("rotated").pk, self.sensor.pk)
+
+    def test_json_api_answers_duplicate_for_a_stored_seq(self):
+        write_readings(readings_from_records(open_frame(*split_frame(
+            encode_frame(self.records, self.sensor.pk, self.sensor.api_key)
+        ))[1], self.sensor)[0])
+        response = self.client.post(
+            "/api/water/post/",
+            {"village_id": self.village_id, "seq": 2, "ph": 7, "turbidity": 1, "tds": 100},
+            content_type="application/json",
+            HTTP_X_SENSOR_KEY=self.sensor.api_key,
+        )
+        self.assertEqual((response.status_code, response.json()), (200, {"status": "duplicate"}))
+
+
+# ----------------------------
+# REPORT CUBE
+# ----------------------------
+class ReportCubeTests(CoreTestCase):
+    def report(self, **fields):
+        values = {
+            "name": "Patient", "age": 30, "gender": "Female",
+            "village": "Boko", "district": "Kamrup", "state": "Assam",
+            "symptoms": "fever", "disease": "Cholera", "water_source": "Well",
+            **fields,
+        }
+        values["village_ref_id"] = self.village(values["village"], values["district"], values["state"])
+        return SymptomReport.objects.create(**values)
+
+    def snapshot(self):
+        cells = ReportCube.objects.values_list(
+            "village_id", "week", "disease", "water_source", "gender", "age_band", "count",
+        )
+        rollups = ReportRollup.objects.values_list(
+            "level", "state_id", "district_id", "week", "dimension", "value", "count",
+        )
+        return sorted(cells), sorted(rollups, key=repr)
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        analytics.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_add_delete_and_reclassify_match_rebuild(self):
+        reports = [
+            self.report(),
+            self.report(age=70),
+            self.report(village="Rangia", gender="Male", disease="Typhoid"),
+            self.report(village="Teok", district="Jorhat"),
+        ]
+        self.assertMatchesRebuild()
+
+        reports[1].delete()
+        self.assertMatchesRebuild()
+
+        reports[0].disease = "Typhoid"
+        reports[0].save()
+        self.assertMatchesRebuild()
+
+        self.assertEqual(analytics.reclassify(SymptomReport.objects.filter(disease="Typhoid"), "Hepatitis A"), 2)
+        self.assertMatchesRebuild()
+        self.assertEqual(analytics.query(level=None), [{"count": 3}])
+
+    def test_rollups_answer_like_cells(self):
+        self.report()
+        self.report(age=8, water_source="River")
+        self.report(village="Rangia", gender="Male", disease="Typhoid")
+        self.report(village="Teok", district="Jorhat", disease="")
+        slices = [
+            ("state", [], {}),
+            ("state", ["disease"], {}),
+            ("district", ["water_source", "week"], {"state": "assam"}),
+            ("state", ["gender"], {"gender": "male"}),
+            ("district", [], {"district": "KAMRUP"}),
+            (None, ["age_band"], {}),
+        ]
+        for level, by, filters in slices:
+            with self.subTest(level=level, by=by, filters=filters):
+                self.assertIsNotNone(analytics._rollup_slice(level, by, filters))
+                from_rollups = analytics.query(level=level, by=by, filters=filters)
+                with mock.patch.object(analytics, "_rollup_slice", return_value=None):
+                    self.assertEqual(from_rollups, analytics.query(level=level, by=by, filters=filters))
+
+
+# ----------------------------
+# OFFLINE SYNC
+# ----------------------------
+class SyncReportsTests(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.village()  # reports must name a registered village
+
+    def item(self, key, **fields):
+        return {
+            "key": key, "name": "Patient", "age": 30, "gender": "Female",
+            "village": "Boko", "district": "Kamrup", "state": "Assam",
+            "symptoms": "fever", "water_source": "Well", **fields,
+        }
+
+    def sync(self, *items):
+        return self.client.post("/api/reports/sync/", {"reports": list(items)}, content_type="application/json").json()
+
+    def test_replay_is_acknowledged_once(self):
+        first = self.sync(self.item("a"), self.item("b"), self.item("a"))
+        self.assertEqual((sorted(first["ok"]), first["dup"], first["err"]), (["a", "b"], [], {}))
+
+        second = self.sync(self.item("a"), self.item("c"))
+        self.assertEqual((second["ok"], second["dup"]), (["c"], ["a"]))
+        self.assertEqual(SymptomReport.objects.count(), 3)
+        self.assertEqual(analytics.query(level=None), [{"count": 3}])
+
+    def test_devices_sync_without_a_csrf_token(self):
+        device = Client(enforce_csrf_checks=True)
+
+        def sync(item):
+            return device.post("/api/reports/sync/", {"reports": [item]}, content_type="application/json")
+
+        first = sync(self.item("device-1"))
+        self.assertEqual((first.status_code, first.json()["ok"]), (200, ["device-1"]))
+        again = sync(self.item("device-1"))
+        self.assertEqual((again.status_code, again.json()["ok"], again.json()["dup"]), (200, [], ["device-1"]))
+        self.assertEqual(SymptomReport.objects.filter(client_key="device-1").count(), 1)
+
+    def test_keys_stored_concurrently_are_duplicates(self):
+        def unsaved(key):
+            return SymptomReport(
+                client_key=key, gender="Male", village="Boko", district="Kamrup", state="Assam",
+                village_ref_id=self.village(), symptoms="fever",
+            )
+
+        # "a" lands between the duplicate check and the insert
+        SymptomReport.objects.bulk_create([unsaved("a")])
+        stored, conflicts = _store_new_reports([unsaved("a"), unsaved("b")])
+        self.assertEqual(([r.client_key for r in stored], conflicts), (["b"], ["a"]))
+        self.assertEqual(SymptomReport.objects.count(), 2)
+
+
+# ----------------------------
+# REPORT PHOTOS
+# ----------------------------
+class ReportImageTests(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        for context in (
+            override_settings(MEDIA_ROOT=media),
+            # Pool threads close their connection; here that would end the test transaction
+            mock.patch.object(images, "connection"),
+        ):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+    def report(self, data):
+        return SymptomReport.objects.create(
+            name="Patient", age=30, gender="Female", village="Boko", district="Kamrup", state="Assam",
+            village_ref_id=self.village(), symptoms="fever", image=ContentFile(data, name="upload.jpg"),
+        )
+
+    def photo(self):
+        from PIL import Image
+
+        out = BytesIO()
+        Image.new("RGB", (2000, 1000), "teal").save(out, "JPEG")
+        return out.getvalue()
+
+    def test_same_photo_reuses_the_processed_files(self):
+        first, second = self.report(self.photo()), self.report(self.photo())
+        self.assertTrue(images.process_report_image(first.pk))
+        self.assertTrue(images.process_report_image(second.pk))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((second.image.name, second.thumbnail.name), (first.image.name, first.thumbnail.name))
+        self.assertEqual(first.image.width, images.IMAGE_MAX_SIDE)
+        self.assertFalse(first.image.storage.exists("reports/upload.jpg"))
+
+    def test_reprocess_command_picks_up_lost_jobs(self):
+        lost, broken = self.report(self.photo()), self.report(b"not an image")
+        stdout, stderr = StringIO(), StringIO()
+        with self.assertLogs("core.images", "WARNING"):
+            call_command("reprocess_report_images", stdout=stdout, stderr=stderr)
+        lost.refresh_from_db()
+        self.assertTrue(lost.thumbnail and lost.image_hash)
+        self.assertIn("Processed 1 photos, 1 failed", stdout.getvalue())
+        self.assertIn(f"Report {broken.pk}:", stderr.getvalue())
+
+        stdout = StringIO()
+        call_command("reprocess_report_images", stdout=stdout)  # nothing left to do
+        self.assertIn("Processed 0 photos, 0 failed", stdout.getvalue())
+
+
+# ----------------------------
+# STATIC ASSETS
+# ----------------------------
+class StaticAssetsTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+
+    def test_asset_version_follows_a_rewritten_manifest(self):
+        vendored = next(iter(VENDOR_ASSETS))
+
+        def manifest(digest, paths, mtime):
+            self.write("staticfiles.json", json.dumps({"version": "1.1", "hash": digest, "paths": paths}).encode())
+            os.utime(os.path.join(self.root, "staticfiles.json"), (mtime, mtime))
+
+        manifest("aaa", {"app.css": "app.0123456789ab.css"}, 1000)
+        storage = CompressedManifestStaticFilesStorage(location=self.root)
+        self.assertEqual(storage.asset_version, "aaa-" + "0" * len(VENDOR_ASSETS))
+
+        manifest("bbb", {vendored: "vendored.0123456789ab.css"}, 2000)
+        self.assertTrue(storage.asset_version.startswith("aaa-"))
+        storage.reload_if_changed()
+        self.assertEqual(storage.asset_version, "bbb-1" + "0" * (len(VENDOR_ASSETS) - 1))
+        self.assertEqual(storage.vendored, {vendored})
+        self.assertEqual(storage.stored_name(vendored), "vendored.0123456789ab.css")
+
+    def test_serves_the_best_precompressed_variant(self):
+        for suffix in ("", ".gz", ".br"):
+            self.write("app.0123456789ab.css" + suffix, suffix.encode() or b"body{}")
+        with override_settings(STATIC_ROOT=self.root):
+            for accepted, encoding, body in (("gzip, br", "br", b".br"), ("gzip", "gzip", b".gz"), ("", None, b"body{}")):
+                request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accepted)
+                response = serve_static(request, "app.0123456789ab.css")
+                self.assertEqual(response.headers.get("Content-Encoding"), encoding)
+                self.assertEqual(b"".join(response.streaming_content), body)
+                self.assertIn("immutable", response["Cache-Control"])
+                response.close()
+
+
+# ----------------------------
+# DASHBOARD FRAGMENTS
+# ----------------------------
+class DashboardFragmentTests(CoreTestCase):
+    def fragment(self, name):
+        response = self.client.get(f"/dashboard/fragments/{name}/")
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_a_write_only_rebuilds_the_fragments_showing_its_model(self):
+        self.assertNotIn("Ramesh", self.fragment("recent_reports"))
+        self.fragment("recent_readings")
+
+        SymptomReport.objects.create(
+            name="Ramesh", age=40, gender="Male", village="Boko", district="Kamrup", state="Assam",
+            village_ref_id=self.village(), symptoms="fever",
+        )
+        builders = {
+            name: (mock.Mock(wraps=builder), content_type)
+            for name, (builder, content_type) in views.FRAGMENT_BUILDERS.items()
+        }
+        with mock.patch.dict(views.FRAGMENT_BUILDERS, builders):
+            self.assertIn("Ramesh", self.fragment("recent_reports"))
+            self.fragment("recent_readings")
+        self.assertEqual(builders["recent_reports"][0].call_count, 1)
+        self.assertEqual(builders["recent_readings"][0].call_count, 0)  # still cached
+
+    def test_unknown_fragment_is_404(self):
+        self.assertEqual(self.client.get("/dashboard/fragments/nope/").status_code, 404)
+
+
+# ----------------------------
+# LIST APIS
+# ----------------------------
+class ListApiTests(CoreTestCase):
+    def readings(self, village_id, count, start=0):
+        now = timezone.now()
+        return WaterQuality.objects.bulk_create(
+            WaterQuality(village="x", village_ref_id=village_id, ph=7, turbidity=1, tds=100,
+                         timestamp=now - timedelta(minutes=start + i))
+            for i in range(count)
+        )
+
+    def test_geo_filter_resolves_names_before_the_seek(self):
+        boko, teok = self.village(), self.village("Teok", "Jorhat")
+        mine = {r.pk for r in self.readings(boko, 3)}
+        self.readings(teok, 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/water/?district=%20kamrup&fields=id")
+        self.assertEqual({r["id"] for r in response.json()["results"]}, mine)
+        listing = [q["sql"] for q in queries if 'FROM "core_waterquality"' in q["sql"]]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn("JOIN", listing[0])
+        self.assertEqual(self.client.get("/api/v1/water/?village=Nowhere").json()["results"], [])
+
+    def test_cursor_pages_stay_stable_while_rows_arrive(self):
+        village_id = self.village()
+        expected = [r.pk for r in self.readings(village_id, 5, start=1)]
+        first = self.client.get("/api/v1/water/?page_size=2&fields=id").json()
+        self.readings(village_id, 2)  # newer rows arrive between page loads
+        seen, url = [r["id"] for r in first["results"]], first["next"]
+        while url:
+            page = self.client.get(url).json()
+            seen += [r["id"] for r in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+
+# ----------------------------
+# RING BUFFERS
+# ----------------------------
+class RingTests(SimpleTestCase):
+    def test_wraps_and_returns_newest_first(self):
+        ring = Ring(size=4)
+        for i in range(6):
+            ring.append((i, 1, 7.0, 1.0, 100.0, np.nan, np.nan))
+        self.assertEqual(ring.last(10)["timestamp"].tolist(), [5, 4, 3, 2])
+        self.assertEqual(ring.last(2)["timestamp"].tolist(), [5, 4])
+
+
+class RecentReadingsTests(CoreTestCase):
+    def store(self, village_id, ph):
+        reading = WaterQuality(village="Boko", village_ref_id=village_id, ph=ph, turbidity=1, tds=100)
+        WaterQuality.objects.bulk_create([reading])  # no signals, like the ingest paths
+        return reading
+
+    def test_reloads_after_another_process_writes(self):
+        village_id = self.village()
+        self.assertEqual(recent_readings.last(village_id, 5), [])
+        # Another process's buffers publish a new version token
+        RecentReadings().append([self.store(village_id, 7.2)])
+        self.assertEqual([r["ph"] for r in recent_readings.last(village_id, 5)], [7.2])
+
+    def test_append_drops_a_ring_another_process_wrote_to(self):
+        village_id = self.village()
+        self.assertEqual(recent_readings.last(village_id, 5), [])
+        recent_readings.append([self.store(village_id, 7.0)])
+        self.assertIn(village_id, recent_readings._rings)  # current ring: appended in place
+        with mock.patch.object(RecentReadings, "_load", side_effect=AssertionError("reloaded")):
+            self.assertEqual([r["ph"] for r in recent_readings.last(village_id, 5)], [7.0])
+
+        # Another process writes between our read of the version and our bump
+        other = self.store(village_id, 7.1)
+        real_get = cache.get
+
+        def racing_get(key, *args):
+            version = real_get(key, *args)
+            if key == timeseries._version_key(village_id):
+                timeseries._bump(key)  # the other process's append([other])
+            return version
+
+        with mock.patch.object(timeseries.cache, "get", side_effect=racing_get):
+            recent_readings.append([self.store(village_id, 7.2)])
+        self.assertNotIn(village_id, recent_readings._rings)
+        self.assertEqual([r["ph"] for r in recent_readings.last(village_id, 5)], [7.2, 7.1, 7.0])
+
+    def test_reloads_once_too_old(self):
+        village_id = self.village()
+        self.assertEqual(recent_readings.last(village_id, 5), [])
+        self.store(village_id, 6.9)  # no version token bumped
+        self.assertEqual(recent_readings.last(village_id, 5), [])
+        with mock.patch.object(timeseries, "RING_MAX_AGE", -1):
+            self.assertEqual([r["ph"] for r in recent_readings.last(village_id, 5)], [6.9])
+
+
+# ----------------------------
+# READ REPLICA
+# ----------------------------
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        for patch in (
+            mock.patch.object(db_routers, "replica_configured", return_value=True),
+            mock.patch.object(db_routers, "replica_usable", return_value=True),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def route(self, method, path, cookies=None):
+        """Run a request through the middleware; returns (alias its view read from, response)."""
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        seen = []
+
+        def view(request):
+            seen.append(db_routers.PrimaryReplicaRouter().db_for_read(WaterQuality))
+            return HttpResponse()
+
+        def handler(request):
+            return middleware.process_view(request, view, (), {}) or view(request)
+
+        middleware = db_routers.ReadReplicaMiddleware(handler)
+        response = middleware(request)
+        self.assertIsNone(db_routers._read_alias.get())  # reset after the request
+        return seen[0], response
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.assertEqual(self.route("get", "/api/summary/")[0], db_routers.REPLICA_DB)
+
+        alias, response = self.route("post", "/api/water/post/")
+        self.assertIsNone(alias)
+        pin = {db_routers.PIN_COOKIE: response.cookies[db_routers.PIN_COOKIE].value}
+        self.assertIsNone(self.route("get", "/api/summary/", pin)[0])
+
+        with mock.patch.object(db_routers.time, "time", return_value=time.time() + 60):
+            self.assertEqual(self.route("get", "/api/summary/", pin)[0], db_routers.REPLICA_DB)
+
+    def test_lagging_replica_and_other_views_read_the_primary(self):
+        self.assertIsNone(self.route("get", "/api/water/post/")[0])  # not a read-heavy view
+        with mock.patch.object(db_routers, "replica_usable", return_value=False):
+            self.assertIsNone(self.route("get", "/api/summary/")[0])
+
+
+# ----------------------------
+# FORECASTS
+# ----------------------------
+def holt_winters_reference(y, horizon, alpha, beta, gamma, season=forecast.SEASON, phi=forecast.DAMPING):
+    """Textbook damped additive Holt-Winters for one series; returns (forecast, sse)."""
+    level = y[:season].mean()
+    trend = (y[season:2 * season].mean() - level) / season
+    seasonal = list(y[:season] - level)
+    sse = 0.0
+    for t in range(season, len(y)):
+        err = y[t] - (level + phi * trend + seasonal[t % season])
+        sse += err * err
+        level = level + phi * trend + alpha * err
+        trend = phi * trend + alpha * beta * err
+        seasonal[t % season] += gamma * (1 - alpha) * err
+    out = []
+    for h in range(1, horizon + 1):
+        damped = sum(phi ** i for i in range(1, h + 1))
+        out.append(level + damped * trend + seasonal[(len(y) - 1 + h) % season])
+    return np.array(out), sse
+
+
+class ForecastTests(SimpleTestCase):
+    def test_batched_fit_matches_the_scalar_recursion(self):
+        rng = np.random.default_rng(7)
+        hours = np.arange(5 * forecast.SEASON)
+        y = np.stack([
+            7 + 0.3 * np.sin(2 * np.pi * hours / forecast.SEASON) + rng.normal(0, 0.05, len(hours)),
+            200 + 0.2 * hours + 15 * np.cos(2 * np.pi * hours / forecast.SEASON) + rng.normal(0, 3, len(hours)),
+        ])
+        batched = forecast.holt_winters(y, horizon=30)
+        grid = list(itertools.product(forecast.ALPHAS, forecast.BETAS, forecast.GAMMAS))
+        for series, got in zip(y, batched):
+            fits = [holt_winters_reference(series, 30, *params) for params in grid]
+            expected = min(fits, key=lambda fit: fit[1])[0]
+            np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+    def test_fill_gaps_carries_values_forward_and_back(self):
+        nan = np.nan
+        filled = forecast.fill_gaps(np.array([[nan, 2.0, nan, nan, 5.0], [1.0, nan, 3.0, nan, nan]]))
+        np.testing.assert_array_equal(filled, [[2, 2, 2, 2, 5], [1, 1, 3, 3, 3]])
+
+
+# ----------------------------
+# WORKER START-UP
+# ----------------------------
+class WarmUpTests(CoreTestCase):
+    def test_first_lookups_after_warm_up_need_no_queries(self):
+        village_id = self.village()
+        sensor = Sensor.objects.create(name="gateway")
+        WaterQuality.objects.create(village="Boko", village_ref_id=village_id, ph=7.4, turbidity=1, tds=100)
+        registry.clear_cache()
+        sensors.clear_cache()
+        recent_readings._rings.clear()
+
+        # The master closes its connections and freezes the GC before forking
+        with mock.patch.object(warmup, "connections"), mock.patch.object(warmup.gc, "freeze"), \
+                self.assertNoLogs("core.warmup", "ERROR"):
+            timings = warmup.warm_up()
+        self.assertEqual(set(timings), {"urls", "templates", "registry", "places", "sensors", "rings"})
+        with self.assertNumQueries(0):
+            self.assertEqual(sensors.sensor_by_key(sensor.api_key).pk, sensor.pk)
+            self.assertEqual(registry.village_name(village_id), "Boko")
+            self.assertEqual(recent_readings.last(village_id, 1)[0]["ph"], 7.4)
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   numpy.core\n"
+            "import time:        80 |        200 | numpy\n"
+        )
+        self.assertEqual(list(parse_importtime(stderr)), [("numpy.core", 120, 120, 1), ("numpy", 80, 200, 0)])
+
+
+# ----------------------------
+# PROFILING
+# ----------------------------
+class ProfilingTests(CoreTestCase):
+    def test_only_staff_get_profiles(self):
+        user = User.objects.create_user("worker")
+        self.client.force_login(user)
+        normal = self.client.get("/api/water/?_profile=1")
+        self.assertEqual(normal["Content-Type"], "application/json")
+
+        user.is_staff = True
+        user.save()
+        profiled = self.client.get("/api/water/", HTTP_X_PROFILE="1")
+        self.assertTrue(profiled["Content-Type"].startswith("text/plain"))
+        self.assertIn("cumulative", profiled.content.decode())
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(PROFILE_DIR=directory):
+            stored = self.client.get("/api/water/?_profile=store")
+        self.assertEqual(stored["Content-Type"], "application/json")
+        self.assertTrue(os.path.isfile(os.path.join(directory, stored["X-Profile-File"])))
+
+    def test_sampler_writes_collapsed_stacks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "collapsed.txt")
+        parked, release = threading.Event(), threading.Event()
+
+        def park():
+            parked.set()
+            release.wait()
+
+        thread = threading.Thread(target=park)
+        thread.start()
+        parked.wait()
+        sampler = profiling.SamplingProfiler(path)
+        sampler.sample()
+        sampler.sample()
+        release.set()
+        thread.join()
+        sampler.flush()
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any(";core.tests:park;" in line and line.endswith(" 2") for line in lines), lines)
+
+
+# ----------------------------
+# ADMISSION CONTROL
+# ----------------------------
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        with mock.patch("core.admission.time.monotonic", return_value=100.0) as clock:
+            bucket = TokenBucket(rate=2, capacity=3)
+            self.assertEqual([bucket.take() for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(bucket.take(), 0.5)
+            clock.return_value = 100.5
+            self.assertEqual(bucket.take(), 0)
+            self.assertAlmostEqual(bucket.take(), 0.5)
+
+
+@override_settings(INGEST_SENDER_RATE=1, INGEST_SENDER_BURST=1)
+class WaterApiAdmissionTests(CoreTestCase):
+    def post(self, addr):
+        return self.client.post(
+            "/api/water/post/", {"village_id": self.village(), "ph": 7, "turbidity": 1, "tds": 100},
+            content_type="application/json", REMOTE_ADDR=addr,
+        )
+
+    def test_over_rate_sender_gets_429_with_retry_after(self):
+        with mock.patch.object(ingest_writer, "submit") as submit, \
+                mock.patch.object(ingest_writer, "wait", return_value=True):
+            self.assertEqual(self.post("192.0.2.40").status_code, 200)
+            response = self.post("192.0.2.40")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(submit.call_count, 1)
+
+    def test_failed_or_late_commit_gets_503_with_retry_after(self):
+        writer = GroupCommitWriter()
+        ticket = _Ticket()
+        with mock.patch("core.admission.write_readings", side_effect=RuntimeError("disk I/O error")), \
+                self.assertLogs("core.admission", "ERROR"):
+            writer._write([(None, ticket)])
+        self.assertEqual(writer.failed, 1)
+
+        with mock.patch.object(ingest_writer, "submit", return_value=ticket):
+            failed = self.post("192.0.2.41")
+        self.assertEqual((failed.status_code, failed["Retry-After"]), (503, "1"))
+
+        with mock.patch.object(ingest_writer, "submit", return_value=_Ticket()), \
+                override_settings(INGEST_COMMIT_WAIT=0):
+            late = self.post("192.0.2.42")
+        self.assertEqual(late.status_code, 503)
+        self.assertGreaterEqual(int(late["Retry-After"]), 1)
+
+
+# ----------------------------
+# ALERT BACKTESTS
+# ----------------------------
+class BacktestTests(SimpleTestCase):
+    def test_scores_a_hand_built_history(self):
+        def columns(**cols):
+            return {k: np.array(v) for k, v in cols.items()}
+
+        # Village 1: water turns unsafe on day 10, an outbreak (3 reports in
+        # a week) starts on day 12. Village 2: unsafe water, no outbreak.
+        readings = columns(village=[1, 1, 2], t=[0.0, 10 * DAY, 3 * DAY],
+                           ph=[7.0, 5.0, 9.5], turbidity=[1.0, 1.0, 1.0], tds=[100.0, 100.0, 100.0])
+        reports = columns(village=[1, 1, 1], t=[11 * DAY, 11.5 * DAY, 12 * DAY],
+                          diarrhea=[True, False, False], fever=[False, True, True])
+        options = ScoringOptions(outbreak_reports=3, outbreak_window=7 * DAY, lead_window=7 * DAY, grace=DAY)
+        rules = [RULES["water_status"](), parse_rule("outbreak:min_reports=3")]
+
+        summary = run_backtest(build_histories(readings, reports), rules, options, workers=1)
+        water, outbreak = summary["water_status"], summary["outbreak"]
+        self.assertEqual((water["alerts"], water["true_alerts"], water["precision"]), (2, 1, 0.5))
+        self.assertEqual((water["outbreaks"], water["caught"], water["lead_hours_median"]), (1, 1, 48.0))
+        self.assertEqual((outbreak["alerts"], outbreak["precision"], outbreak["recall"]), (1, 1.0, 1.0))
+        self.assertEqual(outbreak["lead_hours_median"], 0.0)
+        self.assertEqual(run_backtest(build_histories(readings, reports), rules, options, workers=2), summary)
+
+
+# ----------------------------
+# ADMIN
+# ----------------------------
+class KeysetPagingTests(CoreTestCase):
+    def test_older_link_continues_where_the_page_ended(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        now = timezone.now()
+        # Pairs of readings share a timestamp, so the id tie-break matters
+        WaterQuality.objects.bulk_create(
+            WaterQuality(village="Boko", ph=7, turbidity=1, tds=100, timestamp=now - timedelta(minutes=i // 2))
+            for i in range(130)
+        )
+
+        first = self.client.get("/admin/core/waterquality/").context["cl"]
+        self.assertEqual(len(first.result_list), 100)
+        second = self.client.get("/admin/core/waterquality/" + first.next_page_url).context["cl"]
+        self.assertIsNone(second.next_page_url)
+
+        paged = [r.pk for r in first.result_list + second.result_list]
+        expected = list(WaterQuality.objects.order_by("-timestamp", "-pk").values_list("pk", flat=True))
+        self.assertEqual(paged, expected)
+
+
+# ----------------------------
+# PLACES
+# ----------------------------
+class PlaceIndexTests(SimpleTestCase):
+    index = PlaceIndex([
+        Place("state", "Assam", "Assam", None), Place("state", "Manipur", "Manipur", None),
+        Place("district", "Imphal West", "Manipur", None), Place("district", "Imphal East", "Manipur", None),
+        Place("district", "Kamrup", "Assam", None),
+        Place("village", "Boko", "Assam", "Kamrup"), Place("village", "West Boko", "Assam", "Kamrup"),
+        Place("village", "Bokajan", "Assam", "Karbi Anglong"),
+    ])
+
+    def names(self, places):
+        return [p.name for p in places]
+
+    def test_prefix_then_later_word_matches(self):
+        self.assertEqual(self.names(self.index.complete("imp")), ["Imphal East", "Imphal West"])
+        self.assertEqual(self.names(self.index.complete("WE")), ["West Boko", "Imphal West"])
+        self.assertEqual(self.names(self.index.complete("imp", limit=1)), ["Imphal East"])
+
+    def test_scoped_lookups(self):
+        self.assertEqual(self.names(self.index.complete("bo", kind="village")), ["Bokajan", "Boko", "West Boko"])
+        scope = {"kind": "village", "state": " assam", "district": "KAMRUP"}
+        self.assertEqual(self.names(self.index.complete("bo", **scope)), ["Boko", "West Boko"])
+        self.assertEqual(self.index.get("village", " boko ", "ASSAM", "kamrup").name, "Boko")
+        self.assertIsNone(self.index.get("village", "Boko", "Assam", "Karbi Anglong"))
+        self.assertEqual(self.names(self.index.similar("Bokko", kind="village", state="Assam", district="Kamrup")), ["Boko"])
+
+
+class ReportPlaceTests(CoreTestCase):
+    def form(self, village, **fields):
+        return SymptomReportForm(data={
+            "name": "Patient", "age": 30, "gender": "Female", "symptoms": "fever", "water_source": "Well",
+            "village": village, "district": "kamrup", "state": "assam", **fields,
+        })
+
+    def test_unknown_village_needs_new_village(self):
+        self.village()
+        for village, hint in (("Zzyzx", None), ("Bokko", "Did you mean Boko?")):
+            with self.subTest(village=village):
+                form = self.form(village)
+                self.assertFalse(form.is_valid())
+                error = form.errors["village"][0]
+                self.assertIn("not on the list yet", error)
+                if hint:
+                    self.assertIn(hint, error)
+        form = self.form("Zzyzx", new_village="on")
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_known_places_take_the_registered_spelling(self):
+        self.village()
+        form = self.form(" boko ")
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(
+            (form.cleaned_data["village"], form.cleaned_data["district"], form.cleaned_data["state"]),
+            ("Boko", "Kamrup", "Assam"),
+        )
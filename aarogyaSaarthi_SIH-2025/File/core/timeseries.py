@@ -0,0 +1,192 @@
+# core/timeseries.py
+# Process-wide ring buffers holding the most recent readings per village,
+# so "latest" and "last N" reads are served without SQL.
+#
+# Each worker process keeps its own buffers. Writers bump a per-village
+# version counter in the shared Django cache (see CACHES in settings and the
+# core.E001 check); a reader whose local version differs reloads that
+# village's last N rows from the database (one indexed LIMIT query). A writer
+# only appends to its own ring when that ring was current and its bump was
+# the next one (compare-and-set via the cache's incr, atomic on Redis);
+# otherwise another process wrote in between and the ring is dropped. Rings
+# are also reloaded once they are RING_MAX_AGE seconds old, which bounds
+# staleness from writes that never bumped a version (raw SQL, a cache flush).
+
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.core.cache import cache
+
+from .db_routers import PRIMARY_DB
+from .models import WaterQuality
+
+RING_SIZE = 256
+RING_MAX_AGE = 30  # seconds
+ALL_VILLAGES = 0  # ring holding the newest readings across every village
+
+READING_DTYPE = np.dtype([
+    ("timestamp", "<f8"),  # epoch seconds
+    ("village_id", "<u4"),
+    ("ph", "<f8"),
+    ("turbidity", "<f8"),
+    ("tds", "<f8"),
+    ("lat", "<f8"),        # NaN when unknown
+    ("lng", "<f8"),
+])
+
+_VALUE_FIELDS = ("timestamp", "village_id", "ph", "turbidity", "tds", "lat", "lng")
+
+
+def _row(reading):
+    return (
+        reading.timestamp.timestamp(),
+        reading.village_ref_id or 0,
+        reading.ph,
+        reading.turbidity,
+        reading.tds,
+        np.nan if reading.lat is None else reading.lat,
+        np.nan if reading.lng is None else reading.lng,
+    )
+
+
+def _version_key(village_id):
+    return f"timeseries:ring:{village_id}"
+
+
+def _bump(key):
+    """Increment a version counter, creating it if missing; returns the new value."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+# ----------------------------
+# RING BUFFER
+# ----------------------------
+class Ring:
+    """Fixed-size circular buffer over one structured NumPy array."""
+
+    __slots__ = ("data", "head", "count", "version", "loaded_at")
+
+    def __init__(self, size=RING_SIZE):
+        self.data = np.zeros(size, dtype=READING_DTYPE)
+        self.head = 0    # next slot to write
+        self.count = 0
+        self.version = None
+        self.loaded_at = time.monotonic()
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def last(self, n):
+        """Up to `n` newest rows, newest first (a copy)."""
+        n = min(n, self.count)
+        idx = (self.head - 1 - np.arange(n)) % len(self.data)
+        return self.data[idx]
+
+
+class RecentReadings:
+    """Ring buffers keyed by village id, plus one across all villages."""
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def _load(self, village_id, version):
+        """
+        Build a ring from the database (newest `size` rows). Always reads
+        the primary: a ring loaded from a lagging replica would stay stale
+        until the next write.
+        """
+        qs = WaterQuality.objects.using(PRIMARY_DB).order_by("-timestamp", "-id")
+        if village_id != ALL_VILLAGES:
+            qs = qs.filter(village_ref_id=village_id)
+        ring = Ring(self.size)
+        for reading in reversed(list(qs[:self.size])):
+            ring.append(_row(reading))
+        ring.version = version
+        return ring
+
+    def _ring(self, village_id):
+        """Local ring for a village, reloaded if another process wrote to it."""
+        version = cache.get(_version_key(village_id))
+        ring = self._rings.get(village_id)
+        if ring is None or ring.version != version or time.monotonic() - ring.loaded_at > RING_MAX_AGE:
+            ring = self._load(village_id, version)
+            with self._lock:
+                self._rings[village_id] = ring
+        return ring
+
+    def warm(self, village_ids):
+        """Preload rings (e.g. at worker start) so first reads skip the DB."""
+        for village_id in [ALL_VILLAGES, *village_ids]:
+            self._ring(village_id)
+
+    def append(self, readings):
+        """
+        Bump the version of every village touched by newly stored readings.
+        A local ring gets the rows only if it held the cached version and
+        our bump followed it directly; otherwise it is dropped and reloaded.
+        """
+        if not readings:
+            return
+        rows = {ALL_VILLAGES: []}
+        for reading in readings:
+            row = _row(reading)
+            rows[ALL_VILLAGES].append(row)
+            if reading.village_ref_id is not None:
+                rows.setdefault(reading.village_ref_id, []).append(row)
+        for village_id, new_rows in rows.items():
+            key = _version_key(village_id)
+            seen = cache.get(key)
+            version = _bump(key)
+            with self._lock:
+                ring = self._rings.get(village_id)
+                if ring is None:
+                    continue
+                if ring.version == seen and version == (seen or 0) + 1:
+                    for row in new_rows:
+                        ring.append(row)
+                    ring.version = version
+                else:
+                    del self._rings[village_id]
+
+    def invalidate(self, village_id):
+        """Force every worker to reload a village (and the global ring)."""
+        with self._lock:
+            self._rings.pop(village_id, None)
+            self._rings.pop(ALL_VILLAGES, None)
+        for v in {village_id, ALL_VILLAGES}:
+            if v is not None:
+                _bump(_version_key(v))
+
+    def last(self, village_id=ALL_VILLAGES, n=1):
+        """
+        Up to `n` newest readings for a village (or across all villages) as
+        dicts, newest first.
+        """
+        rows = self._ring(village_id).last(n)
+        out = []
+        for row in rows.tolist():
+            item = dict(zip(_VALUE_FIELDS, row))
+            item["timestamp"] = datetime.fromtimestamp(item["timestamp"], tz=dt_timezone.utc)
+            for key in ("lat", "lng"):
+                if np.isnan(item[key]):
+                    item[key] = None
+            out.append(item)
+        return out
+
+    def array(self, village_id, n=RING_SIZE):
+        """Newest-first structured array, for vectorised consumers (sparklines, models)."""
+        return self._ring(village_id).last(n)
+
+
+recent_readings = RecentReadings()
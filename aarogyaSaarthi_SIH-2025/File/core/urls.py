@@ -1,13 +1,14 @@
 # core/urls.py
 
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     # ----------------------------
     # DASHBOARD & STATIC PAGES
     # ----------------------------
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/fragments/<str:name>/', views.dashboard_fragment, name='dashboard_fragment'),
     path('home/', views.home, name='home'),
     path('help/', views.help, name='help'),
     path('contact/', views.contact, name='contact'),
@@ -17,15 +18,27 @@ urlpatterns = [
     # ----------------------------
     path("report_symptoms/", views.report_symptoms, name="report_symptoms"),
     path("add-dummy-report/", views.add_dummy_report, name="add_dummy_report"),
+    path("api/reports/sync/", views.sync_reports_api, name="sync_reports_api"),  # Batch sync of offline reports
 
     # ----------------------------
     # API ENDPOINTS
     # ----------------------------
     path("api/water/", views.api_water, name="api_water"),         # GET latest water data
+    path("api/water/recent/", views.api_water_recent, name="api_water_recent"),  # Last N readings per village
     path("api/water/post/", views.water_api, name="water_api"),    # POST new water data
+    path("api/ingest/metrics/", views.ingest_metrics_api, name="ingest_metrics_api"),  # Queue depth / flush latency
+    path("api/sensors/health/", views.sensor_health_api, name="sensor_health_api"),  # Last seen per sensor
+    path("api/forecast/", views.forecast_api, name="forecast_api"),  # Next 24-72h per village
+    path("api/analytics/reports/", views.report_cube_api, name="report_cube_api"),  # Report counts by state/district/village x dimensions
+    path("api/places/", views.places_api, name="places_api"),  # Autocomplete: ?q=, ?kind=, ?state=, ?district=
     path('api/summary/', views.api_summary, name='api_summary'),  # Village summary with predicted diseases
     path("api/alerts/", views.alerts_api, name="alerts_api"),      # Last 20 active alerts
 
+    # Paginated list APIs: ?cursor=, ?page_size=, ?fields=, ?state=/?district=/?village=
+    path("api/v1/water/", api.WaterQualityList.as_view(), name="water_list_api"),
+    path("api/v1/reports/", api.SymptomReportList.as_view(), name="report_list_api"),
+    path("api/v1/alerts/", api.AlertList.as_view(), name="alert_list_api"),
+
     # ----------------------------
     # EDUCATIONAL MODULES
     # ----------------------------
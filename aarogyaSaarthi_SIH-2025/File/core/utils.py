@@ -2,6 +2,7 @@
 
 from django.utils import timezone
 from .models import WaterQuality, SymptomReport, Alert
+from .registry import villages_by_id
 
 # ----------------------------
 # SMS STUB FUNCTION
@@ -23,14 +24,17 @@ def check_and_trigger_alert():
     Create alerts if thresholds are exceeded, avoiding duplicates.
     """
     # Get all villages that have water data or symptom reports
-    villages = set(list(WaterQuality.objects.values_list("village", flat=True)) +
-                   list(SymptomReport.objects.values_list("village", flat=True)))
-
-    for v in villages:
-        latest = WaterQuality.objects.filter(village=v).order_by('-timestamp').first()
+    village_ids = (set(WaterQuality.objects.values_list("village_ref_id", flat=True)) |
+                   set(SymptomReport.objects.values_list("village_ref_id", flat=True)))
+    village_ids.discard(None)
+    registry = villages_by_id(village_ids)
+
+    for vid in village_ids:
+        v = registry[vid].name
+        latest = WaterQuality.objects.filter(village_ref_id=vid).order_by('-timestamp').first()
         # Count symptom reports in last 2 days
         symptom_count = SymptomReport.objects.filter(
-            village=v,
+            village_ref_id=vid,
             reported_at__gte=timezone.now() - timezone.timedelta(days=2)
         ).count()
 
@@ -45,9 +49,9 @@ def check_and_trigger_alert():
 
         # Trigger alert if unsafe and symptoms >= 3, avoiding duplicates
         if unsafe and symptom_count >= 3:
-            if not Alert.objects.filter(village=v, resolved=False).exists():
+            if not Alert.objects.filter(village_ref_id=vid, status="unresolved").exists():
                 message = f"Potential outbreak risk in {v}. Unsafe water + {symptom_count} symptom reports."
-                Alert.objects.create(village=v, message=message)
+                Alert.objects.create(village=v, village_ref_id=vid, message=message)
                 send_sms_stub("ADMIN_NUMBER", message)
 
 
@@ -1,8 +1,13 @@
 # core/views.py
 
 import json
+import math
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404
+from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.contrib import messages
@@ -10,8 +15,19 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 
 from .forms import SymptomReportForm, RegisterForm, LoginForm
-from .models import WaterQuality, SymptomReport, Alert
+from .models import WaterQuality, SymptomReport, Alert, WaterForecast
 from .utils import predict_disease, check_and_trigger_alert
+from .images import schedule_report_image
+from .registry import find_village, resolve_village, villages_by_id, village_name
+from .timeseries import recent_readings, ALL_VILLAGES, RING_SIZE
+from .ingest import is_stored, reading_from_payload
+from .admission import admit, Rejected, writer as ingest_writer
+from .sensors import sensor_by_key, health as sensor_health
+from .fragments import fragment_cache_key, invalidate_fragments, FRAGMENT_TTL
+from .db_routers import PRIMARY_DB
+from .forecast import forecast_values
+from .analytics import add_reports, query as query_report_cube, DIMENSIONS, GEO_LEVELS
+from .places import get_index as place_index, KINDS as PLACE_KINDS, MAX_RESULTS as MAX_PLACE_RESULTS
 
 # Fallback coordinates for villages if GPS data is missing
 FALLBACK_COORDS = {
@@ -27,35 +43,66 @@ FALLBACK_COORDS = {
 # @login_required
 def dashboard(request):
     """
-    Display dashboard with recent water quality data, symptom reports, alerts,
-    village summary, and charts.
+    Render the dashboard shell. Tables, charts and the map are loaded
+    separately from `dashboard_fragment`, so this page needs no queries.
     """
-    # Fetch recent water quality and symptom reports
-    water_data = WaterQuality.objects.all().order_by('-timestamp')[:20]
+    return render(request, "core/dashboard.html")
+
+
+# ----------------------------
+# DASHBOARD FRAGMENTS
+# ----------------------------
+def _recent_readings_fragment(request):
+    water_data = recent_readings.last(ALL_VILLAGES, 20)
+    for w in water_data:
+        w["village"] = village_name(w["village_id"])
+    return render_to_string("core/fragments/recent_readings.html", {"water_data": water_data}, request)
+
+
+def _recent_reports_fragment(request):
     recent_reports = SymptomReport.objects.all().order_by('-reported_at')[:10]
-    alerts = Alert.objects.filter(status="active").order_by('-triggered_at')
+    return render_to_string("core/fragments/recent_reports.html", {"recent_reports": recent_reports}, request)
+
+
+def _chart_fragment(request):
+    """7-day symptom report counts."""
+    days, counts = [], []
+    for i in range(6, -1, -1):
+        day = (timezone.now() - timezone.timedelta(days=i)).date()
+        days.append(day.strftime("%b %d"))
+        counts.append(SymptomReport.objects.filter(reported_at__date=day).count())
+    return json.dumps({"labels": days, "data": counts})
 
-    # Build village summary data
-    villages = []
-    villages_set = set(list(WaterQuality.objects.values_list("village", flat=True)) +
-                       list(SymptomReport.objects.values_list("village", flat=True)))
 
-    for v in villages_set:
-        latest_water = WaterQuality.objects.filter(village=v).order_by('-timestamp').first()
+def _map_fragment(request):
+    """Village markers with latest readings, status and predicted diseases."""
+    villages = []
+    village_ids = (set(WaterQuality.objects.values_list("village_ref_id", flat=True)) |
+                   set(SymptomReport.objects.values_list("village_ref_id", flat=True)))
+    village_ids.discard(None)
+    registry = villages_by_id(village_ids)
+
+    for vid in village_ids:
+        v = registry[vid].name
+        # Registry coordinates first, then the hard-coded fallbacks
+        default_coords = (registry[vid].lat, registry[vid].lng)
+        if default_coords[0] is None:
+            default_coords = FALLBACK_COORDS.get(v, (26.2, 92.9))
+        latest_water = WaterQuality.objects.filter(village_ref_id=vid).order_by('-timestamp').first()
         symptom_count = SymptomReport.objects.filter(
-            village=v,
+            village_ref_id=vid,
             reported_at__gte=timezone.now() - timezone.timedelta(days=7)
         ).count()
 
         # Use fallback coordinates if missing
         if latest_water:
-            lat = latest_water.lat if latest_water.lat is not None else FALLBACK_COORDS.get(v, (26.2, 92.9))[0]
-            lng = latest_water.lng if latest_water.lng is not None else FALLBACK_COORDS.get(v, (26.2, 92.9))[1]
+            lat = latest_water.lat if latest_water.lat is not None else default_coords[0]
+            lng = latest_water.lng if latest_water.lng is not None else default_coords[1]
             ph = latest_water.ph
             turbidity = latest_water.turbidity
             tds = latest_water.tds
         else:
-            lat, lng = FALLBACK_COORDS.get(v, (26.2, 92.9))
+            lat, lng = default_coords
             ph = turbidity = tds = None
 
         # Determine water status
@@ -67,8 +114,8 @@ def dashboard(request):
 
         # Predicted diseases based on water quality and symptom reports
         symptom_reports = {
-            "diarrhea": SymptomReport.objects.filter(village=v, symptoms__icontains="diarrhea").count(),
-            "fever": SymptomReport.objects.filter(village=v, symptoms__icontains="fever").count()
+            "diarrhea": SymptomReport.objects.filter(village_ref_id=vid, symptoms__icontains="diarrhea").count(),
+            "fever": SymptomReport.objects.filter(village_ref_id=vid, symptoms__icontains="fever").count()
         }
         diseases = predict_disease(ph, turbidity, tds, symptom_reports)
 
@@ -83,22 +130,32 @@ def dashboard(request):
             "status": status,
             "predicted_disease": diseases
         })
+    return json.dumps({"villages": villages})
 
-    # Chart: 7-day symptom counts
-    days, counts = [], []
-    for i in range(6, -1, -1):
-        day = (timezone.now() - timezone.timedelta(days=i)).date()
-        days.append(day.strftime("%b %d"))
-        counts.append(SymptomReport.objects.filter(reported_at__date=day).count())
 
-    context = {
-        "water_data": water_data,
-        "recent_reports": recent_reports,
-        "alerts": alerts,
-        "villages_json": json.dumps(villages),
-        "chart_json": json.dumps({"labels": days, "data": counts})
-    }
-    return render(request, "core/dashboard.html", context)
+# Fragment name -> (builder, content type)
+FRAGMENT_BUILDERS = {
+    "recent_readings": (_recent_readings_fragment, "text/html"),
+    "recent_reports": (_recent_reports_fragment, "text/html"),
+    "chart": (_chart_fragment, "application/json"),
+    "map": (_map_fragment, "application/json"),
+}
+
+
+def dashboard_fragment(request, name):
+    """
+    Serve one dashboard fragment from cache, rebuilding it only after its
+    own invalidation key changes (see core/fragments.py).
+    """
+    if name not in FRAGMENT_BUILDERS:
+        raise Http404("Unknown fragment")
+    builder, content_type = FRAGMENT_BUILDERS[name]
+    key = fragment_cache_key(name)
+    body = cache.get(key)
+    if body is None:
+        body = builder(request)
+        cache.set(key, body, FRAGMENT_TTL)
+    return HttpResponse(body, content_type=content_type)
 
 
 # ----------------------------
@@ -111,7 +168,9 @@ def report_symptoms(request):
     if request.method == "POST":
         form = SymptomReportForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            report = form.save()
+            if report.image:
+                schedule_report_image(report.pk)
             messages.success(request, "✅ Your report has been submitted successfully.")
             return redirect("report_symptoms")
         else:
@@ -121,6 +180,101 @@ def report_symptoms(request):
     return render(request, "core/report_symptom.html", {"form": form})
 
 
+# ----------------------------
+# OFFLINE SYMPTOM REPORT SYNC API (POST)
+# ----------------------------
+MAX_SYNC_BATCH = 500
+
+
+def _store_new_reports(reports):
+    """
+    Insert reports that carry a client_key. Returns (stored, conflicts):
+    the reports this call inserted and the keys a concurrent sync stored
+    first. The batch goes in one INSERT; only if that hits a conflict is
+    it retried row by row to tell the two apart.
+    """
+    try:
+        with transaction.atomic():
+            SymptomReport.objects.bulk_create(reports)
+        return reports, []
+    except IntegrityError:
+        pass
+    stored, conflicts = [], []
+    for report in reports:
+        report.pk = None  # may have been set by a batch that was rolled back
+        try:
+            with transaction.atomic():
+                SymptomReport.objects.bulk_create([report])  # no signals, like the batch insert
+            stored.append(report)
+        except IntegrityError:
+            if not SymptomReport.objects.filter(client_key=report.client_key).exists():
+                raise
+            conflicts.append(report.client_key)
+    return stored, conflicts
+
+
+@csrf_exempt
+def sync_reports_api(request):
+    """
+    Accept a batch of symptom reports queued offline by field health workers.
+
+    Expects {"reports": [{"key": "<client id>", ...form fields}, ...]}. Each
+    report is validated with SymptomReportForm; reports whose key was already
+    synced are acknowledged without being stored again, so replays are safe.
+    Returns compact acknowledgements: {"ok": [...], "dup": [...], "err": {...}}.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=400)
+    try:
+        data = json.loads(request.body)
+        reports = data["reports"]
+        if not isinstance(reports, list):
+            raise ValueError("reports must be a list")
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if len(reports) > MAX_SYNC_BATCH:
+        return JsonResponse({"error": f"At most {MAX_SYNC_BATCH} reports per batch"}, status=400)
+
+    # Collapse in-batch replays, then find keys already stored in one query
+    pending, errors = {}, {}
+    for i, item in enumerate(reports):
+        key = str(item.get("key") or "").strip() if isinstance(item, dict) else ""
+        if not key or len(key) > 64:
+            errors[str(i)] = {"key": ["A key of 1-64 characters is required."]}
+            continue
+        pending.setdefault(key, item)
+
+    duplicates = set(
+        SymptomReport.objects.filter(client_key__in=list(pending)).values_list("client_key", flat=True)
+    )
+
+    new_reports = []
+    for key, item in pending.items():
+        if key in duplicates:
+            continue
+        form = SymptomReportForm(data=item)
+        if form.is_valid():
+            report = form.save(commit=False)
+            report.client_key = key
+            new_reports.append(report)
+        else:
+            errors[key] = {
+                field: [e["message"] for e in errs]
+                for field, errs in form.errors.get_json_data().items()
+            }
+
+    # Conflicts here mean a concurrent replay stored the same key first
+    stored, conflicts = _store_new_reports(new_reports) if new_reports else ([], [])
+    duplicates.update(conflicts)
+    if stored:
+        # Neither insert path sends post_save signals
+        invalidate_fragments(SymptomReport)
+        add_reports(stored)
+
+    ok = [report.client_key for report in stored]
+    return JsonResponse({"ok": ok, "dup": sorted(duplicates), "err": errors})
+
+
 # ----------------------------
 # WATER QUALITY API (POST)
 # ----------------------------
@@ -128,22 +282,68 @@ def report_symptoms(request):
 def water_api(request):
     """
     Receive water quality data from sensors or simulator.
+    Registered sensors send their key in the X-Sensor-Key header and a
+    per-sensor "seq"; a (sensor, seq) already stored is answered 200
+    {"status": "duplicate"} and counted, not stored again. Readings are
+    written in groups by the admission layer (core/admission.py) and 200
+    means committed; 429 + Retry-After means the sender or the queue is
+    saturated, 503 + Retry-After that the write failed or did not commit
+    within INGEST_COMMIT_WAIT. Either way, retry with the same seq.
     """
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=400)
+    sensor = None
+    api_key = request.headers.get("X-Sensor-Key")
+    if api_key:
+        sensor = sensor_by_key(api_key)
+        if sensor is None:
+            return JsonResponse({"error": "Unknown sensor key"}, status=401)
     try:
         data = json.loads(request.body)
-        WaterQuality.objects.create(
-            village=data.get("village"),
-            ph=float(data.get("ph")),
-            turbidity=float(data.get("turbidity")),
-            tds=float(data.get("tds")),
-            lat=float(data.get("lat")) if data.get("lat") else None,
-            lng=float(data.get("lng")) if data.get("lng") else None
-        )
-        return JsonResponse({"status": "ok"})
+        reading = reading_from_payload(data, sensor)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
+    if sensor is not None and is_stored(sensor, reading.seq):
+        ingest_writer.duplicates += 1
+        return JsonResponse({"status": "duplicate"})
+
+    sender = f"sensor:{sensor.pk}" if sensor else f"addr:{request.META.get('REMOTE_ADDR')}"
+    try:
+        ticket = admit(reading, sender)
+    except Rejected as e:
+        response = JsonResponse({"error": str(e)}, status=429)
+        response["Retry-After"] = str(math.ceil(e.retry_after))
+        return response
+    try:
+        committed = ingest_writer.wait(ticket, settings.INGEST_COMMIT_WAIT)
+    except Exception as e:
+        response = JsonResponse({"error": f"Write failed: {e}"}, status=503)
+        response["Retry-After"] = "1"
+        return response
+    if not committed:
+        response = JsonResponse({"error": "Write not committed in time"}, status=503)
+        response["Retry-After"] = str(ingest_writer.drain_estimate())
+        return response
+    return JsonResponse({"status": "ok"})
+
+
+# ----------------------------
+# INGEST METRICS API
+# ----------------------------
+def ingest_metrics_api(request):
+    """Queue depth, flush latency and rejection counts of this worker's ingest queue."""
+    return JsonResponse(ingest_writer.metrics())
+
+
+# ----------------------------
+# SENSOR HEALTH API
+# ----------------------------
+def sensor_health_api(request):
+    """
+    Last-seen time, highest sequence number, reading count and online
+    status per sensor, read from the Sensor rows (no scan of readings).
+    """
+    return JsonResponse({"sensors": sensor_health()})
 
 
 # ----------------------------
@@ -152,36 +352,180 @@ def water_api(request):
 def api_water(request):
     """
     Return latest water reading for frontend display.
+    Served from the in-memory ring buffer (core/timeseries.py).
     """
-    latest = WaterQuality.objects.order_by("-timestamp").first()
+    latest = recent_readings.last(ALL_VILLAGES, 1)
     if not latest:
         return JsonResponse({"error": "No data yet"}, status=404)
 
+    latest = latest[0]
     return JsonResponse({
-        "village": latest.village,
-        "ph": latest.ph,
-        "turbidity": latest.turbidity,
-        "tds": latest.tds,
-        "lat": latest.lat,
-        "lng": latest.lng,
-        "timestamp": latest.timestamp,
+        "village": village_name(latest["village_id"]),
+        "ph": latest["ph"],
+        "turbidity": latest["turbidity"],
+        "tds": latest["tds"],
+        "lat": latest["lat"],
+        "lng": latest["lng"],
+        "timestamp": latest["timestamp"],
     })
 
 
+# ----------------------------
+# RECENT READINGS API
+# ----------------------------
+def api_water_recent(request):
+    """
+    Return the last N readings (?n=, default 20) for one village
+    (?village_id= or ?village=&state=) or across all villages, newest first.
+    Served from the in-memory ring buffers.
+    """
+    try:
+        n = max(1, min(int(request.GET.get("n", 20)), RING_SIZE))
+        village_id = int(request.GET.get("village_id", 0))
+    except ValueError:
+        return JsonResponse({"error": "n and village_id must be integers"}, status=400)
+    if not village_id and request.GET.get("village"):
+        village_id = find_village(request.GET["village"], state=request.GET.get("state"))
+        if village_id is None:
+            return JsonResponse({"readings": []})
+
+    readings = recent_readings.last(village_id or ALL_VILLAGES, n)
+    for r in readings:
+        r["village"] = village_name(r["village_id"])
+    return JsonResponse({"readings": readings})
+
+
+# ----------------------------
+# WATER FORECAST API
+# ----------------------------
+def forecast_api(request):
+    """
+    Stored water quality forecasts (see core/forecast.py).
+    With ?village_id= or ?village=(&state=): hourly values for that village,
+    limited to ?hours= (default: all stored hours).
+    Without: every village forecast to turn unsafe, soonest first.
+    """
+    try:
+        hours = int(request.GET["hours"]) if request.GET.get("hours") else None
+        village_id = int(request.GET.get("village_id", 0))
+    except ValueError:
+        return JsonResponse({"error": "hours and village_id must be integers"}, status=400)
+
+    forecasts = WaterForecast.objects.all()
+    if request.GET.get("village"):
+        forecasts = forecasts.filter(village_ref__name__iexact=request.GET["village"])
+        if request.GET.get("state"):
+            forecasts = forecasts.filter(village_ref__district__state__name__iexact=request.GET["state"])
+    elif village_id:
+        forecasts = forecasts.filter(village_ref_id=village_id)
+    else:
+        at_risk = forecasts.filter(unsafe_from__isnull=False).order_by("unsafe_from")
+        return JsonResponse({"villages": [
+            {
+                "village_id": f.village_ref_id,
+                "village": village_name(f.village_ref_id),
+                "issued_at": f.issued_at,
+                "unsafe_from": f.unsafe_from,
+            }
+            for f in at_risk.defer("values")
+        ]})
+
+    forecast = forecasts.first()
+    if forecast is None:
+        return JsonResponse({"error": "No forecast for this village"}, status=404)
+    return JsonResponse({
+        "village_id": forecast.village_ref_id,
+        "village": village_name(forecast.village_ref_id),
+        "issued_at": forecast.issued_at,
+        "unsafe_from": forecast.unsafe_from,
+        "forecast": forecast_values(forecast, hours),
+    })
+
+
+# ----------------------------
+# REPORT ANALYTICS API
+# ----------------------------
+def report_cube_api(request):
+    """
+    Symptom report counts from the pre-aggregated cube (core/analytics.py).
+    ?level=state|district|village|all picks the geography to group by
+    (default state); ?by=disease,water_source,gender,age_band,week adds
+    dimensions; ?state=, ?district=, ?village=, ?disease=, ?water_source=,
+    ?gender=, ?age_band= filter; ?since=/?until= (YYYY-MM-DD) bound the week.
+    """
+    level = request.GET.get("level", "state")
+    by = [d for d in request.GET.get("by", "").split(",") if d]
+    filters = {
+        name: request.GET[name]
+        for name in (*GEO_LEVELS, *DIMENSIONS)
+        if name != "week" and request.GET.get(name)
+    }
+    try:
+        cells = query_report_cube(
+            level=None if level == "all" else level,
+            by=by,
+            filters=filters,
+            since=request.GET.get("since"),
+            until=request.GET.get("until"),
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({
+        "level": level,
+        "by": by,
+        "total": sum(c["count"] for c in cells),
+        "cells": cells,
+    })
+
+
+# ----------------------------
+# PLACE AUTOCOMPLETE API
+# ----------------------------
+def places_api(request):
+    """
+    Autocomplete over known states, districts and villages (core/places.py).
+    ?q= is matched against the start of any word of a name; ?kind=state|
+    district|village, ?state= and ?district= narrow it; ?limit= caps the
+    results (default 10, clamped to 1..MAX_RESULTS). When nothing matches,
+    close spellings are returned instead with "fuzzy": true.
+    """
+    q = request.GET.get("q", "")
+    kind = request.GET.get("kind") or None
+    if kind and kind not in PLACE_KINDS:
+        return JsonResponse({"error": f"kind must be one of {', '.join(PLACE_KINDS)}"}, status=400)
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 10), MAX_PLACE_RESULTS))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    index = place_index()
+    scope = {"kind": kind, "state": request.GET.get("state"), "district": request.GET.get("district"), "limit": limit}
+    places = index.complete(q, **scope)
+    fuzzy = not places and len(q.strip()) >= 3
+    if fuzzy:
+        places = index.similar(q, **scope)
+    return JsonResponse({"q": q, "fuzzy": fuzzy, "results": [p._asdict() for p in places]})
+
+
 # ----------------------------
 # VILLAGE SUMMARY API
 # ----------------------------
 def api_summary(request):
     """
     Provide summarized village data, water quality, predicted diseases, and trigger alerts.
+    Summary reads may come from the read replica; the duplicate-alert check
+    uses the primary so a lagging replica cannot cause repeat alerts.
     """
     villages = []
-    villages_set = set(list(WaterQuality.objects.values_list("village", flat=True)) +
-                       list(SymptomReport.objects.values_list("village", flat=True)))
+    village_ids = (set(WaterQuality.objects.values_list("village_ref_id", flat=True)) |
+                   set(SymptomReport.objects.values_list("village_ref_id", flat=True)))
+    village_ids.discard(None)
+    registry = villages_by_id(village_ids)
 
-    for v in villages_set:
-        latest = WaterQuality.objects.filter(village=v).order_by('-timestamp').first()
-        sym_count = SymptomReport.objects.filter(village=v).count()
+    for vid in village_ids:
+        v = registry[vid].name
+        latest = WaterQuality.objects.filter(village_ref_id=vid).order_by('-timestamp').first()
+        sym_count = SymptomReport.objects.filter(village_ref_id=vid).count()
 
         if latest:
             lat = latest.lat if latest.lat else 26.2
@@ -202,17 +546,18 @@ def api_summary(request):
 
         # Predicted diseases
         symptom_reports = {
-            "diarrhea": SymptomReport.objects.filter(village=v, symptoms__icontains="diarrhea").count(),
-            "fever": SymptomReport.objects.filter(village=v, symptoms__icontains="fever").count()
+            "diarrhea": SymptomReport.objects.filter(village_ref_id=vid, symptoms__icontains="diarrhea").count(),
+            "fever": SymptomReport.objects.filter(village_ref_id=vid, symptoms__icontains="fever").count()
         }
         diseases = predict_disease(ph, turbidity, tds, symptom_reports)
 
         # Generate alerts if necessary
         if status in ["warning", "unsafe"]:
-            exists = Alert.objects.filter(village=v, alert_type="water", status="unresolved").exists()
+            exists = Alert.objects.using(PRIMARY_DB).filter(village_ref_id=vid, alert_type="water", status="unresolved").exists()
             if not exists:
                 Alert.objects.create(
                     village=v,
+                    village_ref_id=vid,
                     alert_type="water",
                     message=f"Water quality {status.upper()} in {v}. pH={ph}, Turbidity={turbidity}, TDS={tds}",
                     status="unresolved",
@@ -220,10 +565,11 @@ def api_summary(request):
                 )
 
         if diseases and diseases != ["None"]:
-            exists = Alert.objects.filter(village=v, alert_type="disease", status="unresolved").exists()
+            exists = Alert.objects.using(PRIMARY_DB).filter(village_ref_id=vid, alert_type="disease", status="unresolved").exists()
             if not exists:
                 Alert.objects.create(
                     village=v,
+                    village_ref_id=vid,
                     alert_type="disease",
                     message=f"Predicted disease risk in {v}: {', '.join(diseases)}",
                     status="unresolved",
@@ -316,6 +662,7 @@ def add_dummy_report(request):
     SymptomReport.objects.create(
         name="Test User",
         village="DemoVillage",
+        village_ref_id=resolve_village("DemoVillage", "DemoDistrict", "Assam"),
         gender="Male",
         age=25,
         contact="9876543210",
@@ -0,0 +1,82 @@
+# core/warmup.py
+# Loads everything a worker would otherwise build on its first requests:
+# views and URL patterns (which pull in NumPy and DRF), compiled templates,
+# the village registry, sensors and the recent-readings ring buffers.
+#
+# Called from ASaarthi/wsgi.py. Under `gunicorn --preload` (see
+# ASaarthi/gunicorn.conf.py) that runs once in the master process, so forked
+# workers share the loaded state copy-on-write instead of each rebuilding it.
+# AppConfig.ready() cannot do this: Django discourages queries during app
+# loading, and it also runs for every management command.
+
+import gc
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Templates rendered by the busiest pages
+TEMPLATES = (
+    "core/dashboard.html",
+    "core/fragments/recent_reports.html",
+    "core/fragments/recent_readings.html",
+    "core/report_symptom.html",
+    "core/home.html",
+)
+
+# Ring buffers are preloaded for villages with readings this recent
+RING_WARM_WINDOW = timedelta(days=1)
+RING_WARM_MAX_VILLAGES = 500
+
+
+def warm_up():
+    """Preload app state; returns {step: seconds} for the startup profile."""
+    from . import places, registry, sensors
+    from .models import WaterQuality
+    from .timeseries import recent_readings
+
+    timings = {}
+
+    def step(name, func):
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            # A cold worker is slower, not broken: never fail start-up here
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = time.perf_counter() - started
+
+    def rings():
+        since = timezone.now() - RING_WARM_WINDOW
+        village_ids = (
+            WaterQuality.objects.filter(timestamp__gte=since, village_ref__isnull=False)
+            .values_list("village_ref_id", flat=True).distinct()[:RING_WARM_MAX_VILLAGES]
+        )
+        recent_readings.warm(list(village_ids))
+
+    step("urls", lambda: get_resolver().url_patterns)
+    step("templates", lambda: [get_template(name) for name in TEMPLATES])
+    step("registry", registry.preload)
+    step("places", places.preload)
+    step("sensors", sensors.preload)
+    step("rings", rings)
+
+    # Workers must not inherit the master's database connections
+    connections.close_all()
+    # Keep the preloaded objects out of later collections, so the GC does
+    # not touch (and un-share) their pages in every worker
+    gc.freeze()
+    logger.info("Warm-up done: %s", ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items()))
+    return timings
+
+
+def warm_up_if_enabled():
+    if getattr(settings, "WARM_UP_ON_START", False):
+        warm_up()